@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Functions shared by the benchmarks, that are run from the repository root
+# (python benchmarks/<name>.py [args]). The collection is added to the import
+# path when this module is imported, so it must be imported before it.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import sys
+import timeit
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(base_dir, 'ansible', 'collections'))
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.lookup import LookupBase
+from ansible.template import Templar
+
+
+class TemplatePlugin(LookupBase):
+  # lookup plugin whose templar renders the templates of the template lookup
+  # (the templar doesn't render untrusted templates since ansible-core 2.19)
+  def run(self, terms, variables=None, **kwargs):
+    return []
+
+
+def get_template_plugin():
+  loader = DataLoader()
+  return TemplatePlugin(loader=loader, templar=Templar(loader=loader))
+
+
+def get_arg(position, default_value):
+  # positional argument of the command line, with the type of the default
+  if len(sys.argv) > position:
+    return type(default_value)(sys.argv[position])
+
+  return default_value
+
+
+def get_schema_path(name):
+  return os.path.join(base_dir, 'schemas', name)
+
+
+def check_result(name, result, expected):
+  if result != expected:
+    raise AssertionError('unexpected result with ' + name)
+
+
+def timed(function):
+  # runs the function once, returning its result and the time spent
+  start = timeit.default_timer()
+  result = function()
+  return result, timeit.default_timer() - start
+
+
+def measure(function, number=1):
+  # average time of each run
+  return timeit.timeit(function, number=number) / number
+
+
+def format_ms(seconds, digits=2):
+  return ('%.' + str(digits) + 'f') % (seconds * 1000) + ' ms'
+
+
+def format_ratio(before, after):
+  return ('%.1f' % (before / after)) + 'x'
+
+
+def write_files(target_dir, files):
+  # files as a list of (path relative to the target directory, content)
+  for name, content in files:
+    path = os.path.join(target_dir, name)
+
+    if not os.path.exists(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+
+    with open(path, 'w', encoding='utf-8') as file:
+      file.write(content)
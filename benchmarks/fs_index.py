@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to check if the files of a repository exist (as done when
+# validating the task, hook, content, schema and validator files of the
+# contexts) with os.path.exists and with the filesystem index (refreshed
+# before each run, as done by the lookups). The difference is bigger in
+# network filesystems and bind mounts, in which each stat is slower.
+#
+# Usage (from the repository root):
+#   python benchmarks/fs_index.py [dirs] [files] [runs]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import shutil
+import tempfile
+import time
+
+from bench_utils import format_ms, get_arg, measure
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import FileSystemIndex
+
+
+def create_repo(repo_dir, dirs, files):
+  paths = []
+
+  for dir_idx in range(dirs):
+    dir_path = os.path.join(repo_dir, 'dir-' + str(dir_idx))
+    os.makedirs(dir_path)
+
+    for file_idx in range(files):
+      file_path = os.path.join(dir_path, 'file-' + str(file_idx) + '.yml')
+
+      with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('')
+
+      paths += [file_path]
+
+  return paths
+
+
+def main():
+  dirs = get_arg(1, 50)
+  files = get_arg(2, 40)
+  runs = get_arg(3, 10)
+
+  tmp_dir = tempfile.mkdtemp()
+
+  try:
+    repo_dir = os.path.join(tmp_dir, 'repo')
+    paths = create_repo(repo_dir, dirs, files)
+
+    # as a repository synced before (the directories changed just before
+    # being listed are listed again in each run)
+    synced_time = time.time() - 3600
+
+    for dir_path, _, _ in os.walk(repo_dir):
+      os.utime(dir_path, (synced_time, synced_time))
+
+    # each file is checked many times (by the services, pods and nodes)
+    checks = paths * 5
+    fs_index = FileSystemIndex()
+
+    def run_with_stat():
+      return all(os.path.exists(path) for path in checks)
+
+    def run_with_index():
+      fs_index.refresh([repo_dir])
+      return all(fs_index.exists(path) for path in checks)
+
+    print('paths: ' + str(len(paths)) + ', checks per run: ' + str(len(checks)))
+
+    for name, function in [
+        ('os.path.exists', run_with_stat),
+        ('fs index', run_with_index),
+    ]:
+      if not function():
+        raise AssertionError('unexpected result with ' + name)
+
+      print(name + ': ' + format_ms(measure(function, number=runs)) + ' per run')
+
+    stats = fs_index.stats()
+    print(
+        'fs index - found: ' + str(stats.get('hits'))
+        + ', not found: ' + str(stats.get('misses'))
+        + ', directories listed: ' + str(stats.get('dirs'))
+        + ', invalidated: ' + str(stats.get('invalidations'))
+    )
+  finally:
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+  main()
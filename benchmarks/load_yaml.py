@@ -0,0 +1,58 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to load a yaml file with the pure python loader and with
+# the libyaml (C) loader, both rejecting duplicate keys.
+#
+# Usage (from the repository root):
+#   python benchmarks/load_yaml.py [file] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+from bench_utils import check_result, format_ms, format_ratio, get_arg, get_schema_path, measure
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    DefaultLoader, NoDuplicateLoader, load_file, load_yaml
+)
+
+
+def main():
+  file_path = get_arg(1, get_schema_path('env.schema.yml'))
+  iterations = get_arg(2, 20)
+
+  text = load_file(file_path)
+  loaders = [('python', NoDuplicateLoader)]
+
+  if DefaultLoader is not NoDuplicateLoader:
+    loaders += [('libyaml', DefaultLoader)]
+  else:
+    print('libyaml is not available, only the python loader will be measured')
+
+  expected = load_yaml(text, NoDuplicateLoader)
+  times = dict()
+
+  print('file: ' + file_path + ' (' + str(len(text)) + ' chars)')
+
+  for name, loader in loaders:
+    check_result('the loader ' + name, load_yaml(text, loader), expected)
+    times[name] = measure(lambda l=loader: load_yaml(text, l), number=iterations)
+    print(name + ': ' + format_ms(times[name]) + ' per load')
+
+  if times.get('libyaml'):
+    print('speedup: ' + format_ratio(times['python'], times['libyaml']))
+
+
+if __name__ == '__main__':
+  main()
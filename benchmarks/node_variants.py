@@ -0,0 +1,337 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to prepare the context nodes as remote nodes and then as
+# local nodes (as done when preparing a context) with and without sharing the
+# results that don't depend on the node being local (shared_node_results),
+# and shows how that time is divided between the copies of the shared results,
+# the mixed data, the node services (shared), the schema validation and the
+# pod vars (not shared, because they depend on the node and pod paths, that
+# are different for the local nodes).
+#
+# The nodes and pods are generated, with large params, many pods per node, a
+# node service, a pod schema and a pod context (with a template for each
+# param). The pod context is rendered by the ansible templar, that doesn't
+# render untrusted templates since ansible-core 2.19.
+#
+# Usage (from the repository root):
+#   python benchmarks/node_variants.py [nodes] [pods] [params]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import shutil
+import tempfile
+import timeit
+
+from bench_utils import base_dir, check_result, format_ms, get_arg, get_template_plugin, write_files
+
+from ansible_collections.lrd.cloud.plugins.module_utils import lrd_util_ctx
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text, merge_dicts
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_ctx import prepare_nodes
+
+POD_SCHEMA = '''
+root: "pod_schema"
+schemas:
+  pod_schema:
+    type: "dict"
+    props:
+      input:
+        schema: "input"
+      params:
+        type: "map"
+        elem_schema: "param"
+      credentials:
+        type: "map"
+        elem_schema: "credential"
+  input:
+    type: "dict"
+    lax: true
+    props:
+      identifier:
+        type: "str"
+      pod_name:
+        type: "str"
+      pod_dir:
+        type: "str"
+      tmp_dir:
+        type: "str"
+      data_dir:
+        type: "str"
+      local:
+        type: "bool"
+      dev:
+        type: "bool"
+  param:
+    type: "dict"
+    props:
+      name:
+        type: "str"
+        regex: "^[a-z0-9-]+$"
+      replicas:
+        type: "int"
+      enabled:
+        type: "bool"
+      tags:
+        type: "list"
+        elem_type: "str"
+      settings:
+        type: "map"
+        elem_type: "primitive"
+  credential:
+    type: "dict"
+    props:
+      user:
+        type: "str"
+      password:
+        type: "str"
+'''
+
+SERVICE_SCHEMA = '''
+root: "service_schema"
+schemas:
+  service_schema:
+    type: "dict"
+    props:
+      params:
+        schema: "params"
+  params:
+    type: "dict"
+    props:
+      name:
+        type: "str"
+      replicas:
+        type: "list"
+        elem_schema: "replica"
+      settings:
+        type: "map"
+        elem_schema: "param"
+  replica:
+    type: "dict"
+    props:
+      name:
+        type: "str"
+        regex: "^[a-z0-9-]+$"
+      absent:
+        type: "bool"
+  param:
+    type: "dict"
+    props:
+      name:
+        type: "str"
+        regex: "^[a-z0-9-]+$"
+      replicas:
+        type: "int"
+      enabled:
+        type: "bool"
+      tags:
+        type: "list"
+        elem_type: "str"
+      settings:
+        type: "map"
+        elem_type: "primitive"
+'''
+
+POD_CTX = '''
+templates:
+{% for name in params | sort %}
+  - src: "templates/{{ name }}.tpl"
+    dest: "conf/{{ name }}.conf"
+{% endfor %}
+'''
+
+
+def get_env(node_amount, pod_amount, param_amount, tmp_dir):
+  params = dict(
+      ('param_' + str(idx), dict(
+          name='param-' + str(idx),
+          replicas=idx,
+          enabled=(idx % 2 == 0),
+          tags=['tag-' + str(tag_idx) for tag_idx in range(5)],
+          settings=dict(('setting_' + str(key), key) for key in range(10)),
+      ))
+      for idx in range(param_amount)
+  )
+
+  pods = dict(
+      ('pod_' + str(idx), dict(
+          repo='pod_repo',
+          schema='pod.schema.yml',
+          ctx='pod.ctx.yml',
+          credentials=dict(db='db'),
+          params=params,
+      ))
+      for idx in range(pod_amount)
+  )
+
+  nodes = dict(
+      ('node_' + str(idx), dict(
+          base_dir='/var/cloud',
+          service='vm',
+          credentials=dict(host='host'),
+          params=dict(main_host_user_key='host'),
+          pods=sorted(pods.keys()),
+      ))
+      for idx in range(node_amount)
+  )
+
+  return dict(
+      name='bench',
+      repos=dict(pod_repo=dict(src='https://example.com/pod.git')),
+      credentials=dict(
+          host=dict(host_user='host', host_pass='password'),
+          db=dict(user='user', password='password'),
+      ),
+      nodes=nodes,
+      pods=pods,
+      services=dict(vm=dict(
+          base_dir=os.path.join(tmp_dir, 'services'),
+          task='vm.yml',
+          schema='vm.schema.yml',
+          params=dict(settings=params),
+      )),
+  )
+
+
+def get_run_info(env, tmp_dir):
+  return dict(
+      plugin=get_template_plugin(),
+      ansible_vars=dict(ansible_search_path=[tmp_dir]),
+      env_data=dict(
+          env=env,
+          ctx_name='main',
+          dev=True,
+          ctx_dir=os.path.join(tmp_dir, 'ctx'),
+          secrets_ctx_dir=os.path.join(tmp_dir, 'secrets'),
+          env_dir=os.path.join(tmp_dir, 'env'),
+          dev_repos_dir=os.path.join(tmp_dir, 'repos'),
+          dev_extra_repos_dir=os.path.join(tmp_dir, 'extra'),
+          path_map=dict(pod_repo='pod'),
+      ),
+      services_data=dict(),
+      validate=True,
+  )
+
+
+def prepare_variants(ctx_nodes, run_info, shared):
+  # the same as when preparing the context nodes (in prepare_ctx)
+  nodes_run_info = (
+      merge_dicts(run_info, dict(shared_node_results=dict()))
+      if shared
+      else run_info
+  )
+  remote = prepare_nodes(ctx_nodes, nodes_run_info)
+  local = prepare_nodes(ctx_nodes, nodes_run_info, local=True)
+
+  for info in [remote, local]:
+    if info.get('error_msgs'):
+      raise AssertionError(error_text(info.get('error_msgs'), max_errors=3))
+
+  return (remote, local)
+
+
+def measure_parts(function):
+  # measures the time spent in the functions called by the node preparation
+  names = ['deepcopy', 'prepare_mixed_data', 'prepare_service', 'validate_ctx_schema', 'load_vars']
+  originals = dict((name, getattr(lrd_util_ctx, name)) for name in names)
+  times = dict((name, 0.0) for name in names)
+
+  def timed(name):
+    def run(*args, **kwargs):
+      start = timeit.default_timer()
+
+      try:
+        return originals[name](*args, **kwargs)
+      finally:
+        times[name] += timeit.default_timer() - start
+
+    return run
+
+  try:
+    for name in names:
+      setattr(lrd_util_ctx, name, timed(name))
+
+    function()
+  finally:
+    for name in names:
+      setattr(lrd_util_ctx, name, originals[name])
+
+  return times
+
+
+def main():
+  node_amount = get_arg(1, 5)
+  pod_amount = get_arg(2, 5)
+  param_amount = get_arg(3, 50)
+
+  tmp_dir = tempfile.mkdtemp()
+  cwd = os.getcwd()
+
+  try:
+    write_files(tmp_dir, [
+        (os.path.join('services', 'vm.yml'), ''),
+        (os.path.join('services', 'vm.schema.yml'), SERVICE_SCHEMA),
+        (os.path.join('repos', 'pod', 'pod.schema.yml'), POD_SCHEMA),
+        (os.path.join('repos', 'pod', 'pod.ctx.yml'), POD_CTX),
+    ] + [
+        (
+            os.path.join('repos', 'pod', 'templates', 'param_' + str(idx) + '.tpl'),
+            '{{ params | to_json }}',
+        )
+        for idx in range(param_amount)
+    ])
+
+    # the pod context schema is defined relative to the repository root
+    os.chdir(base_dir)
+
+    env = get_env(node_amount, pod_amount, param_amount, tmp_dir)
+    run_info = get_run_info(env, tmp_dir)
+    ctx_nodes = [dict(name=name) for name in sorted(env['nodes'].keys())]
+
+    print(
+        'nodes: ' + str(node_amount) + ', pods per node: ' + str(pod_amount)
+        + ', params per pod: ' + str(param_amount)
+    )
+
+    expected = prepare_variants(ctx_nodes, run_info, shared=False)
+    results = dict()
+
+    for name, shared in [('not shared', False), ('shared', True)]:
+      check_result(name, prepare_variants(ctx_nodes, run_info, shared), expected)
+
+      results[name] = min(timeit.repeat(
+          lambda s=shared: prepare_variants(ctx_nodes, run_info, s),
+          number=1,
+          repeat=5,
+      ))
+      parts = measure_parts(lambda s=shared: prepare_variants(ctx_nodes, run_info, s))
+
+      print(
+          name + ': ' + format_ms(results[name]) + ' ('
+          + ', '.join(
+              part + ' ' + format_ms(parts[part])
+              for part in sorted(parts.keys())
+          )
+          + ')'
+      )
+
+    print('ratio: ' + ('%.2f' % (results['shared'] / results['not shared'])))
+  finally:
+    os.chdir(cwd)
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+  main()
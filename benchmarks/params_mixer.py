@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to mix the parameters of many entities (as done for the
+# services, pods and nodes of an environment) expanding the shared params and
+# shared group params in each mix (as it was done before) and with the
+# expansion tables of the environment.
+#
+# Usage (from the repository root):
+#   python benchmarks/params_mixer.py [entities] [params]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+from bench_utils import check_result, format_ms, get_arg, timed
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_params_mixer import (
+    mix, params_tables
+)
+
+
+def get_dicts(params):
+  group_params_dict = dict(
+      ('group_' + str(idx), dict(value=idx, name='group ' + str(idx)))
+      for idx in range(params)
+  )
+  shared_params_dict = dict(
+      (
+          'shared_' + str(idx),
+          dict(('param_' + str(idx) + '_' + str(pos), pos) for pos in range(params)),
+      )
+      for idx in range(10)
+  )
+  shared_group_params_dict = dict(
+      (
+          'shared_group_' + str(idx),
+          dict(('param_' + str(pos), 'group_' + str(pos)) for pos in range(params)),
+      )
+      for idx in range(10)
+  )
+  return shared_group_params_dict, shared_params_dict, group_params_dict
+
+
+def main():
+  entities = get_arg(1, 1000)
+  params = get_arg(2, 50)
+
+  shared_group_params_dict, shared_params_dict, group_params_dict = get_dicts(params)
+  args_list = [
+      dict(
+          params=dict(name='entity ' + str(idx)),
+          group_params=dict(group='group_' + str(idx % params)),
+          shared_params=['shared_' + str(idx % 10), 'shared_' + str((idx + 1) % 10)],
+          shared_group_params='shared_group_' + str(idx % 10),
+          shared_group_params_dict=shared_group_params_dict,
+          shared_params_dict=shared_params_dict,
+          group_params_dict=group_params_dict,
+      )
+      for idx in range(entities)
+  ]
+
+  def run_without_tables():
+    results = []
+
+    for args in args_list:
+      params_tables.clear()
+      results += [mix(args)]
+
+    return results
+
+  def run_with_tables():
+    params_tables.clear()
+    return [mix(args) for args in args_list]
+
+  print('entities: ' + str(entities) + ', params: ' + str(params))
+
+  times = dict()
+  expected = None
+
+  for name, function in [
+      ('expanded per mix', run_without_tables),
+      ('expansion tables', run_with_tables),
+  ]:
+    results, times[name] = timed(function)
+
+    if any(info.get('error_msgs') for info in results):
+      raise AssertionError('unexpected errors with ' + name)
+
+    if expected is not None:
+      check_result(name, results, expected)
+
+    expected = results
+    print(name + ': ' + format_ms(times[name]))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time and the memory (peak of the allocations traced) to mix
+# the params of many pods, as done when preparing the mixed params (the ctx
+# info, info and main params of each pod are mixed from the shared group
+# params, shared params, group params and params, and then merged), copying
+# the params in each merge (merge_dicts) and stacking them (merge_overlay),
+# with the overlays exported as dicts at the end. The memory retained by the
+# results is the same, so the difference is in the intermediate copies.
+#
+# Usage (from the repository root):
+#   python benchmarks/params_overlay.py [pods] [params]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import tracemalloc
+
+from bench_utils import check_result, format_ms, get_arg, timed
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    merge_dicts, merge_overlay, to_plain_dict
+)
+
+
+def get_layers(pods, params):
+  # the expanded shared group params, shared params and group params are
+  # shared by the pods, and each pod has its own params
+  shared_group_params = dict(('group_param_' + str(idx), idx) for idx in range(params))
+  shared_params = dict(('shared_param_' + str(idx), idx) for idx in range(params))
+  group_params = dict(('param_' + str(idx), 'group') for idx in range(params // 2))
+
+  return [
+      [
+          (
+              shared_group_params,
+              shared_params,
+              group_params,
+              dict(name='pod-' + str(idx) + '-' + part, param_0='pod'),
+          )
+          for part in ['ctx_info', 'info', 'main']
+      ]
+      for idx in range(pods)
+  ]
+
+
+def mix_pods(pods_layers, merge_function):
+  result = []
+
+  for pod_layers in pods_layers:
+    mixed = [merge_function(dict(), *layers) for layers in pod_layers]
+    result += [to_plain_dict(merge_function(mixed[2], mixed[1], mixed[0]))]
+
+  return result
+
+
+def main():
+  pods = get_arg(1, 500)
+  params = get_arg(2, 200)
+
+  pods_layers = get_layers(pods, params)
+  expected = mix_pods(pods_layers, merge_dicts)
+
+  print('pods: ' + str(pods) + ', params: ' + str(params))
+
+  for name, function in [
+      ('merge_dicts', merge_dicts),
+      ('merge_overlay', merge_overlay),
+  ]:
+    result, total = timed(lambda f=function: mix_pods(pods_layers, f))
+
+    # the keys must be in the same order
+    check_result(
+        name,
+        [list(item.items()) for item in result],
+        [list(item.items()) for item in expected],
+    )
+
+    result = None
+    tracemalloc.start()
+    result = mix_pods(pods_layers, function)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = None
+
+    # the intermediate memory is the peak not retained by the results
+    print(
+        name + ': ' + format_ms(total) + ', '
+        + ('%.2f' % (peak / (1024 * 1024))) + ' MiB (peak), '
+        + ('%.2f' % ((peak - current) / 1024)) + ' KiB (intermediate)'
+    )
+
+
+if __name__ == '__main__':
+  main()
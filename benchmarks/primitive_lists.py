@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to validate large lists of primitive values (hostnames,
+# ports, protocols and numeric strings) visiting each element (as it was done
+# before) and checking the elements in bulk (is_valid_primitive), as well as
+# the errors returned for lists with some invalid elements.
+#
+# Usage (from the repository root):
+#   python benchmarks/primitive_lists.py [amount] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+from bench_utils import check_result, format_ms, format_ratio, get_arg, measure
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import (
+    SchemaNode, compile_schema
+)
+
+SCHEMA = dict(
+    root='hosts',
+    schemas=dict(
+        hosts=dict(
+            type='dict',
+            props=dict(
+                hosts=dict(type='list', elem_type='str', elem_regex='^[-.\\w]+$'),
+                ports=dict(type='list', elem_type='int', elem_min=1, elem_max=65535),
+                protocols=dict(type='list', elem_type='str', elem_choices=['tcp', 'udp']),
+                weights=dict(type='list', elem_type='float'),
+            ),
+        ),
+    ),
+)
+
+
+def get_value(amount, invalid=False):
+  value = dict(
+      hosts=['host-' + str(idx) + '.example.com' for idx in range(amount)],
+      ports=[(idx % 65535) + 1 for idx in range(amount)],
+      protocols=[('tcp' if (idx % 2) else 'udp') for idx in range(amount)],
+      weights=[str(idx / 10) for idx in range(amount)],
+  )
+
+  if invalid:
+    value['hosts'][amount // 2] = 'host name'
+    value['ports'][-1] = 0
+    value['protocols'][0] = 'icmp'
+    value['weights'][1] = 'heavy'
+
+  return value
+
+
+def main():
+  amount = get_arg(1, 20000)
+  iterations = get_arg(2, 5)
+
+  compiled = compile_schema(SCHEMA)
+  values = [('valid', get_value(amount)), ('invalid', get_value(amount, invalid=True))]
+  is_primitive_node = SchemaNode.is_primitive_node
+  expected = dict()
+  times = dict()
+
+  print('elements: ' + str(4 * amount) + ', validations: ' + str(iterations))
+
+  for name, bulk in [('each element', False), ('bulk', True)]:
+    if not bulk:
+      SchemaNode.is_primitive_node = lambda node: False
+
+    try:
+      for value_name, value in values:
+        result = compiled.validate(value)
+
+        if value_name in expected:
+          check_result(name + ' (' + value_name + ')', result, expected[value_name])
+        elif bool(result) != (value_name == 'invalid'):
+          raise AssertionError('unexpected errors with ' + name + ' (' + value_name + ')')
+
+        expected[value_name] = result
+
+      times[name] = measure(lambda: compiled.validate(values[0][1]), number=iterations)
+    finally:
+      SchemaNode.is_primitive_node = is_primitive_node
+
+    print(name + ': ' + format_ms(times[name]) + ' per validation')
+
+  print('speedup: ' + format_ratio(times['each element'], times['bulk']))
+
+
+if __name__ == '__main__':
+  main()
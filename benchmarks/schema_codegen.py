@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to validate a value (by default, the env schema against
+# the schema of the schemas) with the compiled schema (interpreted) and with
+# the python module generated from the schema, as well as the time to generate
+# the module (first run) and to import it (next runs).
+#
+# Usage (from the repository root):
+#   python benchmarks/schema_codegen.py [schema_file] [value_file] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import shutil
+import tempfile
+
+from bench_utils import (
+    check_result, format_ms, format_ratio, get_arg, get_schema_path, measure, timed
+)
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import load_yaml_file
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import (
+    SCHEMA_CODEGEN_DIR_ENV, CompiledSchema, get_generated_validator
+)
+
+
+def main():
+  schema_file = get_arg(1, get_schema_path('schema.yml'))
+  value_file = get_arg(2, get_schema_path('env.schema.yml'))
+  iterations = get_arg(3, 20)
+
+  schema = load_yaml_file(schema_file)
+  value = load_yaml_file(value_file)
+
+  codegen_dir = tempfile.mkdtemp()
+
+  try:
+    os.environ[SCHEMA_CODEGEN_DIR_ENV] = codegen_dir
+
+    for name in ['generate', 'import']:
+      compiled = CompiledSchema(schema.get('schemas'), schema.get('root'))
+      validate, total = timed(lambda c=compiled: get_generated_validator(c, schema))
+      print(name + ': ' + format_ms(total))
+
+    interpreted = CompiledSchema(schema.get('schemas'), schema.get('root')).validate
+    check_result('the generated module', validate(value), interpreted(value))
+
+    times = dict()
+
+    for name, function in [('interpreted', interpreted), ('generated', validate)]:
+      function(value)
+      times[name] = measure(lambda f=function: f(value), number=iterations)
+      print(name + ': ' + format_ms(times[name]) + ' per validation')
+
+    print('speedup: ' + format_ratio(times['interpreted'], times['generated']))
+  finally:
+    os.environ.pop(SCHEMA_CODEGEN_DIR_ENV, None)
+    shutil.rmtree(codegen_dir)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to validate a value in which the same objects appear in
+# many places (like yaml aliases) with the time to validate an equal value
+# without shared objects (deep copied).
+#
+# The value is a schema with many schemas sharing the same definitions (from
+# the env schema), validated against the schema of the schemas.
+#
+# Usage (from the repository root):
+#   python benchmarks/shared_subtrees.py [copies] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+from copy import deepcopy
+
+from bench_utils import format_ms, format_ratio, get_arg, get_schema_path, measure
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import load_yaml_file
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import compile_schema
+
+
+def main():
+  copies = get_arg(1, 20)
+  iterations = get_arg(2, 5)
+
+  schema = load_yaml_file(get_schema_path('schema.yml'))
+  env_schema = load_yaml_file(get_schema_path('env.schema.yml'))
+  schemas = dict()
+
+  for idx in range(copies):
+    for name, definition in env_schema.get('schemas').items():
+      schemas[name + '_' + str(idx)] = definition
+
+  shared_value = dict(root=env_schema.get('root') + '_0', schemas=schemas)
+  # each definition is copied separately (deepcopy keeps the shared objects)
+  copied_value = dict(
+      root=shared_value.get('root'),
+      schemas={name: deepcopy(definition) for name, definition in schemas.items()},
+  )
+
+  compiled = compile_schema(schema)
+  print('schemas: ' + str(len(schemas)))
+
+  times = dict()
+
+  for name, value in [('copied', copied_value), ('shared', shared_value)]:
+    if compiled.validate(value):
+      raise AssertionError('unexpected errors with ' + name)
+
+    times[name] = measure(lambda v=value: compiled.validate(v), number=iterations)
+    print(name + ': ' + format_ms(times[name]) + ' per validation')
+
+  print('speedup: ' + format_ratio(times['copied'], times['shared']))
+
+
+if __name__ == '__main__':
+  main()
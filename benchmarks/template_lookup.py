@@ -0,0 +1,114 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to render the same template file many times (as done for
+# the templates shared by many pods and replicas) with the template lookup,
+# compiling the template source for each render (as it was done before) and
+# compiling it only once (compiled_templates).
+#
+# The compiled templates are cached only with the templar of ansible-core
+# versions before 2.19 (in which the environment is a templar attribute).
+#
+# Usage (from the repository root):
+#   python benchmarks/template_lookup.py [params] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import contextlib
+import shutil
+import tempfile
+
+from bench_utils import (
+    check_result, format_ms, get_arg, get_template_plugin, measure, write_files
+)
+
+from ansible_collections.lrd.cloud.plugins.module_utils import lrd_util_template
+
+TEMPLATE = '''
+{% for name in params | sort %}
+{% set param = params[name] %}
+[{{ name }}]
+replicas = {{ param.replicas }}
+enabled = {{ param.enabled | ternary('yes', 'no') }}
+tags = {{ param.tags | join(',') }}
+{% for key, value in param.settings | dictsort %}
+{{ key }} = {{ value }}
+{% endfor %}
+{% endfor %}
+'''
+
+
+@contextlib.contextmanager
+def no_compiled_cache(*_args):
+  yield
+
+
+def main():
+  param_amount = get_arg(1, 20)
+  iterations = get_arg(2, 200)
+
+  params = dict(params=dict(
+      ('param_' + str(idx), dict(
+          replicas=idx,
+          enabled=(idx % 2 == 0),
+          tags=['tag-' + str(tag_idx) for tag_idx in range(5)],
+          settings=dict(('setting_' + str(key), key) for key in range(10)),
+      ))
+      for idx in range(param_amount)
+  ))
+
+  tmp_dir = tempfile.mkdtemp()
+
+  try:
+    write_files(tmp_dir, [('file.tpl', TEMPLATE)])
+    plugin = get_template_plugin()
+    ansible_vars = dict(ansible_search_path=[tmp_dir])
+
+    def render():
+      return lrd_util_template.lookup(plugin, ansible_vars, 'file.tpl', params)
+
+    expected = None
+    times = dict()
+    compiled_template_cache = lrd_util_template.compiled_template_cache
+
+    print('params: ' + str(param_amount) + ', renders: ' + str(iterations))
+
+    for name, cache in [
+        ('compiled for each render', no_compiled_cache),
+        ('compiled once', compiled_template_cache),
+    ]:
+      lrd_util_template.compiled_template_cache = cache
+
+      try:
+        result = render()
+
+        if expected is not None:
+          check_result(name, result, expected)
+
+        expected = result
+        times[name] = measure(render, number=iterations)
+      finally:
+        lrd_util_template.compiled_template_cache = compiled_template_cache
+
+      print(name + ': ' + format_ms(times[name], digits=3) + ' per render')
+
+    stats = lrd_util_template.get_template_cache_stats().get('compiled')
+    print('compiled templates: ' + str(stats.get('amount')) + ', hits: ' + str(stats.get('hits')))
+  finally:
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to render a template (with the template lookup) that
+# reads some values of large variables, preparing the template variables by:
+#
+# - deep copying all the ansible variables (as it was done before);
+# - deep copying each variable used by the template (when first accessed);
+# - copying only the dicts and lists used by the template (vars_overlay).
+#
+# The large variables are simulated with many copies of the env schema
+# (like the env, ctx_data and params variables), and the template reads a few
+# values of some of them, iterating over a list.
+#
+# The ansible templar (in ansible-core versions before 2.19) templates, and
+# so copies, all the values of each variable used by the template, so the
+# time to read the same values without the templar is also shown.
+#
+# Usage (from the repository root):
+#   python benchmarks/template_vars.py [variables] [iterations]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import shutil
+import tempfile
+
+from collections import ChainMap
+from copy import deepcopy
+
+from bench_utils import (
+    check_result, format_ms, get_arg, get_schema_path, get_template_plugin, measure, write_files
+)
+
+from ansible_collections.lrd.cloud.plugins.module_utils import lrd_util_template
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    VarsOverlay, load_yaml_file, vars_overlay
+)
+
+TEMPLATE = '''
+name: {{ env_0.root }}
+description: {{ env_0.schemas.env.description }}
+ctxs: {{ env_1.schemas.env.props.ctxs.description }}
+{% for name in env_2.schemas.env.props | sort %}
+- {{ name }}: {{ env_2.schemas.env.props[name].type | default('') }}
+{% endfor %}
+input: {{ input.name }}
+'''
+
+
+class DeepCopyOverlay(VarsOverlay):  # pylint: disable=too-many-ancestors
+  def __getitem__(self, key):
+    top = self.maps[0]
+
+    if key not in top:
+      top[key] = deepcopy(ChainMap.__getitem__(self, key))
+
+    return top[key]
+
+
+def read_values(new_vars):
+  # the same values read by the template
+  props = new_vars['env_2']['schemas']['env']['props']
+
+  return [
+      new_vars['env_0']['root'],
+      new_vars['env_0']['schemas']['env']['description'],
+      new_vars['env_1']['schemas']['env']['props']['ctxs']['description'],
+      [(name, props[name].get('type')) for name in sorted(props)],
+      new_vars['input']['name'],
+  ]
+
+
+def prepare_with_copy(*layers):
+  new_vars = dict()
+
+  for layer in reversed(layers):
+    new_vars.update(deepcopy(layer))
+
+  return new_vars
+
+
+def prepare_with_deep_copy_overlay(*layers):
+  return DeepCopyOverlay(dict(), *layers)
+
+
+def main():
+  variables = get_arg(1, 20)
+  iterations = get_arg(2, 20)
+
+  env = load_yaml_file(get_schema_path('env.schema.yml'))
+  tmp_dir = tempfile.mkdtemp()
+
+  try:
+    write_files(tmp_dir, [('file.tpl', TEMPLATE)])
+
+    ansible_vars = dict(
+        ('env_' + str(idx), deepcopy(env))
+        for idx in range(variables)
+    )
+    ansible_vars['ansible_search_path'] = [tmp_dir]
+    original_vars = deepcopy(ansible_vars)
+    params = dict(input=dict(name='demo'))
+
+    plugin = get_template_plugin()
+
+    def render():
+      return lrd_util_template.lookup(plugin, ansible_vars, 'file.tpl', params)
+
+    print('variables: ' + str(variables) + ', renders: ' + str(iterations))
+
+    expected = None
+    expected_values = None
+    times = dict()
+
+    for name, function in [
+        ('deepcopy (all)', prepare_with_copy),
+        ('deepcopy (when accessed)', prepare_with_deep_copy_overlay),
+        ('copy on access', vars_overlay),
+    ]:
+      lrd_util_template.vars_overlay = function
+
+      try:
+        result = render()
+
+        if expected is not None:
+          check_result(name, result, expected)
+
+        expected = result
+        times[name] = measure(render, number=iterations)
+      finally:
+        lrd_util_template.vars_overlay = vars_overlay
+
+      values = read_values(function(params, ansible_vars))
+
+      if expected_values is not None:
+        check_result(name + ' (values)', values, expected_values)
+
+      expected_values = values
+      read_time = measure(
+          lambda f=function: read_values(f(params, ansible_vars)),
+          number=iterations,
+      )
+      check_result(name + ' (original variables)', ansible_vars, original_vars)
+
+      print(
+          name + ': ' + format_ms(times[name], digits=3) + ' per render, '
+          + format_ms(read_time, digits=3) + ' to read the values without the templar'
+      )
+  finally:
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=wrong-import-position
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+# Compares the time to validate a value (by default, the env schema against
+# the schema of the schemas) without the validation cache, with a new cache
+# (that is persisted), with the persisted cache (as in a new run) and with the
+# persisted cache after changing a single property of the value.
+#
+# Usage (from the repository root):
+#   python benchmarks/validation_cache.py [schema_file] [value_file]
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import shutil
+import tempfile
+
+from copy import deepcopy
+
+from bench_utils import check_result, format_ms, get_arg, get_schema_path, timed
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    PARSE_CACHE_DIR_ENV, load_yaml_file
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import (
+    SCHEMA_CODEGEN_DIR_ENV, compiled_schemas, save_validation_caches, validate_value,
+    validation_caches
+)
+
+
+def change_value(value):
+  # changes the first string found in the deepest path of the first items
+  if isinstance(value, dict) and value:
+    key = sorted(value.keys())[0]
+    changed = change_value(value[key])
+
+    if changed is not None:
+      value[key] = changed
+      return value
+  elif isinstance(value, list) and value:
+    changed = change_value(value[0])
+
+    if changed is not None:
+      value[0] = changed
+      return value
+  elif isinstance(value, str):
+    return value + ' (changed)'
+
+  return None
+
+
+def measure_run(name, function, expected=None):
+  def run():
+    # each measure runs as in a new process (the validation caches are
+    # loaded again, and saved as when the process exits)
+    compiled_schemas.clear()
+    validation_caches.clear()
+    result = function()
+    save_validation_caches()
+    return result
+
+  result, total = timed(run)
+
+  if expected is not None:
+    check_result(name, result, expected)
+
+  print(name + ': ' + format_ms(total))
+
+  return result
+
+
+def main():
+  schema_file = get_arg(1, get_schema_path('schema.yml'))
+  value_file = get_arg(2, get_schema_path('env.schema.yml'))
+
+  schema = load_yaml_file(schema_file)
+  value = load_yaml_file(value_file)
+  changed_value = change_value(deepcopy(value))
+
+  cache_dir = tempfile.mkdtemp()
+
+  try:
+    # the values are validated with the compiled schema (interpreted)
+    os.environ.pop(SCHEMA_CODEGEN_DIR_ENV, None)
+    os.environ.pop(PARSE_CACHE_DIR_ENV, None)
+    expected = measure_run('no cache', lambda: validate_value(schema, value))
+    changed_expected = validate_value(schema, changed_value)
+
+    os.environ[PARSE_CACHE_DIR_ENV] = cache_dir
+    measure_run('new cache', lambda: validate_value(schema, value), expected)
+    measure_run('persisted cache', lambda: validate_value(schema, value), expected)
+    measure_run(
+        'persisted cache (changed value)',
+        lambda: validate_value(schema, changed_value),
+        changed_expected,
+    )
+  finally:
+    os.environ.pop(PARSE_CACHE_DIR_ENV, None)
+    shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,73 @@
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+# pylint: disable=wrong-import-position
+# pylint: disable=import-error
+
+# pyright: reportUnusedImport=true
+# pyright: reportUnusedVariable=true
+# pyright: reportMissingImports=false
+
+from __future__ import (absolute_import, division, print_function)
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation import (
+    validate_schema_file
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, refresh_fs_index
+)
+
+from ansible.module_utils._text import to_text
+from ansible.plugins.action import ActionBase
+
+__metaclass__ = type  # pylint: disable=invalid-name
+
+
+class ActionModule(ActionBase):
+  """
+  Validates the value (or values) in the controller, instead of running the
+  schema module in the target, so the parsed schema files, the compiled
+  schemas and the schemas already validated are cached in the controller
+  process and shared by all the tasks and hosts.
+  """
+
+  TRANSFERS_FILES = False
+  _VALID_ARGS = frozenset(('schema_file', 'value', 'values', 'full_validation'))
+
+  def run(self, tmp=None, task_vars=None):
+    result = super(ActionModule, self).run(tmp, task_vars)
+    del tmp
+
+    _, args = self.validate_argument_spec(
+        argument_spec=dict(
+            schema_file=dict(type='str', required=True),
+            value=dict(type='raw'),
+            values=dict(type='list', elements='raw'),
+            full_validation=dict(type='bool', default=True),
+        ),
+        required_one_of=[['value', 'values']],
+        mutually_exclusive=[['value', 'values']],
+    )
+
+    # the schema files in the repositories of the environment are checked
+    # with the index only after the environment data is defined
+    refresh_fs_index((task_vars or dict()).get('env_data'))
+
+    error_msgs = validate_schema_file(
+        args.get('schema_file'),
+        value=args.get('value'),
+        values=args.get('values'),
+        full_validation=args.get('full_validation'),
+    )
+
+    result['changed'] = False
+
+    if error_msgs:
+      context = "schema validation"
+      result['failed'] = True
+      result['msg'] = to_text(error_text(error_msgs, context))
+
+    return result
@@ -12,6 +12,9 @@
 from __future__ import absolute_import, division, print_function
 
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_ctx import (
+    get_ctx_key, is_node_connection_valid, prepare_host_ctx
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_node_dependencies import (
     prepare_host_dependencies
 )
@@ -24,6 +27,8 @@ from ansible.module_utils._text import to_text
 class FilterModule(object):
   def filters(self):
     return {
+        'ctx_key': self.ctx_key,
+        'host_ctx': self.host_ctx,
         'node_dict_dependencies': self.node_dict_dependencies,
         'node_dns_service_info': self.node_dns_service_info,
         'params_mixer': self.params_mixer,
@@ -33,6 +38,18 @@ class FilterModule(object):
         'validate_connection': self.validate_connection,
     }
 
+  def ctx_key(self, ctx_name, env_data, services_data=None, validate=None):
+    # an empty key means that the ctx should not be reused
+    return get_ctx_key(
+        ctx_name=ctx_name,
+        env_data=env_data,
+        services_data=services_data,
+        validate=validate if (validate is not None) else True,
+    ) or ''
+
+  def host_ctx(self, ctx_data, env_info):
+    return prepare_host_ctx(ctx_data, env_info)
+
   def node_dict_dependencies(
       self,
       node_dict_dependencies,
@@ -178,25 +195,4 @@ class FilterModule(object):
     return result_list
 
   def validate_connection(self, node, env_info):
-    node_name = node.get('name')
-    local_node = node.get('local')
-
-    local_connection = env_info.get('local_connection')
-    instance_type = env_info.get('instance_type')
-    env_node_name = env_info.get('env_node')
-
-    valid = (
-        (
-            (local_node and local_connection)
-            or
-            (
-                (not local_node)
-                and
-                (node_name == instance_type)
-            )
-        )
-        and
-        ((not env_node_name) or (env_node_name == node_name))
-    )
-
-    return valid
+    return is_node_connection_valid(node, env_info)
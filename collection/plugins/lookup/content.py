@@ -15,7 +15,9 @@
 
 from __future__ import (absolute_import, division, print_function)
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, refresh_fs_index
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_mixed_data import load_content
 
 from ansible.module_utils._text import to_text
@@ -57,6 +59,13 @@ DOCUMENTATION = """
         description: Specifies if the schema (when defined) should be validated
         type: bool
         default: true
+      max_errors:
+        description: >-
+          Stops the preparation and validation as soon as this amount of errors is reached
+          (fail-fast mode, useful when it's only needed to know if the environment is valid);
+          all the errors are collected when not greater than 0
+        type: int
+        default: 0
 """
 
 RETURN = """
@@ -75,8 +84,11 @@ class LookupModule(LookupBase):
     input_params = kwargs.get('input')
     custom_dir = kwargs.get('custom_dir')
     validate = kwargs.get('validate')
+    max_errors = kwargs.get('max_errors')
     context = kwargs.get('context')
 
+    refresh_fs_index(env_data)
+
     ret = []
     error_msgs = []
 
@@ -88,6 +100,7 @@ class LookupModule(LookupBase):
           ansible_vars=variables,
           env_data=env_data,
           validate=validate if (validate is not None) else True,
+          max_errors=int(max_errors or 0),
       )
 
       result_info = load_content(
@@ -15,15 +15,23 @@
 
 from __future__ import (absolute_import, division, print_function)
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, get_fs_index_stats, refresh_fs_index
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_ctx import prepare_ctx
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_mixed_data import (
+    get_content_memo_stats, get_secrets_stats
+)
 
 from ansible.module_utils._text import to_text
 from ansible.plugins.lookup import LookupBase
 from ansible.errors import AnsibleError
+from ansible.utils.display import Display
 
 __metaclass__ = type  # pylint: disable=invalid-name
 
+display = Display()
+
 DOCUMENTATION = """
     name: lrd.cloud.ctx
     author: Lucas Basquerotto
@@ -43,6 +51,20 @@ DOCUMENTATION = """
         description: Specifies if the schema (when defined) should be validated
         type: bool
         default: true
+      processes:
+        description: >-
+          The amount of processes used to prepare the nodes and pods in parallel
+          (they are prepared serially when not greater than 1, or when forking
+          is not available)
+        type: int
+        default: 0
+      max_errors:
+        description: >-
+          Stops the preparation and validation as soon as this amount of errors is reached
+          (fail-fast mode, useful when it's only needed to know if the environment is valid);
+          all the errors are collected when not greater than 0
+        type: int
+        default: 0
 """
 
 RETURN = """
@@ -59,6 +81,10 @@ class LookupModule(LookupBase):
     env_data = kwargs.get('env_data')
     services_data = kwargs.get('services_data') or dict()
     validate = kwargs.get('validate')
+    max_errors = kwargs.get('max_errors')
+    processes = kwargs.get('processes')
+
+    refresh_fs_index(env_data)
 
     ret = []
     error_msgs = []
@@ -72,10 +98,58 @@ class LookupModule(LookupBase):
           env_data=env_data,
           services_data=services_data,
           validate=validate if (validate is not None) else True,
+          max_errors=int(max_errors or 0),
+          processes=int(processes or 0),
+          content_memo=dict(results=dict(), hits=0, misses=0),
+          parallel_fallbacks=list(),
       )
 
       result_info = prepare_ctx(ctx_name, run_info)
 
+      # the items that failed in the pool of processes were prepared again
+      # (serially), so the results are the same, but slower
+      for idx, reason in run_info.get('parallel_fallbacks'):
+        display.warning(
+            "[%s] item %s prepared again outside of the pool of processes: %s" % (
+                ctx_name,
+                idx,
+                reason.strip().split('\n')[-1],
+            )
+        )
+        display.vvv("[%s] item %s: %s" % (ctx_name, idx, reason))
+
+      content_memo_stats = get_content_memo_stats(run_info)
+      display.vvv(
+          "[%s] prepared contents: %s, memo hits: %s, misses: %s (hit rate: %.1f%%)" % (
+              ctx_name,
+              content_memo_stats.get('amount'),
+              content_memo_stats.get('hits'),
+              content_memo_stats.get('misses'),
+              content_memo_stats.get('hit_rate') * 100,
+          )
+      )
+
+      # the credentials are decrypted only when used, so the amount of
+      # decrypted secrets is the total in the process until now
+      secrets_stats = get_secrets_stats()
+      display.vvv(
+          "[%s] vault secrets decrypted: %s, cached accesses: %s" % (
+              ctx_name,
+              secrets_stats.get('decrypted'),
+              secrets_stats.get('hits'),
+          )
+      )
+
+      fs_index_stats = get_fs_index_stats()
+      display.vvv(
+          "[%s] paths found in the fs index: %s, not found: %s (directories listed: %s)" % (
+              ctx_name,
+              fs_index_stats.get('hits'),
+              fs_index_stats.get('misses'),
+              fs_index_stats.get('dirs'),
+          )
+      )
+
       result_aux = result_info.get('result')
       error_msgs_aux = result_info.get('error_msgs') or list()
 
@@ -15,7 +15,9 @@
 
 from __future__ import (absolute_import, division, print_function)
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, refresh_fs_index
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_pod_vars import load_vars
 
 from ansible.module_utils._text import to_text
@@ -66,6 +68,8 @@ class LookupModule(LookupBase):
     input_params = kwargs.get('input_params')
     validate = kwargs.get('validate')
 
+    refresh_fs_index(env_data)
+
     ret = []
     error_msgs = []
 
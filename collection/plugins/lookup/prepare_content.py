@@ -15,7 +15,9 @@
 
 from __future__ import (absolute_import, division, print_function)
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, refresh_fs_index
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_mixed_data import prepare_content
 
 from ansible.module_utils._text import to_text
@@ -77,6 +79,8 @@ class LookupModule(LookupBase):
     validate = kwargs.get('validate')
     context = kwargs.get('context')
 
+    refresh_fs_index(env_data)
+
     ret = []
     error_msgs = []
 
@@ -15,7 +15,9 @@
 
 from __future__ import (absolute_import, division, print_function)
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_text, refresh_fs_index
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_project import prepare_project
 
 from ansible.module_utils._text import to_text
@@ -47,6 +49,13 @@ DOCUMENTATION = """
         description: General information about the environment, like the directory, lax permissions and so on
         type: str
         default: true
+      max_errors:
+        description: >-
+          Stops the preparation and validation as soon as this amount of errors is reached
+          (fail-fast mode, useful when it's only needed to know if the environment is valid);
+          all the errors are collected when not greater than 0
+        type: int
+        default: 0
 """
 
 RETURN = """
@@ -63,6 +72,9 @@ class LookupModule(LookupBase):
     env_init = kwargs.get('env_init')
     env_original = kwargs.get('env_original')
     env_info = kwargs.get('env_info')
+    max_errors = kwargs.get('max_errors')
+
+    refresh_fs_index(env_info)
 
     ret = []
     error_msgs = []
@@ -75,6 +87,7 @@ class LookupModule(LookupBase):
           env_init=env_init,
           env_original=env_original,
           env_info=env_info,
+          max_errors=int(max_errors or 0),
       )
 
       result_aux = result_info.get('result')
@@ -16,11 +16,16 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type  # pylint: disable=invalid-name
 
+import hashlib
+import json
 import os
 import traceback
 
+from copy import deepcopy
+
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
-    default, is_empty, is_str, merge_dicts, to_bool
+    count_errors, default, error_with_context, is_empty, is_error_budget_reached, is_str,
+    map_parallel, merge_dicts, path_exists, to_bool
 )
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_node_dependencies import (
     prepare_node_dependencies
@@ -30,10 +35,118 @@ from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation impo
     get_validators, update_validators_descriptions, validate_ctx_schema
 )
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_mixed_data import (
-    prepare_content, prepare_mixed_data
+    content_key_default, prepare_content, prepare_mixed_data
 )
 
 
+def get_shared_node_result(run_info, key, function):
+  # results that don't depend on the node being local or not, calculated only
+  # once when the same nodes are prepared as remote and as local nodes; a copy
+  # of the result is stored and handed out (only once) to the next node
+  # variant, so that changes in a prepared node are not seen in the others
+  shared_results = run_info.get('shared_node_results')
+
+  if shared_results is None:
+    return function()
+
+  if key in shared_results:
+    return shared_results.pop(key)
+
+  result = function()
+  shared_results[key] = deepcopy(result)
+
+  return result
+
+
+def prepare_items(items, prepare_item, run_info, removed_keys=None):
+  # prepares the items in a pool of processes when run_info has more than 1
+  # process defined; the changes made in the child processes (shared node
+  # results, memoized contents and keys removed from the items) are applied
+  # in the current process, so that the results are the same as in the
+  # serial execution (the items that fail in the pool are prepared again in
+  # the current process, and the reasons are in parallel_fallbacks)
+  processes = run_info.get('processes')
+  max_errors = run_info.get('max_errors')
+
+  if (not processes) or (processes <= 1):
+    result = list()
+    errors_amount = 0
+
+    for item in (items or []):
+      info = prepare_item(item)
+      result += [info]
+
+      if max_errors:
+        errors_amount += count_errors(info.get('error_msgs'))
+
+        if errors_amount >= max_errors:
+          break
+
+    return result
+
+  content_memo = run_info.get('content_memo')
+  shared_dicts = [
+      run_info.get('shared_node_results'),
+      content_memo.setdefault('results', dict()) if (content_memo is not None) else None,
+  ]
+  memo_counters = ['hits', 'misses']
+
+  def run_item(item):
+    item_dict = item if isinstance(item, dict) else dict()
+    known_keys = [set((shared_dict or dict()).keys()) for shared_dict in shared_dicts]
+    item_keys = [key for key in (removed_keys or []) if key in item_dict]
+    counters = [(content_memo or dict()).get(key) or 0 for key in memo_counters]
+
+    info = prepare_item(item)
+
+    new_results = [
+        dict(
+            (key, value)
+            for key, value in (shared_dict or dict()).items()
+            if key not in known_keys[idx]
+        )
+        for idx, shared_dict in enumerate(shared_dicts)
+    ]
+    new_counters = [
+        ((content_memo or dict()).get(key) or 0) - counters[idx]
+        for idx, key in enumerate(memo_counters)
+    ]
+    item_removed_keys = [key for key in item_keys if key not in item_dict]
+
+    return (os.getpid(), info, new_results, new_counters, item_removed_keys)
+
+  result = list()
+  items = list(items or [])
+  pid = os.getpid()
+
+  item_results = map_parallel(
+      run_item, items, processes, fallbacks=run_info.get('parallel_fallbacks')
+  )
+
+  for item, item_result in zip(items, item_results):
+    item_pid, info, new_results, new_counters, item_removed_keys = item_result
+
+    if item_pid == pid:
+      # prepared in the current process (serial fallback)
+      result += [info]
+      continue
+
+    for idx, shared_dict in enumerate(shared_dicts):
+      if new_results[idx] and (shared_dict is not None):
+        shared_dict.update(new_results[idx])
+
+    if content_memo is not None:
+      for idx, key in enumerate(memo_counters):
+        content_memo[key] = (content_memo.get(key) or 0) + new_counters[idx]
+
+    for key in item_removed_keys:
+      item.pop(key, None)
+
+    result += [info]
+
+  return result
+
+
 def prepare_service(service_info, run_info, parent_description=None, service_names=None):
   result = dict()
   error_msgs = list()
@@ -186,9 +299,8 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
                   sorted(list(allowed_keys)),
               ]]
 
-        for value in (error_msgs_aux or []):
-          new_value = [str('service: ' + service_description)] + value
-          error_msgs += [new_value]
+        if error_msgs_aux:
+          error_msgs += error_with_context([str('service: ' + service_description)], error_msgs_aux)
 
         error_msgs_aux = []
 
@@ -211,7 +323,7 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
           if validate_ctx:
             task_file = (base_dir_prefix + task) or ''
 
-            if not os.path.exists(task_file):
+            if not path_exists(task_file):
               error_msgs_aux += [[str('task file not found: ' + task_file)]]
 
           params_dicts = dict(
@@ -237,9 +349,7 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
           service_validators = list()
 
           if error_msgs_aux_mixed_data:
-            for value in (error_msgs_aux_mixed_data or []):
-              new_value = ['context: mixed data'] + value
-              error_msgs_aux += [new_value]
+            error_msgs_aux += error_with_context(['context: mixed data'], error_msgs_aux_mixed_data)
           else:
             result['credentials'] = mixed_data.get('credentials')
             result['params'] = mixed_data.get('params')
@@ -261,6 +371,7 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
                     'params',
                     'dynamic_params',
                 ],
+                max_errors=run_info.get('max_errors'),
             )
 
             info = validate_ctx_schema(
@@ -286,9 +397,11 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
             )
             result['validators'] = service_validators or None
 
-          for value in (error_msgs_aux or []):
-            new_value = [str('service: ' + service_description)] + value
-            error_msgs += [new_value]
+          if error_msgs_aux:
+            error_msgs += error_with_context(
+                [str('service: ' + service_description)],
+                error_msgs_aux,
+            )
         else:
           single = service_info_dict.get('single')
 
@@ -297,9 +410,11 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
                 'msg: service should not be a list (single)',
             ]]
 
-          for value in (error_msgs_aux or []):
-            new_value = [str('service: ' + service_description)] + value
-            error_msgs += [new_value]
+          if error_msgs_aux:
+            error_msgs += error_with_context(
+                [str('service: ' + service_description)],
+                error_msgs_aux,
+            )
 
           services = service.get('services')
           services_list = list()
@@ -328,10 +443,11 @@ def prepare_service(service_info, run_info, parent_description=None, service_nam
             services_list = info.get('result')
             error_msgs_children = info.get('error_msgs') or list()
 
-            for value in (error_msgs_children or []):
-              new_value = [
-                  str('service (parent): ' + service_description)] + value
-              error_msgs += [new_value]
+            if error_msgs_children:
+              error_msgs += error_with_context(
+                  [str('service (parent): ' + service_description)],
+                  error_msgs_children,
+              )
 
           result['is_list'] = True
           result['services'] = services_list
@@ -379,6 +495,9 @@ def prepare_services(services, run_info, parent_description=None, service_names=
         error_msgs += [['msg: no service specified for the environment']]
       else:
         for service_info in services:
+          if is_error_budget_reached(run_info.get('max_errors'), error_msgs):
+            break
+
           info = prepare_service(
               service_info,
               run_info=run_info,
@@ -499,12 +618,14 @@ def prepare_transfer_content(transfer_contents, context_title, prepare_info, inp
 
               result += [result_item]
 
-          for value in error_msgs_aux_item:
-            new_value = [
-                str('content: #' + str(idx + 1)),
-                str('dest: ' + dest),
-            ] + value
-            error_msgs_aux += [new_value]
+          if error_msgs_aux_item:
+            error_msgs_aux += error_with_context(
+                [
+                    str('content: #' + str(idx + 1)),
+                    str('dest: ' + dest),
+                ],
+                error_msgs_aux_item,
+            )
       except Exception as error:
         error_msgs_aux += [[
             str('content: #' + str(idx + 1)),
@@ -515,9 +636,8 @@ def prepare_transfer_content(transfer_contents, context_title, prepare_info, inp
             traceback.format_exc().split('\n'),
         ]]
 
-    for value in error_msgs_aux:
-      new_value = [str('context: ' + (context_title or ''))] + value
-      error_msgs += [new_value]
+    if error_msgs_aux:
+      error_msgs += error_with_context([str('context: ' + (context_title or ''))], error_msgs_aux)
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -730,7 +850,7 @@ def prepare_pod(pod_info, parent_data, run_info):
           if pod_ctx_file:
             pod_ctx_file_full = (base_dir_prefix + pod_ctx_file) or ''
 
-            if not os.path.exists(pod_ctx_file_full):
+            if not path_exists(pod_ctx_file_full):
               error_msgs_aux += [[str('pod ctx file not found: ' + pod_ctx_file)]]
 
         all_content_dests = set()
@@ -819,6 +939,8 @@ def prepare_pod(pod_info, parent_data, run_info):
             ctx_info=pod_ctx_info,
         )
 
+        # not shared between the node variants (unlike the node mixed data),
+        # because it's cheaper to prepare it again than to copy it
         info = prepare_mixed_data(
             context_full_info, params_dicts, run_info
         )
@@ -827,9 +949,7 @@ def prepare_pod(pod_info, parent_data, run_info):
         error_msgs_aux_mixed_data = info.get('error_msgs')
 
         if error_msgs_aux_mixed_data:
-          for value in (error_msgs_aux_mixed_data or []):
-            new_value = ['context: mixed data'] + value
-            error_msgs_aux += [new_value]
+          error_msgs_aux += error_with_context(['context: mixed data'], error_msgs_aux_mixed_data)
         else:
           result['credentials'] = mixed_data.get('credentials')
           result['params'] = mixed_data.get('params')
@@ -848,6 +968,7 @@ def prepare_pod(pod_info, parent_data, run_info):
               base_dir_prefix=base_dir_prefix,
               dict_to_validate=schema_data,
               all_props=True,
+              max_errors=run_info.get('max_errors'),
           )
 
           info = validate_ctx_schema(
@@ -897,9 +1018,8 @@ def prepare_pod(pod_info, parent_data, run_info):
             ]]
             error_msgs_aux += error_msgs_validate
 
-        for value in (error_msgs_aux or []):
-          new_value = [str('pod: ' + pod_description)] + value
-          error_msgs += [new_value]
+        if error_msgs_aux:
+          error_msgs += error_with_context([str('pod: ' + pod_description)], error_msgs_aux)
 
       result_keys = list(result.keys())
 
@@ -935,8 +1055,15 @@ def prepare_pods(pods, parent_data, run_info):
     pod_names = set()
 
     if pods:
-      for pod_info in pods:
-        info = prepare_pod(pod_info, parent_data, run_info)
+      infos = prepare_items(
+          pods,
+          lambda pod_info: prepare_pod(pod_info, parent_data, run_info),
+          run_info,
+      )
+
+      for info in infos:
+        if is_error_budget_reached(run_info.get('max_errors'), error_msgs):
+          break
 
         result_aux = info.get('result')
         error_msgs_aux = info.get('error_msgs') or list()
@@ -1187,17 +1314,19 @@ def prepare_node(node_info, run_info, local=None):
             ctx_info=None,
         )
 
-        info = prepare_mixed_data(
-            context_full_info, params_dicts, run_info
+        info = get_shared_node_result(
+            run_info,
+            ('node_mixed_data', id(node), id(node_info)),
+            lambda: prepare_mixed_data(
+                context_full_info, params_dicts, run_info
+            ),
         )
 
         mixed_data = info.get('result')
         error_msgs_aux_mixed_data = info.get('error_msgs')
 
         if error_msgs_aux_mixed_data:
-          for value in (error_msgs_aux_mixed_data or []):
-            new_value = ['context: mixed data'] + value
-            error_msgs_aux += [new_value]
+          error_msgs_aux += error_with_context(['context: mixed data'], error_msgs_aux_mixed_data)
         else:
           result['credentials'] = mixed_data.get('credentials')
           result['params'] = mixed_data.get('params')
@@ -1374,15 +1503,20 @@ def prepare_node(node_info, run_info, local=None):
             service_info['single'] = True
             service_info['params'] = service_params
 
-            info = prepare_service(service_info, run_info=run_info)
+            info = get_shared_node_result(
+                run_info,
+                ('node_service', id(node), id(node_info)),
+                lambda: prepare_service(service_info, run_info=run_info),
+            )
 
             prepared_service = info.get('result')
             error_msgs_aux_services = info.get('error_msgs') or list()
 
             if error_msgs_aux_services:
-              for value in error_msgs_aux_services:
-                new_value = ['context: prepare node service'] + value
-                error_msgs_aux += [new_value]
+              error_msgs_aux += error_with_context(
+                  ['context: prepare node service'],
+                  error_msgs_aux_services,
+              )
             else:
               result['prepared_service'] = prepared_service
               validators = prepared_service.get('validators')
@@ -1430,15 +1564,18 @@ def prepare_node(node_info, run_info, local=None):
             result['prepared_dns_service'] = service_info
 
             if validate_ctx:
-              info = prepare_service(
-                  service_info, run_info=run_info
+              info = get_shared_node_result(
+                  run_info,
+                  ('node_dns_service', id(node), id(node_info)),
+                  lambda: prepare_service(service_info, run_info=run_info),
               )
               prepared_node_dns_service = info.get('result')
               error_msgs_aux_service = info.get('error_msgs')
 
-              for value in (error_msgs_aux_service or []):
-                new_value = ['context: node dns service'] + value
-                error_msgs_aux += [new_value]
+              error_msgs_aux += error_with_context(
+                  ['context: node dns service'],
+                  error_msgs_aux_service,
+              )
 
               if not error_msgs_aux_service:
                 validators = prepared_node_dns_service.get('validators') or []
@@ -1501,9 +1638,10 @@ def prepare_node(node_info, run_info, local=None):
         general_data = info.get('result')
         error_msgs_general_data = info.get('error_msgs')
 
-        for value in (error_msgs_general_data or []):
-          new_value = ['context: get general node data'] + value
-          error_msgs_aux += [new_value]
+        error_msgs_aux += error_with_context(
+            ['context: get general node data'],
+            error_msgs_general_data,
+        )
 
         result['general_data'] = general_data
 
@@ -1603,6 +1741,7 @@ def prepare_node(node_info, run_info, local=None):
           task_data = dict(
               dict_to_validate=schema_data,
               all_props=True,
+              max_errors=run_info.get('max_errors'),
           )
           schema_files = node.get('schema') or []
           schema_files = ['schemas/node.schema.yml'] + schema_files
@@ -1651,9 +1790,8 @@ def prepare_node(node_info, run_info, local=None):
           )
           result['validators'] = node_validators or None
 
-        for value in (error_msgs_aux or []):
-          new_value = [str('node: ' + node_description)] + value
-          error_msgs += [new_value]
+        if error_msgs_aux:
+          error_msgs += error_with_context([str('node: ' + node_description)], error_msgs_aux)
 
       result_keys = list(result.keys())
 
@@ -1736,8 +1874,16 @@ def prepare_nodes(nodes, run_info, local=None):
     node_names = set()
 
     if nodes:
-      for node_info in nodes:
-        info = prepare_node(node_info, run_info, local)
+      infos = prepare_items(
+          nodes,
+          lambda node_info: prepare_node(node_info, run_info, local),
+          run_info,
+          removed_keys=['tmp', 'can_destroy'],
+      )
+
+      for info in infos:
+        if is_error_budget_reached(run_info.get('max_errors'), error_msgs):
+          break
 
         result_aux = info.get('result')
         error_msgs_aux = info.get('error_msgs') or list()
@@ -1924,9 +2070,7 @@ def prepare_task(task_info_dict, run_info):
       error_msgs_aux_mixed_data = info.get('error_msgs')
 
       if error_msgs_aux_mixed_data:
-        for value in (error_msgs_aux_mixed_data or []):
-          new_value = ['context: mixed data'] + value
-          error_msgs_aux += [new_value]
+        error_msgs_aux += error_with_context(['context: mixed data'], error_msgs_aux_mixed_data)
       else:
         result['credentials'] = mixed_data.get('credentials')
         result['params'] = mixed_data.get('params')
@@ -1965,6 +2109,7 @@ def prepare_task(task_info_dict, run_info):
               base_dir_prefix=base_dir_prefix,
               dict_to_validate=result,
               prop_names=['params', 'credentials', 'contents'],
+              max_errors=run_info.get('max_errors'),
           )
 
           info = validate_ctx_schema(
@@ -1984,9 +2129,11 @@ def prepare_task(task_info_dict, run_info):
           task_validators += validators
           error_msgs_validate += (info.get('error_msgs') or [])
 
-          for value in (error_msgs_validate or []):
-            new_value = [str('target origin: ' + task_target_origin)] + value
-            error_msgs_aux += [new_value]
+          if error_msgs_validate:
+            error_msgs_aux += error_with_context(
+                [str('target origin: ' + task_target_origin)],
+                error_msgs_validate,
+            )
 
         task_validators = update_validators_descriptions(
             'task [' + str(task_description) + ']',
@@ -1994,9 +2141,8 @@ def prepare_task(task_info_dict, run_info):
         )
         result['validators'] = task_validators or None
 
-      for value in (error_msgs_aux or []):
-        new_value = [str('task: ' + task_description)] + value
-        error_msgs += [new_value]
+      if error_msgs_aux:
+        error_msgs += error_with_context([str('task: ' + task_description)], error_msgs_aux)
 
       result_keys = list(result.keys())
 
@@ -2223,9 +2369,10 @@ def prepare_run_stage_task(run_stage_task_info, run_stage_data):
         error_msgs_aux = info.get('error_msgs') or list()
 
         if error_msgs_aux:
-          for value in error_msgs_aux:
-            new_value = ['run_stage_task: ' + run_stage_task_name] + value
-            error_msgs += [new_value]
+          error_msgs += error_with_context(
+              ['run_stage_task: ' + run_stage_task_name],
+              error_msgs_aux,
+          )
         else:
           task = result_aux
           when = task.get('when')
@@ -2248,7 +2395,7 @@ def prepare_run_stage_task(run_stage_task_info, run_stage_data):
                     else env_data.get('env_dir') + '/' + task_file
                 ) or ''
 
-                if not os.path.exists(task_file_full):
+                if not path_exists(task_file_full):
                   error_msgs_aux += [[str('msg: task file not found: ' + task_file)]]
               else:
                 task_file_paths = set()
@@ -2272,6 +2419,7 @@ def prepare_run_stage_task(run_stage_task_info, run_stage_data):
                         base_dir_prefix=base_dir_prefix,
                         dict_to_validate=task,
                         prop_names=['params', 'credentials', 'contents'],
+                        max_errors=run_info.get('max_errors'),
                     )
 
                     info = validate_ctx_schema(
@@ -2300,28 +2448,32 @@ def prepare_run_stage_task(run_stage_task_info, run_stage_data):
                     task_file_path = base_dir_prefix + task_file
 
                     if task_file_path not in task_file_paths:
-                      if not os.path.exists(task_file_path):
+                      if not path_exists(task_file_path):
                         error_msgs_aux_pod += [[
                             str('msg: pod task file not found: ' + task_file),
                         ]]
 
                       task_file_paths.add(task_file_path)
 
-                    for value in error_msgs_aux_pod:
-                      new_value = [
-                          str('node: ' + node_description),
-                          str('pod: ' + pod_description),
-                      ] + value
-                      error_msgs_aux += [new_value]
+                    if error_msgs_aux_pod:
+                      error_msgs_aux += error_with_context(
+                          [
+                              str('node: ' + node_description),
+                              str('pod: ' + pod_description),
+                          ],
+                          error_msgs_aux_pod,
+                      )
 
-              for value in error_msgs_aux:
-                new_value = [
-                    str('run_stage_task: ' + run_stage_task_name),
-                    str('task: ' + task_description),
-                    str('task_type: ' + task_type),
-                    str('task_target_origin: ' + task_target_origin),
-                ] + value
-                error_msgs += [new_value]
+              if error_msgs_aux:
+                error_msgs += error_with_context(
+                    [
+                        str('run_stage_task: ' + run_stage_task_name),
+                        str('task: ' + task_description),
+                        str('task_type: ' + task_type),
+                        str('task_target_origin: ' + task_target_origin),
+                    ],
+                    error_msgs_aux,
+                )
 
               validators = task.get('validators') or list()
               task_validators += validators
@@ -2430,6 +2582,9 @@ def prepare_run_stage(run_stage_info, default_name, prepared_nodes, run_info):
       task_names = set()
 
       for idx, run_stage_task in enumerate(run_stage_tasks_input or []):
+        if is_error_budget_reached(run_info.get('max_errors'), error_msgs):
+          break
+
         default_task_name = str(idx + 1)
         run_stage_data = dict(
             default_task_name=default_task_name,
@@ -2445,9 +2600,7 @@ def prepare_run_stage(run_stage_info, default_name, prepared_nodes, run_info):
         error_msgs_aux = info.get('error_msgs') or list()
 
         if error_msgs_aux:
-          for value in (error_msgs_aux or []):
-            new_value = ['run_stage: ' + run_stage_name] + value
-            error_msgs += [new_value]
+          error_msgs += error_with_context(['run_stage: ' + run_stage_name], error_msgs_aux)
         else:
           run_stage_task = result_aux
 
@@ -2529,6 +2682,9 @@ def prepare_run_stages(run_stages, prepared_nodes, run_info):
 
   try:
     for idx, run_stage_info in enumerate(run_stages or []):
+      if is_error_budget_reached(run_info.get('max_errors'), error_msgs):
+        break
+
       default_name = str(idx + 1)
       info = prepare_run_stage(
           run_stage_info,
@@ -2556,6 +2712,120 @@ def prepare_run_stages(run_stages, prepared_nodes, run_info):
     return dict(error_msgs=error_msgs)
 
 
+def is_node_connection_valid(node, env_info):
+  node_name = node.get('name')
+  local_node = node.get('local')
+
+  local_connection = env_info.get('local_connection')
+  instance_type = env_info.get('instance_type')
+  env_node_name = env_info.get('env_node')
+
+  valid = (
+      (
+          (local_node and local_connection)
+          or
+          (
+              (not local_node)
+              and
+              (node_name == instance_type)
+          )
+      )
+      and
+      ((not env_node_name) or (env_node_name == node_name))
+  )
+
+  return valid
+
+
+def prepare_host_ctx(ctx_data, env_info):
+  # the controller (local connection) needs the entire context
+  if (not ctx_data) or (not env_info) or env_info.get('local_connection'):
+    return ctx_data
+
+  result = ctx_data.copy()
+  instance_type = env_info.get('instance_type')
+
+  # only used in the controller
+  for key in [
+      'local_nodes',
+      'initial_services',
+      'prepared_initial_services',
+      'final_services',
+      'prepared_final_services',
+      'validators',
+  ]:
+    result.pop(key, None)
+
+  if ctx_data.get('nodes') is not None:
+    result['nodes'] = [
+        node
+        for node in ctx_data.get('nodes')
+        if is_node_connection_valid(node, env_info)
+    ]
+
+  node_dict_dependencies = ctx_data.get('node_dict_dependencies')
+
+  if node_dict_dependencies is not None:
+    result['node_dict_dependencies'] = dict([
+        (node_name, info)
+        for node_name, info in node_dict_dependencies.items()
+        if (
+            (node_name == instance_type)
+            or
+            ((not instance_type) and (info or dict()).get('local'))
+        )
+    ])
+
+  run_stages = ctx_data.get('run_stages')
+
+  if run_stages is not None:
+    host_run_stages = list()
+
+    # the run stages are kept (even without tasks) because they are
+    # referenced by index
+    for run_stage in run_stages:
+      host_run_stage = run_stage.copy()
+      host_tasks = list()
+
+      for task in (run_stage.get('tasks') or []):
+        task_nodes = [
+            node
+            for node in (task.get('nodes') or [])
+            if is_node_connection_valid(node, env_info)
+        ]
+
+        if task_nodes:
+          host_task = task.copy()
+          host_task['nodes'] = task_nodes
+          host_tasks += [host_task]
+
+      if run_stage.get('tasks') is not None:
+        host_run_stage['tasks'] = host_tasks
+
+      host_run_stages += [host_run_stage]
+
+    result['run_stages'] = host_run_stages
+
+  return result
+
+
+def get_ctx_key(ctx_name, env_data, services_data, validate):
+  # identifies the inputs of the ctx generation, so that a ctx generated
+  # for a host can be reused by other hosts with the same inputs
+  # (the vault encrypted values are identified by their ciphertext, and no key
+  # is returned when the inputs can't be serialized, so the ctx is not reused)
+  try:
+    content = json.dumps(
+        [ctx_name, env_data, services_data or dict(), bool(validate)],
+        sort_keys=True,
+        default=content_key_default,
+    )
+  except (TypeError, ValueError):
+    return None
+
+  return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
 def prepare_ctx(ctx_name, run_info):
   result = dict()
   error_msgs = list()
@@ -2563,6 +2833,7 @@ def prepare_ctx(ctx_name, run_info):
   try:
     env_data = run_info.get('env_data')
     validate_ctx = run_info.get('validate')
+    max_errors = run_info.get('max_errors')
 
     if not env_data:
       error_msgs += [['msg: env_data property not specified']]
@@ -2642,7 +2913,7 @@ def prepare_ctx(ctx_name, run_info):
           for key in sorted(list(hooks.keys())):
             hook_file = hooks.get(key) or ''
 
-            if not os.path.exists(hook_file):
+            if not path_exists(hook_file):
               error_msgs += [[
                   'context: validate ctx hooks',
                   str('hook: ' + key),
@@ -2663,9 +2934,7 @@ def prepare_ctx(ctx_name, run_info):
           result_aux = info.get('result')
           error_msgs_aux = info.get('error_msgs') or list()
 
-          for value in (error_msgs_aux or []):
-            new_value = ['service context: initial services'] + value
-            error_msgs += [new_value]
+          error_msgs += error_with_context(['service context: initial services'], error_msgs_aux)
 
           if not error_msgs_aux:
             prepared_initial_services = result_aux
@@ -2685,8 +2954,13 @@ def prepare_ctx(ctx_name, run_info):
         prepared_nodes = []
         nodes_errors = []
 
-        if ctx_nodes:
-          info = prepare_nodes(ctx_nodes, run_info)
+        if ctx_nodes and not is_error_budget_reached(max_errors, error_msgs):
+          # the local nodes are prepared from the same nodes, so the parts
+          # that don't depend on the node being local are shared
+          nodes_run_info = merge_dicts(
+              run_info, dict(shared_node_results=dict())
+          )
+          info = prepare_nodes(ctx_nodes, nodes_run_info)
 
           result_aux = info.get('result')
           error_msgs_aux = info.get('error_msgs') or list()
@@ -2703,7 +2977,7 @@ def prepare_ctx(ctx_name, run_info):
                 validators = item.get('validators') or list()
                 ctx_validators += validators
 
-            info = prepare_nodes(ctx_nodes, run_info, local=True)
+            info = prepare_nodes(ctx_nodes, nodes_run_info, local=True)
 
             result_aux = info.get('result')
             error_msgs_aux = info.get('error_msgs') or list()
@@ -2754,9 +3028,10 @@ def prepare_ctx(ctx_name, run_info):
               if error_msgs_aux:
                 nodes_errors = error_msgs_aux
 
-                for value in error_msgs_aux:
-                  new_value = ['context: prepare node dependencies'] + value
-                  error_msgs += [new_value]
+                error_msgs += error_with_context(
+                    ['context: prepare node dependencies'],
+                    error_msgs_aux,
+                )
               else:
                 result['node_dict_dependencies'] = node_dict_dependencies
 
@@ -2794,7 +3069,7 @@ def prepare_ctx(ctx_name, run_info):
 
         ctx_final_services = ctx.get('final_services')
 
-        if ctx_final_services:
+        if ctx_final_services and not is_error_budget_reached(max_errors, error_msgs):
           info = prepare_services(
               ctx_final_services,
               run_info=run_info,
@@ -2803,9 +3078,7 @@ def prepare_ctx(ctx_name, run_info):
           result_aux = info.get('result')
           error_msgs_aux = info.get('error_msgs') or list()
 
-          for value in (error_msgs_aux or []):
-            new_value = ['service context: final services'] + value
-            error_msgs += [new_value]
+          error_msgs += error_with_context(['service context: final services'], error_msgs_aux)
 
           if not error_msgs_aux:
             prepared_final_services = result_aux
@@ -2823,7 +3096,7 @@ def prepare_ctx(ctx_name, run_info):
 
         run_stages = ctx.get('run_stages')
 
-        if run_stages:
+        if run_stages and not is_error_budget_reached(max_errors, error_msgs):
           if not prepared_nodes:
             if not nodes_errors:
               error_msgs += [[
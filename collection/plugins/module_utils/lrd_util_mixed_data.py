@@ -16,19 +16,126 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type  # pylint: disable=invalid-name
 
-import os
+import hashlib
+import json
 import traceback
+import weakref
+import yaml
 
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
-    is_str, load_file, load_cached_file, merge_dicts
+    error_with_context, is_error_budget_reached, is_str, load_file, load_cached_file,
+    merge_overlay, path_exists, to_plain_dict
 )
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_params_mixer import mix
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_params_mixer import mix_overlay
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import validate_schema
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_template import lookup
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation import (
     validate_ctx_schema, get_validators
 )
 
+from ansible.module_utils._text import to_text
+from ansible.parsing.yaml import objects as yaml_objects
+from ansible.parsing.yaml.dumper import AnsibleDumper
+
+# in ansible-core 2.19+ the class is only a deprecated alias (the vault values
+# are instances of another class, that already decrypts its content only once)
+AnsibleVaultEncryptedUnicode = getattr(yaml_objects, 'AnsibleVaultEncryptedUnicode')
+
+# lazy secrets already created for the vault encrypted values (by id), kept
+# only while the secrets are in use
+lazy_secrets = weakref.WeakValueDictionary()
+secrets_stats = dict(decrypted=0, hits=0)
+
+
+class LazyVaultSecret(AnsibleVaultEncryptedUnicode):
+  """
+  Vault encrypted value that is decrypted only when its content is first
+  accessed, and then kept in the instance, instead of being decrypted again
+  in every access (as in the base class). The amount of values actually
+  decrypted is in secrets_stats.
+  """
+
+  def __init__(self, source):
+    super(LazyVaultSecret, self).__init__(b'')
+
+    # same state (ciphertext, vault and position) of the source value
+    vars(self).update(vars(source))
+    self.source = source
+    self.plaintext = None
+
+  def __reduce__(self):
+    # the decrypted content is never serialized
+    return (LazyVaultSecret, (self.source,))
+
+  def __copy__(self):
+    # immutable, so the copies share the instance (and the decrypted content)
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  @property
+  def data(self):
+    if not self.vault:
+      return self.source.data
+
+    if self.plaintext is None:
+      self.plaintext = self.source.data
+      secrets_stats['decrypted'] += 1
+    else:
+      secrets_stats['hits'] += 1
+
+    return self.plaintext
+
+
+# the lazy secrets are dumped as the vault encrypted values (with the ciphertext)
+vault_representer = (
+    getattr(AnsibleDumper, 'yaml_representers', None) or dict()
+).get(AnsibleVaultEncryptedUnicode)
+
+if vault_representer is not None:
+  yaml.add_representer(LazyVaultSecret, vault_representer, Dumper=AnsibleDumper)
+
+
+def to_lazy_secrets(value):
+  # replaces the vault encrypted values (in dicts and lists) with lazy
+  # secrets, without decrypting them (the containers without encrypted
+  # values are returned as they are)
+  if isinstance(value, LazyVaultSecret):
+    return value
+  elif isinstance(value, AnsibleVaultEncryptedUnicode):
+    secret = lazy_secrets.get(id(value))
+
+    if (secret is None) or (secret.source is not value):
+      secret = LazyVaultSecret(value)
+      lazy_secrets[id(value)] = secret
+
+    return secret
+  elif isinstance(value, dict):
+    new_items = [(key, item, to_lazy_secrets(item)) for key, item in value.items()]
+
+    if all(item is new_item for _, item, new_item in new_items):
+      return value
+
+    return dict((key, new_item) for key, _, new_item in new_items)
+  elif isinstance(value, list):
+    new_items = [to_lazy_secrets(item) for item in value]
+
+    if all(item is new_item for item, new_item in zip(value, new_items)):
+      return value
+
+    return new_items
+
+  return value
+
+
+def get_secrets_stats():
+  return dict(
+      decrypted=secrets_stats['decrypted'],
+      hits=secrets_stats['hits'],
+      cached=len(lazy_secrets),
+  )
+
 
 def prepare_mixed_data(context_full_info, params_dicts, run_info):
   result = dict()
@@ -42,9 +149,7 @@ def prepare_mixed_data(context_full_info, params_dicts, run_info):
     result_aux = info.get('result') or dict()
     error_msgs_aux = info.get('error_msgs') or list()
 
-    for value in (error_msgs_aux or []):
-      new_value = ['context: mixed data (credentials)'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: mixed data (credentials)'], error_msgs_aux)
 
     if not error_msgs_aux:
       result['credentials'] = result_aux.get('credentials') or None
@@ -56,9 +161,7 @@ def prepare_mixed_data(context_full_info, params_dicts, run_info):
     result_aux = info.get('result')
     error_msgs_aux = info.get('error_msgs') or list()
 
-    for value in (error_msgs_aux or []):
-      new_value = ['context: mixed data (params)'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: mixed data (params)'], error_msgs_aux)
 
     if not error_msgs_aux:
       result['params'] = result_aux.get('params') or None
@@ -70,9 +173,7 @@ def prepare_mixed_data(context_full_info, params_dicts, run_info):
     result_aux = info.get('result')
     error_msgs_aux = info.get('error_msgs') or list()
 
-    for value in (error_msgs_aux or []):
-      new_value = ['context: mixed data (contents)'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: mixed data (contents)'], error_msgs_aux)
 
     if not error_msgs_aux:
       result['contents'] = result_aux.get('contents') or None
@@ -159,14 +260,12 @@ def prepare_mixed_credentials(context_full_info, run_info):
           group_params_dict=credentials_env_dict,
       )
 
-      info = mix(params_args)
+      info = mix_overlay(params_args)
 
       result_aux_ctx_info = info.get('result')
       error_msgs_aux_ctx_info = info.get('error_msgs') or list()
 
-      for value in (error_msgs_aux_ctx_info or []):
-        new_value = ['context: ctx info params'] + value
-        error_msgs_aux += [new_value]
+      error_msgs_aux += error_with_context(['context: ctx info params'], error_msgs_aux_ctx_info)
 
     ### Credentials - Info ###
 
@@ -214,14 +313,12 @@ def prepare_mixed_credentials(context_full_info, run_info):
           group_params_dict=credentials_env_dict,
       )
 
-      info = mix(params_args)
+      info = mix_overlay(params_args)
 
       result_aux_info = info.get('result')
       error_msgs_aux_info = info.get('error_msgs') or list()
 
-      for value in (error_msgs_aux_info or []):
-        new_value = ['context: info credentials'] + value
-        error_msgs_aux += [new_value]
+      error_msgs_aux += error_with_context(['context: info credentials'], error_msgs_aux_info)
 
     ### Credentials - Main ###
 
@@ -263,20 +360,18 @@ def prepare_mixed_credentials(context_full_info, run_info):
         group_params_dict=credentials_env_dict,
     )
 
-    info = mix(params_args)
+    info = mix_overlay(params_args)
 
     result_aux = info.get('result')
     error_msgs_aux += info.get('error_msgs') or list()
 
-    for value in error_msgs_aux:
-      new_value = ['context: credentials'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: credentials'], error_msgs_aux)
 
     if not error_msgs:
-      credentials = merge_dicts(
+      credentials = merge_overlay(
           result_aux, result_aux_info, result_aux_ctx_info
       )
-      result['credentials'] = credentials or None
+      result['credentials'] = to_lazy_secrets(to_plain_dict(credentials)) or None
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -354,7 +449,7 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
             dynamic_params_info[param_key] = param_value
 
       params_args = dict(
-          params=merge_dicts(dynamic_params_info, params_ctx_info_dict),
+          params=merge_overlay(dynamic_params_info, params_ctx_info_dict),
           group_params=context_ctx_info.get('group_params'),
           shared_params=context_ctx_info.get('shared_params'),
           shared_group_params=context_ctx_info.get('shared_group_params'),
@@ -363,14 +458,12 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
           group_params_dict=group_params_dict,
       )
 
-      info = mix(params_args)
+      info = mix_overlay(params_args)
 
       result_aux_ctx_info = info.get('result')
       error_msgs_aux_ctx_info = info.get('error_msgs') or list()
 
-      for value in (error_msgs_aux_ctx_info or []):
-        new_value = ['context: ctx info params'] + value
-        error_msgs_aux += [new_value]
+      error_msgs_aux += error_with_context(['context: ctx info params'], error_msgs_aux_ctx_info)
 
     ### Params - Info ###
 
@@ -413,7 +506,7 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
             dynamic_params_info[param_key] = param_value
 
       params_args = dict(
-          params=merge_dicts(dynamic_params_info, params_info_dict),
+          params=merge_overlay(dynamic_params_info, params_info_dict),
           group_params=context_info.get('group_params'),
           shared_params=context_info.get('shared_params'),
           shared_group_params=context_info.get(
@@ -424,14 +517,12 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
           group_params_dict=group_params_dict,
       )
 
-      info = mix(params_args)
+      info = mix_overlay(params_args)
 
       result_aux_info = info.get('result')
       error_msgs_aux_info = info.get('error_msgs') or list()
 
-      for value in (error_msgs_aux_info or []):
-        new_value = ['context: service info params'] + value
-        error_msgs_aux += [new_value]
+      error_msgs_aux += error_with_context(['context: service info params'], error_msgs_aux_info)
 
     ### Params - Main ###
 
@@ -468,7 +559,7 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
           dynamic_params[param_key] = param_value
 
     params_args = dict(
-        params=merge_dicts(dynamic_params, params_dict),
+        params=merge_overlay(dynamic_params, params_dict),
         group_params=context_data.get('group_params'),
         shared_params=context_data.get('shared_params'),
         shared_group_params=context_data.get('shared_group_params'),
@@ -477,18 +568,16 @@ def prepare_mixed_params(context_full_info, params_dicts, run_info):
         group_params_dict=group_params_dict,
     )
 
-    info = mix(params_args)
+    info = mix_overlay(params_args)
 
     result_aux = info.get('result')
     error_msgs_aux += info.get('error_msgs') or list()
 
-    for value in error_msgs_aux:
-      new_value = ['context: params'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: params'], error_msgs_aux)
 
     if not error_msgs:
-      params = merge_dicts(result_aux, result_aux_info, result_aux_ctx_info)
-      result['params'] = params or None
+      params = merge_overlay(result_aux, result_aux_info, result_aux_ctx_info)
+      result['params'] = to_plain_dict(params) or None
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -523,6 +612,9 @@ def prepare_mixed_loaded_contents(context_full_info, run_info):
       prepared_contents = dict()
 
       for content_key in sorted(list((contents or dict()).keys())):
+        if is_error_budget_reached(run_info.get('max_errors'), error_msgs_aux):
+          break
+
         content = contents.get(content_key)
 
         info = load_content(content, env=env, run_info=run_info)
@@ -533,16 +625,16 @@ def prepare_mixed_loaded_contents(context_full_info, run_info):
         validators += validators
         error_msgs_aux_content = info.get('error_msgs') or list()
 
-        for value in (error_msgs_aux_content or []):
-          new_value = [str('content: ' + content_key)] + value
-          error_msgs_aux += [new_value]
+        if error_msgs_aux_content:
+          error_msgs_aux += error_with_context(
+              [str('content: ' + content_key)],
+              error_msgs_aux_content,
+          )
 
         if not error_msgs_aux_content:
           prepared_contents[content_key] = prepared_content
 
-      for value in error_msgs_aux:
-        new_value = ['context: load contents'] + value
-        error_msgs += [new_value]
+      error_msgs += error_with_context(['context: load contents'], error_msgs_aux)
 
       if not error_msgs:
         result['contents'] = prepared_contents or None
@@ -622,7 +714,7 @@ def prepare_mixed_contents(context_full_info, run_info):
                 params=dict(value=content_value)
             )
 
-      result_aux_ctx_info = merge_dicts(
+      result_aux_ctx_info = merge_overlay(
           dynamic_contents_info, contents_ctx_info_dict)
 
     ### Contents - Info ###
@@ -668,7 +760,7 @@ def prepare_mixed_contents(context_full_info, run_info):
                 params=dict(value=content_value)
             )
 
-      result_aux_info = merge_dicts(dynamic_contents_info, contents_info_dict)
+      result_aux_info = merge_overlay(dynamic_contents_info, contents_info_dict)
 
     ### Contents - Main ###
 
@@ -707,16 +799,14 @@ def prepare_mixed_contents(context_full_info, run_info):
               params=dict(value=content_value)
           )
 
-    result_aux = merge_dicts(dynamic_contents, contents_dict)
+    result_aux = merge_overlay(dynamic_contents, contents_dict)
 
-    contents = merge_dicts(result_aux, result_aux_info, result_aux_ctx_info)
+    contents = merge_overlay(result_aux, result_aux_info, result_aux_ctx_info)
 
-    for value in error_msgs_aux:
-      new_value = ['context: contents'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: contents'], error_msgs_aux)
 
     if not error_msgs:
-      result['contents'] = contents or None
+      result['contents'] = to_plain_dict(contents) or None
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -785,9 +875,7 @@ def load_content(content, env, run_info, input_params=None, custom_dir=None):
 
     error_msgs = list()
 
-    for value in (error_msgs_aux or []):
-      new_value = ['context: load content'] + value
-      error_msgs += [new_value]
+    error_msgs += error_with_context(['context: load content'], error_msgs_aux)
 
     validate = run_info.get('validate')
     final_result = dict(
@@ -809,7 +897,77 @@ def load_content(content, env, run_info, input_params=None, custom_dir=None):
     return dict(error_msgs=error_msgs)
 
 
+def content_key_default(value):
+  # the vault encrypted values are identified by their ciphertext, so they
+  # are not decrypted only to calculate the key
+  if isinstance(value, AnsibleVaultEncryptedUnicode):
+    return '!vault ' + to_text(value._ciphertext)  # pylint: disable=protected-access
+
+  return str(value)
+
+
+def get_content_key(content, env, run_info, additional_info):
+  additional_info = additional_info or dict()
+  key_data = [
+      content,
+      id(env),
+      run_info.get('validate'),
+      run_info.get('max_errors'),
+      additional_info.get('parent_content_info'),
+      additional_info.get('input_params'),
+      additional_info.get('custom_dir'),
+      sorted(additional_info.get('content_names') or []),
+  ]
+
+  try:
+    key_text = json.dumps(key_data, sort_keys=True, default=content_key_default)
+  except (TypeError, ValueError):
+    return None
+
+  return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+
+
+def get_content_memo_stats(run_info):
+  content_memo = run_info.get('content_memo') or dict()
+  hits = content_memo.get('hits') or 0
+  misses = content_memo.get('misses') or 0
+
+  return dict(
+      amount=len(content_memo.get('results') or dict()),
+      hits=hits,
+      misses=misses,
+      hit_rate=(float(hits) / (hits + misses)) if (hits + misses) else 0.0,
+  )
+
+
 def prepare_content(content, env, run_info, additional_info):
+  # the prepared contents are memoized (when run_info has a content memo,
+  # that lives during the preparation of a ctx), because the same content
+  # is usually referenced by several pods, services and nodes
+  content_memo = run_info.get('content_memo')
+
+  if content_memo is None:
+    return prepare_uncached_content(content, env, run_info, additional_info)
+
+  content_key = get_content_key(content, env, run_info, additional_info)
+
+  if content_key is None:
+    return prepare_uncached_content(content, env, run_info, additional_info)
+
+  results = content_memo.setdefault('results', dict())
+
+  if content_key in results:
+    content_memo['hits'] = (content_memo.get('hits') or 0) + 1
+  else:
+    content_memo['misses'] = (content_memo.get('misses') or 0) + 1
+    results[content_key] = prepare_uncached_content(
+        content, env, run_info, additional_info
+    )
+
+  return results[content_key]
+
+
+def prepare_uncached_content(content, env, run_info, additional_info):
   error_msgs = list()
 
   try:
@@ -1067,9 +1225,11 @@ def prepare_content_inner(content, env, run_info, additional_info=None):
                     traceback.format_exc().split('\n'),
                 ]]
 
-          for value in (error_msgs_env or []):
-            new_value = [str('content: ' + content_description)] + value
-            error_msgs_aux += [new_value]
+          if error_msgs_env:
+            error_msgs_aux += error_with_context(
+                [str('content: ' + content_description)],
+                error_msgs_env,
+            )
         else:
           origin_dir_map = dict(
               cloud='',
@@ -1095,7 +1255,7 @@ def prepare_content_inner(content, env, run_info, additional_info=None):
             file_path = base_dir_prefix + file_rel
             result['file'] = file_path
 
-            if validate and (not os.path.exists(file_path)):
+            if validate and (not path_exists(file_path)):
               error_msgs_aux += [[
                   str('content origin: ' + content_origin),
                   str('msg: content file not found: ' + file_rel),
@@ -1113,6 +1273,7 @@ def prepare_content_inner(content, env, run_info, additional_info=None):
                 base_dir_prefix=base_dir_prefix_schema,
                 dict_to_validate=result,
                 prop_names=['input', 'params', 'credentials', 'contents'],
+                max_errors=run_info.get('max_errors'),
             )
 
             task_data['base_dir_prefix'] = base_dir_prefix_schema
@@ -1148,7 +1309,7 @@ def prepare_content_inner(content, env, run_info, additional_info=None):
                 if content_type != 'str':
                   schema_file = base_dir_prefix + schema_file
 
-                if os.path.exists(schema_file):
+                if path_exists(schema_file):
                   schema = load_cached_file(schema_file)
 
                   schema_data = dict()
@@ -1158,24 +1319,27 @@ def prepare_content_inner(content, env, run_info, additional_info=None):
                       schema_data[key] = result.get(key)
 
                   error_msgs_aux_validate = validate_schema(
-                      schema, schema_data
+                      schema,
+                      schema_data,
+                      max_errors=run_info.get('max_errors'),
                   )
 
-                  for value in (error_msgs_aux_validate or []):
-                    new_value = [
-                        'context: validate content schema',
-                        str('schema file: ' + schema_file),
-                    ] + value
-                    error_msgs_aux += [new_value]
+                  if error_msgs_aux_validate:
+                    error_msgs_aux += error_with_context(
+                        [
+                            'context: validate content schema',
+                            str('schema file: ' + schema_file),
+                        ],
+                        error_msgs_aux_validate,
+                    )
                 else:
                   error_msgs_aux += [[
                       'context: validate content schema',
                       str('msg: schema file not found: ' + schema_file),
                   ]]
 
-      for value in (error_msgs_aux or []):
-        new_value = [str('content type: ' + content_type)] + value
-        error_msgs += [new_value]
+      if error_msgs_aux:
+        error_msgs += error_with_context([str('content type: ' + content_type)], error_msgs_aux)
 
       if error_msgs:
         result = None
@@ -18,7 +18,7 @@ __metaclass__ = type  # pylint: disable=invalid-name
 import traceback
 
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
-    is_str, to_bool, to_default_int
+    error_with_context, is_str, to_bool, to_default_int
 )
 
 
@@ -225,12 +225,14 @@ def prepare_node_dependencies(node_names, prepared_node_dict):
 
                 node_dependencies[dependency_name] = result_item
 
-              for value in error_msgs_dependency:
-                new_value = [
-                    str('dependency name: ' + dependency_name),
-                    str('dependency type: ' + dependency_type),
-                ] + value
-                error_msgs_node += [new_value]
+              if error_msgs_dependency:
+                error_msgs_node += error_with_context(
+                    [
+                        str('dependency name: ' + dependency_name),
+                        str('dependency type: ' + dependency_type),
+                    ],
+                    error_msgs_dependency,
+                )
 
         node_result = dict(
             active_hosts_amount=active_hosts_amount,
@@ -247,9 +249,8 @@ def prepare_node_dependencies(node_names, prepared_node_dict):
             traceback.format_exc().split('\n'),
         ]]
 
-      for value in error_msgs_node:
-        new_value = [str('node name: ' + (node_name or ''))] + value
-        error_msgs += [new_value]
+      if error_msgs_node:
+        error_msgs += error_with_context([str('node name: ' + (node_name or ''))], error_msgs_node)
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -300,11 +301,11 @@ def prepare_host_dependencies(
           node_result = info.get('result')
           error_msgs_host = info.get('error_msgs')
 
-          for value in error_msgs_host:
-            new_value = [
-                str('instance index (host): ' + str(instance_index or ''))
-            ] + value
-            error_msgs_node += [new_value]
+          if error_msgs_host:
+            error_msgs_node += error_with_context(
+                [str('instance index (host): ' + str(instance_index or ''))],
+                error_msgs_host,
+            )
 
           # host (instance_index) - end
 
@@ -317,11 +318,8 @@ def prepare_host_dependencies(
             traceback.format_exc().split('\n'),
         ]]
 
-      for value in error_msgs_node:
-        new_value = [
-            str('node name: ' + (node_name or ''))
-        ] + value
-        error_msgs += [new_value]
+      if error_msgs_node:
+        error_msgs += error_with_context([str('node name: ' + (node_name or ''))], error_msgs_node)
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -541,11 +539,11 @@ def prepare_node_host_dependencies(
             traceback.format_exc().split('\n'),
         ]]
 
-      for value in error_msgs_dependency:
-        new_value = [
-            str('dependency name: ' + (dependency_name or ''))
-        ] + value
-        error_msgs += [new_value]
+      if error_msgs_dependency:
+        error_msgs += error_with_context(
+            [str('dependency name: ' + (dependency_name or ''))],
+            error_msgs_dependency,
+        )
 
     result = dependency_result
   except Exception as error:
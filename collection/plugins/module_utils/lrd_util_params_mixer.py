@@ -17,7 +17,16 @@ __metaclass__ = type  # pylint: disable=invalid-name
 
 import traceback
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import merge_dicts
+from types import MappingProxyType
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    LRUCache, merge_dicts, merge_overlay, to_plain_dict
+)
+
+# expansion tables of the params dicts already used in the process (by the
+# ids of the dicts, that are kept in the entries, so that their ids are not
+# reused)
+params_tables = LRUCache(max_amount=100)
 
 
 def expand_group_params(group_params, group_params_dict, ctx_name=None):
@@ -57,6 +66,105 @@ def expand_group_params(group_params, group_params_dict, ctx_name=None):
     return dict(error_msgs=error_msgs)
 
 
+class ParamsTables:
+  """
+  Expansions of the shared group params (mapped to the group params) and of
+  the shared params (merged in order) of an environment, resolved only once
+  for each name (or list of names) and reused by all the mixes with the same
+  dicts. The expanded params are read-only (they are merged into new dicts)
+  and the errors are the same as when expanding them in each mix.
+  """
+
+  def __init__(self, shared_group_params_dict, shared_params_dict, group_params_dict):
+    self.shared_group_params_dict = shared_group_params_dict
+    self.shared_params_dict = shared_params_dict
+    self.group_params_dict = group_params_dict
+    self.shared_group_params = dict()
+    self.shared_params = dict()
+
+  def expand_shared_group_params(self, shared_group_params):
+    entry = self.shared_group_params.get(shared_group_params)
+
+    if entry is None:
+      shared_group_params_dict = self.shared_group_params_dict
+      shared_group_params_aux = dict()
+      expanded = dict()
+      error_msgs = list()
+
+      if (not shared_group_params_dict) or (shared_group_params not in shared_group_params_dict):
+        error_msgs += [[
+            str('shared_group_params: ' + shared_group_params),
+            'shared_group_params_dict keys',
+            sorted(
+                str(dict_key)
+                for dict_key in list(shared_group_params_dict.keys())
+            ) if shared_group_params_dict else '',
+            'msg: shared_group_params key not present in dict',
+        ]]
+      else:
+        shared_group_params_aux = shared_group_params_dict.get(
+            shared_group_params)
+
+      if shared_group_params_aux:
+        info = expand_group_params(
+            shared_group_params_aux, self.group_params_dict, 'shared_group_params')
+        result_aux = info.get('result')
+        error_msgs_aux = info.get('error_msgs') or list()
+
+        if error_msgs_aux:
+          error_msgs += error_msgs_aux
+        else:
+          expanded = result_aux
+
+      entry = (MappingProxyType(expanded), error_msgs)
+      self.shared_group_params[shared_group_params] = entry
+
+    return entry
+
+  def expand_shared_params(self, shared_params):
+    shared_params = tuple(shared_params)
+    entry = self.shared_params.get(shared_params)
+
+    if entry is None:
+      shared_params_dict = self.shared_params_dict
+      expanded = dict()
+      error_msgs = list()
+
+      for key in shared_params:
+        if (not shared_params_dict) or (key not in shared_params_dict):
+          error_msgs += [[
+              str('shared_params key: ' + key),
+              'shared_params_dict keys',
+              sorted(
+                  str(dict_key)
+                  for dict_key in list(shared_params_dict.keys())
+              ) if shared_params_dict else '',
+              'msg: shared_params key not present in dict',
+          ]]
+        else:
+          params_aux = shared_params_dict.get(key)
+          expanded = merge_dicts(expanded, params_aux)
+
+      entry = (MappingProxyType(expanded or dict()), error_msgs)
+      self.shared_params[shared_params] = entry
+
+    return entry
+
+
+def get_params_tables(shared_group_params_dict, shared_params_dict, group_params_dict):
+  dicts = (shared_group_params_dict, shared_params_dict, group_params_dict)
+  tables_key = tuple(id(value) for value in dicts)
+  cached = params_tables.get(tables_key)
+
+  if cached and all(value is cached_value for value, cached_value in zip(dicts, cached[0])):
+    return cached[1]
+
+  tables = ParamsTables(*dicts)
+  params_tables.set(tables_key, (dicts, tables))
+
+  return tables
+
+
 def mix_inner(args):
   result = dict()
   error_msgs = list()
@@ -82,67 +190,36 @@ def mix_inner(args):
       else:
         group_params_expanded = result_aux
 
+    tables = get_params_tables(
+        shared_group_params_dict, shared_params_dict, group_params_dict
+    )
+
     shared_params_expanded = dict()
 
     if shared_params:
-      for key in shared_params:
-        if (not shared_params_dict) or (key not in shared_params_dict):
-          error_msgs += [[
-              str('shared_params key: ' + key),
-              'shared_params_dict keys',
-              sorted(
-                  str(dict_key)
-                  for dict_key in list(shared_params_dict.keys())
-              ) if shared_params_dict else '',
-              'msg: shared_params key not present in dict',
-          ]]
-        else:
-          params_aux = shared_params_dict.get(key)
-          shared_params_expanded = merge_dicts(
-              shared_params_expanded, params_aux)
+      shared_params_expanded, error_msgs_aux = tables.expand_shared_params(shared_params)
+      error_msgs += error_msgs_aux
 
     shared_group_params_expanded = dict()
 
     if shared_group_params:
-      shared_group_params_aux = dict()
-
-      if (not shared_group_params_dict) or (shared_group_params not in shared_group_params_dict):
-        error_msgs += [[
-            str('shared_group_params: ' + shared_group_params),
-            'shared_group_params_dict keys',
-            sorted(
-                str(dict_key)
-                for dict_key in list(shared_group_params_dict.keys())
-            ) if shared_group_params_dict else '',
-            'msg: shared_group_params key not present in dict',
-        ]]
-      else:
-        shared_group_params_aux = shared_group_params_dict.get(
-            shared_group_params)
-
-      if shared_group_params_aux:
-        info = expand_group_params(
-            shared_group_params_aux, group_params_dict, 'shared_group_params')
-        result_aux = info.get('result')
-        error_msgs_aux = info.get('error_msgs') or list()
-
-        if error_msgs_aux:
-          error_msgs += error_msgs_aux
-        else:
-          shared_group_params_expanded = result_aux
+      shared_group_params_expanded, error_msgs_aux = tables.expand_shared_group_params(
+          shared_group_params
+      )
+      error_msgs += error_msgs_aux
 
     if not error_msgs:
       if shared_group_params_expanded:
-        result = merge_dicts(result, shared_group_params_expanded)
+        result = merge_overlay(result, shared_group_params_expanded)
 
       if shared_params_expanded:
-        result = merge_dicts(result, shared_params_expanded)
+        result = merge_overlay(result, shared_params_expanded)
 
       if group_params_expanded:
-        result = merge_dicts(result, group_params_expanded)
+        result = merge_overlay(result, group_params_expanded)
 
       if params:
-        result = merge_dicts(result, params)
+        result = merge_overlay(result, params)
 
     return dict(result=result, error_msgs=error_msgs)
   except Exception as error:
@@ -155,7 +232,10 @@ def mix_inner(args):
     return dict(error_msgs=error_msgs)
 
 
-def mix(args):
+def mix_overlay(args):
+  # the result may be an overlay of the params (ParamsOverlay), to be merged
+  # with other params before being exported as a dict (used internally, when
+  # preparing the mixed data)
   info = mix_inner(args)
 
   error_msgs = info.get('error_msgs') or list()
@@ -166,3 +246,12 @@ def mix(args):
     info['error_msgs'] = error_msgs
 
   return info
+
+
+def mix(args):
+  info = mix_overlay(args)
+
+  if 'result' in info:
+    info['result'] = to_plain_dict(info.get('result'))
+
+  return info
@@ -19,7 +19,7 @@ import os
 import traceback
 
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
-    load_yaml, to_bool
+    error_with_context, load_yaml, path_exists, to_bool
 )
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_template import lookup
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation import (
@@ -74,6 +74,7 @@ def load_vars(pod_info, run_info, meta_info=None):
         pod=pod,
         previous=previous,
         validate=validate,
+        max_errors=run_info.get('max_errors'),
     )
 
     res = load_next_vars(
@@ -89,16 +90,15 @@ def load_vars(pod_info, run_info, meta_info=None):
       parent_description = pod.get('parent_description')
       pod_description = pod.get('description')
 
-      for value in error_msgs_aux:
-        new_value = ['context: pod ctx vars'] + value
+      error_context = ['context: pod ctx vars']
 
-        if not no_ctx_msg:
-          new_value = [
-              str((parent_type or '') + ': ' + (parent_description or '')),
-              str('pod: ' + pod_description),
-          ] + new_value
+      if not no_ctx_msg:
+        error_context = [
+            str((parent_type or '') + ': ' + (parent_description or '')),
+            str('pod: ' + pod_description),
+        ] + error_context
 
-        error_msgs += [new_value]
+      error_msgs += error_with_context(error_context, error_msgs_aux)
     else:
       result = res.get('result')
 
@@ -147,7 +147,7 @@ def load_ctx_file(current_file, is_env, data_info):
       dest = pod_dir + '/' + current_file.get('dest')
       dest_dir = os.path.dirname(dest)
 
-      if validate and not os.path.exists(local_src):
+      if validate and not path_exists(local_src):
         error_msgs += [[
             str('src: ' + (src_relpath or '')),
             'msg: pod ctx file not found',
@@ -248,7 +248,7 @@ def load_ctx_template(current_template, is_env, data_info):
           to_bool(env_template_no_empty_lines),
       )
 
-      if validate and not os.path.exists(local_src):
+      if validate and not path_exists(local_src):
         error_msgs += [[
             str('src: ' + (src_relpath or '')),
             'msg: pod ctx template file not found',
@@ -264,6 +264,7 @@ def load_ctx_template(current_template, is_env, data_info):
             base_dir_prefix=base_dir_prefix,
             dict_to_validate=template_params,
             all_props=True,
+            max_errors=data_info.get('max_errors'),
         )
 
         info = validate_ctx_schema(
@@ -273,12 +274,14 @@ def load_ctx_template(current_template, is_env, data_info):
         )
         error_msgs_aux += (info.get('error_msgs') or [])
 
-        for value in (error_msgs_aux or []):
-          new_value = [
-              str('src: ' + (src_relpath or '')),
-              str('dest: ' + (dest_relpath or '')),
-          ] + value
-          error_msgs += [new_value]
+        if error_msgs_aux:
+          error_msgs += error_with_context(
+              [
+                  str('src: ' + (src_relpath or '')),
+                  str('dest: ' + (dest_relpath or '')),
+              ],
+              error_msgs_aux,
+          )
 
       if error_msgs:
         return dict(error_msgs=error_msgs)
@@ -356,7 +359,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
     try:
       file = pod_local_dir + '/' + file_relpath
 
-      if validate and not os.path.exists(file):
+      if validate and not path_exists(file):
         error_msgs += [[
             str('file: ' + file_relpath),
             str('pod_local_dir: ' + pod_local_dir),
@@ -399,6 +402,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
               base_dir_prefix=None,
               dict_to_validate=res,
               all_props=True,
+              max_errors=data_info.get('max_errors'),
           )
 
           info = validate_ctx_schema(
@@ -423,9 +427,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
           error_msgs_aux = info.get('error_msgs')
 
           if error_msgs_aux:
-            for value in error_msgs_aux:
-              new_value = ['context: pod ctx file'] + value
-              error_msgs += [new_value]
+            error_msgs += error_with_context(['context: pod ctx file'], error_msgs_aux)
           else:
             directories += result_aux.get('directories') or []
             files += result_aux.get('files') or []
@@ -438,9 +440,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
           error_msgs_aux = info.get('error_msgs')
 
           if error_msgs_aux:
-            for value in error_msgs_aux:
-              new_value = ['context: pod ctx template'] + value
-              error_msgs += [new_value]
+            error_msgs += error_with_context(['context: pod ctx template'], error_msgs_aux)
           else:
             directories += result_aux.get('directories') or []
             templates += result_aux.get('templates') or []
@@ -452,9 +452,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
           error_msgs_aux = info.get('error_msgs')
 
           if error_msgs_aux:
-            for value in error_msgs_aux:
-              new_value = ['context: pod ctx env file'] + value
-              error_msgs += [new_value]
+            error_msgs += error_with_context(['context: pod ctx env file'], error_msgs_aux)
           else:
             directories += result_aux.get('directories') or []
             files += result_aux.get('files') or []
@@ -467,9 +465,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
           error_msgs_aux = info.get('error_msgs')
 
           if error_msgs_aux:
-            for value in error_msgs_aux:
-              new_value = ['context: pod ctx env template'] + value
-              error_msgs += [new_value]
+            error_msgs += error_with_context(['context: pod ctx env template'], error_msgs_aux)
           else:
             directories += result_aux.get('directories') or []
             templates += result_aux.get('templates') or []
@@ -491,6 +487,7 @@ def load_next_vars(file_relpath, ctx_params, data_info):
                     base_dir_prefix=pod_local_dir,
                     dict_to_validate=child_params,
                     all_props=True,
+                    max_errors=data_info.get('max_errors'),
                 )
 
                 info = validate_ctx_schema(
@@ -512,9 +509,10 @@ def load_next_vars(file_relpath, ctx_params, data_info):
                   child_error_msgs += res_child.get('error_msgs') or list()
 
                 if child_error_msgs:
-                  for value in child_error_msgs:
-                    new_value = [str('ctx child: ' + child_name)] + value
-                    error_msgs += [new_value]
+                  error_msgs += error_with_context(
+                      [str('ctx child: ' + child_name)],
+                      child_error_msgs,
+                  )
                 else:
                   child_result = res_child.get('result')
 
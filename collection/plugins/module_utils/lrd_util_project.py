@@ -20,13 +20,15 @@ __metaclass__ = type  # pylint: disable=invalid-name
 
 import traceback
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import is_str, to_bool
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_with_context, is_error_budget_reached, is_str, to_bool
+)
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation import (
     validate_ctx_schema
 )
 
 
-def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
+def prepare_ctx(ctx_name, env, env_init, env_original, env_info, max_errors=None):
   error_msgs_ctx = list()
   result = dict()
 
@@ -105,6 +107,9 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
           collection_dests = set()
 
           for collection_idx, collection in enumerate(collections):
+            if is_error_budget_reached(max_errors, error_msgs_ctx):
+              break
+
             error_msgs_collection = list()
 
             collection_namespace = collection.get('namespace')
@@ -148,11 +153,10 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
               collection_only_namespaces.add(collection_namespace)
 
             if error_msgs_collection:
-              for value in error_msgs_collection:
-                new_value = [
-                    str('collection item: #' + str(collection_idx + 1))
-                ] + value
-                error_msgs_ctx += [new_value]
+              error_msgs_ctx += error_with_context(
+                  [str('collection item: #' + str(collection_idx + 1))],
+                  error_msgs_collection,
+              )
             else:
               collection_namespaces.add(collection_namespace)
               collection_dests.add(collection_dest)
@@ -177,6 +181,9 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
           node_names = list()
 
           for node_idx, node in enumerate(nodes):
+            if is_error_budget_reached(max_errors, error_msgs_ctx):
+              break
+
             error_msgs_node = list()
 
             node_name = node if is_str(node) else node.get('name')
@@ -192,11 +199,10 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
               ]]
 
             if error_msgs_node:
-              for value in error_msgs_node:
-                new_value = [
-                    str('node item: #' + str(node_idx + 1))
-                ] + value
-                error_msgs_ctx += [new_value]
+              error_msgs_ctx += error_with_context(
+                  [str('node item: #' + str(node_idx + 1))],
+                  error_msgs_node,
+              )
             else:
               node_names += [node_name]
 
@@ -220,6 +226,7 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
               base_dir_prefix=env_dir + '/',
               dict_to_validate=env_init.get('env_params'),
               all_props=True,
+              max_errors=max_errors,
           )
 
           info = validate_ctx_schema(
@@ -234,6 +241,7 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
               base_dir_prefix=env_dir + '/',
               dict_to_validate=env_original,
               all_props=True,
+              max_errors=max_errors,
           )
 
           info = validate_ctx_schema(
@@ -253,14 +261,13 @@ def prepare_ctx(ctx_name, env, env_init, env_original, env_info):
 
   error_msgs = list()
 
-  for value in (error_msgs_ctx or []):
-    new_value = [str('ctx: ' + str(ctx_name))] + value
-    error_msgs += [new_value]
+  if error_msgs_ctx:
+    error_msgs += error_with_context([str('ctx: ' + str(ctx_name))], error_msgs_ctx)
 
   return dict(result=result, error_msgs=error_msgs)
 
 
-def prepare_project(env, env_init, env_original, env_info):
+def prepare_project(env, env_init, env_original, env_info, max_errors=None):
   result = dict()
   error_msgs = list()
 
@@ -348,6 +355,7 @@ def prepare_project(env, env_init, env_original, env_info):
             base_dir_prefix=env_dir + '/',
             dict_to_validate=env_original,
             all_props=True,
+            max_errors=max_errors,
         )
 
         info = validate_ctx_schema(
@@ -360,6 +368,7 @@ def prepare_project(env, env_init, env_original, env_info):
       task_data = dict(
           dict_to_validate=env,
           all_props=True,
+          max_errors=max_errors,
       )
 
       info = validate_ctx_schema(
@@ -377,6 +386,9 @@ def prepare_project(env, env_init, env_original, env_info):
       ctx_names = list()
 
       for ctx_idx, ctx_name in enumerate(env.get('ctxs')):
+        if is_error_budget_reached(max_errors, error_msgs):
+          break
+
         error_msgs_ctx = list()
         ctx_data = None
 
@@ -392,13 +404,13 @@ def prepare_project(env, env_init, env_original, env_info):
               env_init=env_init,
               env_original=env_original,
               env_info=env_info,
+              max_errors=max_errors,
           )
           ctx_data = info.get('result')
           error_msgs_ctx += (info.get('error_msgs') or [])
 
-        for value in (error_msgs_ctx or []):
-          new_value = [str('ctx item: #' + str(ctx_idx + 1))] + value
-          error_msgs += [new_value]
+        if error_msgs_ctx:
+          error_msgs += error_with_context([str('ctx item: #' + str(ctx_idx + 1))], error_msgs_ctx)
 
         if not error_msgs_ctx:
           ctx_names += [ctx_name]
@@ -8,6 +8,7 @@
 # pylint: disable=import-error
 # pylint: disable=too-many-lines
 # pylint: disable=broad-except
+# pylint: disable=unidiomatic-typecheck
 
 # pyright: reportUnusedImport=true
 # pyright: reportUnusedVariable=true
@@ -16,843 +17,840 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type  # pylint: disable=invalid-name
 
+import ast
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
 import re
+import tempfile
 import traceback
+import types
+
+from collections import OrderedDict
+from multiprocessing import util as multiprocessing_util
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
 
 from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
-    is_bool, is_int, is_float, is_str, load_cached_file, to_bool, to_float, to_int
+    LRUCache, count_errors, error_with_context, get_parse_cache_dir, is_bool, is_encrypted,
+    is_int, is_float, is_str, load_cached_file, save_parse_cache_file, to_bool, to_float, to_int
 )
 
 
-def validate_next_value(schema_data, value):
-  schema_name = schema_data.get('name')
-  schema_ctx = schema_data.get('ctx')
-  schema_info = schema_data.get('info')
-  schema_info_dict = schema_data.get('dict')
-  is_prop = schema_data.get('prop')
-  is_subelement = schema_data.get('subelement')
-  is_simple = schema_data.get('simple')
-  required = schema_data.get('required')
-
-  schema_suffix = ''
-
-  if is_prop:
-    schema_suffix = ' (prop)'
-  elif is_subelement:
-    schema_suffix = ' (subelement)'
-
-  if schema_info is None:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        'msg: schema is not defined'
-    ]]
+PRIMITIVE_TYPES = ['primitive', 'str', 'bool', 'int', 'float']
+VALID_MIN_MAX_TYPES = ['str', 'int', 'float']
+LIST_MAP_TYPES = ['map', 'simple_map', 'list', 'simple_list']
+INVALID_ALTERNATIVE_TYPES = ['map', 'simple_map', 'dict', 'simple_dict']
 
-  non_empty = schema_info.get('non_empty')
+compiled_schemas = LRUCache(max_amount=100)
 
-  if required or non_empty:
-    if value is None:
-      non_empty_info = ' (' + ('non_empty' if non_empty else 'required') + ')'
-
-      return [[
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('msg: value is not defined' + non_empty_info)
-      ]]
-
-  if (not is_subelement) and (not is_prop) and (not is_simple) and ('schema' in schema_info):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        'msg: a schema definition should not have a schema property'
-    ]]
+validated_schemas_dict = dict()
+validated_schemas_stats = dict(hits=0, misses=0)
+
+# the subtrees proven valid are persisted in the parse cache directory
+# (when defined), in one file per schema, when the process exits
+VALIDATION_CACHE_VERSION = 2
+VALIDATION_CACHE_MAX_KEYS = 200000
+
+validation_caches = dict()
+validation_caches_state = dict(pid=None)
+
+# directory in which the python modules generated from the schemas are
+# persisted (when defined, the schemas are validated by the generated code);
+# the version must be changed whenever the validation of the nodes changes
+SCHEMA_CODEGEN_DIR_ENV = 'LRD_SCHEMA_CODEGEN_DIR'
+SCHEMA_CODEGEN_VERSION = 3
+
+# maximum depth of the calls between the generated functions (the values
+# nested more deeply are validated by validate_node, without recursion)
+SCHEMA_CODEGEN_MAX_DEPTH = 200
 
-  value_type = schema_info.get('type')
-  choices = schema_info.get('choices')
-  regex = schema_info.get('regex')
-  minimum = to_int(schema_info.get('min'))
-  maximum = to_int(schema_info.get('max'))
-  next_schema = schema_info.get('schema')
-
-  if (not value_type) and (not next_schema):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        'msg: a definition should have either a type or schema property'
-    ]]
-  elif value_type and next_schema:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        'msg: a definition should not have both type and schema properties'
-    ]]
 
-  if not value_type:
+class SchemaNode:
+  """
+  A schema definition (schema_info) compiled for a given position in the schema
+  (name, prop, subelement, simple and required flags), with the definition
+  itself already validated, the regexes compiled, the choices converted to a set
+  and the referenced schemas resolved (lazily, to support recursive schemas).
+  """
+
+  def __init__(
+      self, compiled, name, info, prop=None, subelement=None, simple=None, required=None, key=None
+  ):
+    self.compiled = compiled
+    self.key = key
+    self.name = name
+    self.info = info
+    self.prop = prop
+    self.subelement = subelement
+    self.simple = simple
+    self.required = required
+
+    schema_suffix = ''
+
+    if prop:
+      schema_suffix = ' (prop)'
+    elif subelement:
+      schema_suffix = ' (subelement)'
+
+    self.label = str('schema_name: ' + name + schema_suffix)
+
+    self.definition_error = None
+    self.next_schema = None
+    self.value_type = None
+
+    # defined when the definition is validated (see check_definition)
+    self.is_primitive_type = None
+    self.is_dict_type = None
+    self.choices = None
+    self.choices_set = None
+    self.regex = None
+    self.minimum = None
+    self.maximum = None
+    self.main_schema = None
+    self.elem_type = None
+    self.elem_key_regex = None
+    self.props = None
+    self.props_sorted = None
+    self.required_props = None
+    self.lax = None
+
+    self._next_node = None
+    self._alternative_node = None
+    self._single_node = None
+    self._main_node = None
+    self._elem_node = None
+    self._prop_nodes = dict()
+    self._pattern = None
+    self._elem_key_pattern = None
+
+    self.definition_checked = False
+
+    if info is not None:
+      self.non_empty = info.get('non_empty')
+      self.check_defined = bool(required or self.non_empty)
+
+  def _definition_error(self):
+    info = self.info
+
+    def error(*msgs):
+      return (['context: dynamic schema', self.label], list(msgs))
+
+    if (not self.subelement) and (not self.prop) and (not self.simple) and ('schema' in info):
+      return error('msg: a schema definition should not have a schema property')
+
+    value_type = info.get('type')
+    choices = info.get('choices')
+    regex = info.get('regex')
+    minimum = to_int(info.get('min'))
+    maximum = to_int(info.get('max'))
+    next_schema = info.get('schema')
+
+    if (not value_type) and (not next_schema):
+      return error('msg: a definition should have either a type or schema property')
+    elif value_type and next_schema:
+      return error('msg: a definition should not have both type and schema properties')
+
+    if not value_type:
+      if choices:
+        return error('msg: a definition should have choices only when type is defined')
+      elif regex:
+        return error('msg: a definition should have regex only when type is defined')
+      elif minimum is not None:
+        return error('msg: a definition should have min only when type is defined')
+      elif maximum is not None:
+        return error('msg: a definition should have max only when type is defined')
+
     if choices:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have choices only when type is defined'
-      ]]
-    elif regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have regex only when type is defined'
-      ]]
-    elif minimum is not None:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have min only when type is defined'
-      ]]
-    elif maximum is not None:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have max only when type is defined'
-      ]]
-
-  primitive_types = [
-      'primitive',
-      'str',
-      'bool',
-      'int',
-      'float',
-  ]
-
-  if choices:
-    is_list_type = (value_type in ['list', 'simple_list'])
-
-    if (value_type not in primitive_types) and not is_list_type:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: value type is not primitive nor a list but has choices',
-      ]]
-    elif is_list_type and (schema_info.get('elem_schema')):
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: value type is a list with elem_schema defined but has choices',
-          'tip: a list with choices should have only elem_type defined',
-      ]]
-
-  if regex and (value_type != 'str'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: regex should only be specified for a string (str) type',
-    ]]
+      is_list_type = (value_type in ['list', 'simple_list'])
 
-  valid_min_max_types = ['str', 'int', 'float']
+      if (value_type not in PRIMITIVE_TYPES) and not is_list_type:
+        return error(
+            str('type: ' + value_type),
+            'msg: value type is not primitive nor a list but has choices',
+        )
+      elif is_list_type and (info.get('elem_schema')):
+        return error(
+            str('type: ' + value_type),
+            'msg: value type is a list with elem_schema defined but has choices',
+            'tip: a list with choices should have only elem_type defined',
+        )
 
-  if value_type not in valid_min_max_types:
-    if minimum is not None:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+    if regex and (value_type != 'str'):
+      return error(
           str('type: ' + value_type),
-          'msg: min is specified for an invalid type',
-          'allowed types:',
-          valid_min_max_types,
-      ]]
+          'msg: regex should only be specified for a string (str) type',
+      )
 
-    if maximum is not None:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: max is specified for an invalid type',
-          'allowed types:',
-          valid_min_max_types,
-      ]]
-
-  alternative_type = schema_info.get('alternative_type')
-  alternative_choices = schema_info.get('alternative_choices')
-  alternative_regex = schema_info.get('alternative_regex')
-  alternative_min = schema_info.get('alternative_min')
-  alternative_max = schema_info.get('alternative_max')
-  main_schema = schema_info.get('main_schema')
-  alternative_schema = schema_info.get('alternative_schema')
-
-  if (value_type == 'simple_dict') and (not alternative_type) and (not alternative_schema):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: a simple_dict must have an alternative type or alternative schema'
-    ]]
-  elif main_schema and (value_type != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: a main schema should be defined only for simple_dict'
-    ]]
-  elif alternative_type and (value_type != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: an alternative type should be defined only for simple_dict'
-    ]]
-  elif alternative_schema and (value_type != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: an alternative schema should be defined only for simple_dict'
-    ]]
-  elif alternative_type and alternative_schema:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: define only an alternative type or alternative schema, not both'
-    ]]
+    if value_type not in VALID_MIN_MAX_TYPES:
+      if minimum is not None:
+        return error(
+            str('type: ' + value_type),
+            'msg: min is specified for an invalid type',
+            'allowed types:',
+            VALID_MIN_MAX_TYPES,
+        )
 
-  if not alternative_type:
-    if alternative_choices:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have alternative_choices only '
-          + 'when alternative_type is defined'
-      ]]
-    elif alternative_regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have alternative_regex only '
-          + 'when alternative_type is defined'
-      ]]
-    elif alternative_min:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have alternative_min only '
-          + 'when alternative_type is defined'
-      ]]
-    elif alternative_max:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have alternative_max only '
-          + 'when alternative_type is defined'
-      ]]
-
-  if next_schema:
-    new_schema_info = schema_info_dict.get(next_schema)
-
-    new_schema_data = dict(
-        name=next_schema,
-        ctx=schema_ctx,
-        info=new_schema_info,
-        dict=schema_info_dict,
-        prop=False,
-        subelement=False,
-        required=True
-    )
+      if maximum is not None:
+        return error(
+            str('type: ' + value_type),
+            'msg: max is specified for an invalid type',
+            'allowed types:',
+            VALID_MIN_MAX_TYPES,
+        )
 
-    return validate_next_value(new_schema_data, value)
-
-  elem_key_regex = schema_info.get('elem_key_regex')
-  elem_type = schema_info.get('elem_type')
-  elem_alternative_type = schema_info.get('elem_alternative_type')
-  elem_alternative_choices = schema_info.get('elem_alternative_choices')
-  elem_alternative_regex = schema_info.get('elem_alternative_regex')
-  elem_alternative_min = schema_info.get('elem_alternative_min')
-  elem_alternative_max = schema_info.get('elem_alternative_max')
-  elem_schema_name = schema_info.get('elem_schema')
-  elem_main_schema = schema_info.get('elem_main_schema')
-  elem_alternative_schema_name = schema_info.get('elem_alternative_schema')
-  elem_required = schema_info.get('elem_required')
-  elem_non_empty = schema_info.get('elem_non_empty')
-  elem_choices = schema_info.get('elem_choices')
-  elem_regex = schema_info.get('elem_regex')
-  elem_min = schema_info.get('elem_min')
-  elem_max = schema_info.get('elem_max')
-
-  if value_type not in ['map', 'simple_map']:
-    if elem_key_regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_key_regex only for maps'
-      ]]
-
-  if value_type not in ['map', 'simple_map', 'list', 'simple_list']:
-    if elem_type:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_type only for lists and maps'
-      ]]
-
-    if elem_alternative_type:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_type only for lists and maps'
-      ]]
-    elif elem_alternative_choices:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_choices only for lists and maps'
-      ]]
-    elif elem_alternative_regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_regex only for lists and maps'
-      ]]
-    elif elem_alternative_min:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_min only for lists and maps'
-      ]]
-    elif elem_alternative_max:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_max only for lists and maps'
-      ]]
-    elif elem_schema_name:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_schema only for lists and maps'
-      ]]
-    elif elem_main_schema:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_main_schema only for lists and maps'
-      ]]
-    elif elem_alternative_schema_name:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_alternative_schema only for lists and maps'
-      ]]
-    elif elem_required:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a definition should have elem_required only for lists and maps'
-      ]]
-    elif elem_non_empty:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+    alternative_type = info.get('alternative_type')
+    main_schema = info.get('main_schema')
+    alternative_schema = info.get('alternative_schema')
+
+    if (value_type == 'simple_dict') and (not alternative_type) and (not alternative_schema):
+      return error(
           str('type: ' + value_type),
-          'msg: a definition should have elem_non_empty only for lists and maps'
-      ]]
-    elif elem_choices:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+          'msg: a simple_dict must have an alternative type or alternative schema'
+      )
+    elif main_schema and (value_type != 'simple_dict'):
+      return error(
           str('type: ' + value_type),
-          'msg: a definition should have elem_choices only for lists and maps'
-      ]]
-    elif elem_regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+          'msg: a main schema should be defined only for simple_dict'
+      )
+    elif alternative_type and (value_type != 'simple_dict'):
+      return error(
           str('type: ' + value_type),
-          'msg: a definition should have elem_regex only for lists and maps'
-      ]]
-    elif elem_min:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+          'msg: an alternative type should be defined only for simple_dict'
+      )
+    elif alternative_schema and (value_type != 'simple_dict'):
+      return error(
           str('type: ' + value_type),
-          'msg: a definition should have elem_min only for lists and maps'
-      ]]
-    elif elem_max:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+          'msg: an alternative schema should be defined only for simple_dict'
+      )
+    elif alternative_type and alternative_schema:
+      return error(
           str('type: ' + value_type),
-          'msg: a definition should have elem_max only for lists and maps'
-      ]]
+          'msg: define only an alternative type or alternative schema, not both'
+      )
 
-  elem_type_default = elem_type or ''
+    if not alternative_type:
+      for key in [
+          'alternative_choices',
+          'alternative_regex',
+          'alternative_min',
+          'alternative_max',
+      ]:
+        if info.get(key):
+          return error(
+              'msg: a definition should have ' + key + ' only '
+              + 'when alternative_type is defined'
+          )
 
-  if (
-      (elem_type_default == 'simple_dict')
-      and
-      (not elem_alternative_type)
-      and
-      (not elem_alternative_schema_name)
-  ):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('elem_type: ' + elem_type_default),
-        'msg: a simple_dict for elem_type must have an elem_alternative_type or '
-        + 'elem_alternative_schema'
-    ]]
-  elif elem_main_schema and (elem_type_default != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('elem_type: ' + elem_type_default),
-        'msg: elem_main_schema should be defined only when elem_type '
-        + 'is defined and is simple_dict'
-    ]]
-  elif elem_alternative_type and (elem_type_default != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('elem_type: ' + elem_type_default),
-        'msg: elem_alternative_type should be defined only when elem_type '
-        + 'is defined and is simple_dict'
-    ]]
-  elif elem_alternative_schema_name and (elem_type_default != 'simple_dict'):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('elem_type: ' + elem_type_default),
-        'msg: elem_alternative_schema should be defined only when elem_type '
-        + 'is defined and is simple_dict'
-    ]]
-  elif elem_alternative_type and elem_alternative_schema_name:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('elem_type: ' + elem_type_default),
-        'msg: define only one of elem_alternative_type or elem_alternative_schema, not both'
-    ]]
+    if next_schema:
+      self.next_schema = next_schema
+      return None
 
-  if not elem_alternative_type:
-    if elem_alternative_choices:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have elem_alternative_choices only '
-          + 'when elem_alternative_type is defined'
-      ]]
-    elif elem_alternative_regex:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have elem_alternative_regex only '
-          + 'when elem_alternative_type is defined'
-      ]]
-    elif elem_alternative_min:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have elem_alternative_min only '
-          + 'when elem_alternative_type is defined'
-      ]]
-    elif elem_alternative_max:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          'msg: a definition should have elem_alternative_max only '
-          + 'when elem_alternative_type is defined'
-      ]]
-
-  if value_type in ['map', 'simple_map', 'list', 'simple_list']:
-    if (not elem_type) and (not elem_schema_name):
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a property definition with this type should have either a '
-          + 'elem_type or elem_schema property'
-      ]]
-    elif elem_type and elem_schema_name:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          'msg: a property definition with this type should not have '
-          + 'both elem_type and elem_schema properties'
-      ]]
-
-  if value_type == 'simple_dict':
-    invalid_alternative_types = ['map', 'simple_map', 'dict', 'simple_dict']
-
-    if alternative_type and (alternative_type in invalid_alternative_types):
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          str('alternative_type: ' + alternative_type),
-          str('msg: invalid alternative type for a ' + value_type),
-          'invalid alternative types: ',
-          invalid_alternative_types,
-      ]]
-
-    if alternative_schema:
-      schema_info_aux = schema_info_dict.get(alternative_schema)
-      schema_info_aux_type = (
-          schema_info_aux.get('type') if schema_info_aux else None
+    elem_key_regex = info.get('elem_key_regex')
+    elem_type = info.get('elem_type')
+    elem_alternative_type = info.get('elem_alternative_type')
+    elem_schema_name = info.get('elem_schema')
+    elem_main_schema = info.get('elem_main_schema')
+    elem_alternative_schema_name = info.get('elem_alternative_schema')
+
+    if value_type not in ['map', 'simple_map']:
+      if elem_key_regex:
+        return error(
+            str('type: ' + value_type),
+            'msg: a definition should have elem_key_regex only for maps'
+        )
+
+    if value_type not in LIST_MAP_TYPES:
+      if elem_type:
+        return error(
+            str('type: ' + value_type),
+            'msg: a definition should have elem_type only for lists and maps'
+        )
+
+      for key in [
+          'elem_alternative_type',
+          'elem_alternative_choices',
+          'elem_alternative_regex',
+          'elem_alternative_min',
+          'elem_alternative_max',
+          'elem_schema',
+          'elem_main_schema',
+          'elem_alternative_schema',
+          'elem_required',
+          'elem_non_empty',
+          'elem_choices',
+          'elem_regex',
+          'elem_min',
+          'elem_max',
+      ]:
+        if info.get(key):
+          return error(
+              str('type: ' + value_type),
+              'msg: a definition should have ' + key + ' only for lists and maps'
+          )
+
+    elem_type_default = elem_type or ''
+
+    if (
+        (elem_type_default == 'simple_dict')
+        and
+        (not elem_alternative_type)
+        and
+        (not elem_alternative_schema_name)
+    ):
+      return error(
+          str('elem_type: ' + elem_type_default),
+          'msg: a simple_dict for elem_type must have an elem_alternative_type or '
+          + 'elem_alternative_schema'
+      )
+    elif elem_main_schema and (elem_type_default != 'simple_dict'):
+      return error(
+          str('elem_type: ' + elem_type_default),
+          'msg: elem_main_schema should be defined only when elem_type '
+          + 'is defined and is simple_dict'
+      )
+    elif elem_alternative_type and (elem_type_default != 'simple_dict'):
+      return error(
+          str('elem_type: ' + elem_type_default),
+          'msg: elem_alternative_type should be defined only when elem_type '
+          + 'is defined and is simple_dict'
       )
+    elif elem_alternative_schema_name and (elem_type_default != 'simple_dict'):
+      return error(
+          str('elem_type: ' + elem_type_default),
+          'msg: elem_alternative_schema should be defined only when elem_type '
+          + 'is defined and is simple_dict'
+      )
+    elif elem_alternative_type and elem_alternative_schema_name:
+      return error(
+          str('elem_type: ' + elem_type_default),
+          'msg: define only one of elem_alternative_type or elem_alternative_schema, not both'
+      )
+
+    if not elem_alternative_type:
+      for key in [
+          'elem_alternative_choices',
+          'elem_alternative_regex',
+          'elem_alternative_min',
+          'elem_alternative_max',
+      ]:
+        if info.get(key):
+          return error(
+              'msg: a definition should have ' + key + ' only '
+              + 'when elem_alternative_type is defined'
+          )
 
-      if schema_info_aux_type and (schema_info_aux_type in invalid_alternative_types):
-        return [[
-            str('context: dynamic schema'),
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+    if value_type in LIST_MAP_TYPES:
+      if (not elem_type) and (not elem_schema_name):
+        return error(
+            str('type: ' + value_type),
+            'msg: a property definition with this type should have either a '
+            + 'elem_type or elem_schema property'
+        )
+      elif elem_type and elem_schema_name:
+        return error(
             str('type: ' + value_type),
-            str('alternative schema type: ' + schema_info_aux_type),
-            str('msg: invalid alternative schema type for a ' + value_type),
+            'msg: a property definition with this type should not have '
+            + 'both elem_type and elem_schema properties'
+        )
+
+    schema_info_dict = self.compiled.schema_info_dict
+
+    if value_type == 'simple_dict':
+      if alternative_type and (alternative_type in INVALID_ALTERNATIVE_TYPES):
+        return error(
+            str('type: ' + value_type),
+            str('alternative_type: ' + alternative_type),
+            str('msg: invalid alternative type for a ' + value_type),
             'invalid alternative types: ',
-            invalid_alternative_types,
-        ]]
-  elif value_type in ['simple_map', 'simple_list']:
-    invalid_elem_types = (
-        ['list', 'simple_list']
-        if (value_type == 'simple_list')
-        else ['map', 'simple_map', 'dict', 'simple_dict']
-    )
+            INVALID_ALTERNATIVE_TYPES,
+        )
 
-    if elem_type and (elem_type in invalid_elem_types):
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
-          str('type: ' + value_type),
-          str('element type: ' + elem_type),
-          str('msg: invalid element type for a ' + value_type),
-          'invalid element types: ',
-          invalid_elem_types,
-      ]]
-
-    if elem_schema_name:
-      schema_info_aux = schema_info_dict.get(elem_schema_name)
-      schema_info_aux_type = schema_info_aux.get(
-          'type'
-      ) if schema_info_aux else None
-
-      if schema_info_aux_type and (schema_info_aux_type in invalid_elem_types):
-        return [[
-            str('context: dynamic schema'),
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+      if alternative_schema:
+        schema_info_aux = schema_info_dict.get(alternative_schema)
+        schema_info_aux_type = (
+            schema_info_aux.get('type') if schema_info_aux else None
+        )
+
+        if schema_info_aux_type and (schema_info_aux_type in INVALID_ALTERNATIVE_TYPES):
+          return error(
+              str('type: ' + value_type),
+              str('alternative schema type: ' + schema_info_aux_type),
+              str('msg: invalid alternative schema type for a ' + value_type),
+              'invalid alternative types: ',
+              INVALID_ALTERNATIVE_TYPES,
+          )
+    elif value_type in ['simple_map', 'simple_list']:
+      invalid_elem_types = (
+          ['list', 'simple_list']
+          if (value_type == 'simple_list')
+          else ['map', 'simple_map', 'dict', 'simple_dict']
+      )
+
+      if elem_type and (elem_type in invalid_elem_types):
+        return error(
             str('type: ' + value_type),
-            str('element schema type: ' + schema_info_aux_type),
-            str('msg: invalid element schema type for a ' + value_type),
+            str('element type: ' + elem_type),
+            str('msg: invalid element type for a ' + value_type),
             'invalid element types: ',
             invalid_elem_types,
-        ]]
-
-  props = schema_info.get('props')
-
-  if (
-      (props is None)
-      and
-      (not is_prop)
-      and
-      (not is_subelement)
-      and
-      (value_type in ['dict', 'simple_dict'])
-  ):
-    if (value_type != 'simple_dict') or not main_schema:
-      return [[
-          str('context: dynamic schema'),
-          str('schema_name: ' + schema_name + schema_suffix),
-          str('at: ' + (schema_ctx or '<root>')),
+        )
+
+      if elem_schema_name:
+        schema_info_aux = schema_info_dict.get(elem_schema_name)
+        schema_info_aux_type = schema_info_aux.get(
+            'type'
+        ) if schema_info_aux else None
+
+        if schema_info_aux_type and (schema_info_aux_type in invalid_elem_types):
+          return error(
+              str('type: ' + value_type),
+              str('element schema type: ' + schema_info_aux_type),
+              str('msg: invalid element schema type for a ' + value_type),
+              'invalid element types: ',
+              invalid_elem_types,
+          )
+
+    props = info.get('props')
+
+    if (
+        (props is None)
+        and
+        (not self.prop)
+        and
+        (not self.subelement)
+        and
+        (value_type in ['dict', 'simple_dict'])
+    ):
+      if (value_type != 'simple_dict') or not main_schema:
+        return error(
+            str('type: ' + value_type),
+            'msg: props not defined for schema'
+        )
+
+    if props and self.prop:
+      return error(
           str('type: ' + value_type),
-          'msg: props not defined for schema'
-      ]]
-
-  if props and is_prop:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: props should not be defined inside a property (only in schemas)'
-    ]]
-  elif props and (value_type not in ['dict', 'simple_dict']):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: props should not be defined for a schema of this type'
-    ]]
-  elif props and (value_type == 'simple_dict') and main_schema:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: props should not be defined for a simple_dict with main_schema'
-    ]]
+          'msg: props should not be defined inside a property (only in schemas)'
+      )
+    elif props and (value_type not in ['dict', 'simple_dict']):
+      return error(
+          str('type: ' + value_type),
+          'msg: props should not be defined for a schema of this type'
+      )
+    elif props and (value_type == 'simple_dict') and main_schema:
+      return error(
+          str('type: ' + value_type),
+          'msg: props should not be defined for a simple_dict with main_schema'
+      )
 
-  if choices and regex:
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: when choices is specified, regex cannot be specified',
-    ]]
-  elif choices and (minimum is not None):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: when choices is specified, min cannot be specified',
-    ]]
-  elif choices and (maximum is not None):
-    return [[
-        str('context: dynamic schema'),
-        str('schema_name: ' + schema_name + schema_suffix),
-        str('at: ' + (schema_ctx or '<root>')),
-        str('type: ' + value_type),
-        'msg: when choices is specified, max cannot be specified',
-    ]]
+    if choices and regex:
+      return error(
+          str('type: ' + value_type),
+          'msg: when choices is specified, regex cannot be specified',
+      )
+    elif choices and (minimum is not None):
+      return error(
+          str('type: ' + value_type),
+          'msg: when choices is specified, min cannot be specified',
+      )
+    elif choices and (maximum is not None):
+      return error(
+          str('type: ' + value_type),
+          'msg: when choices is specified, max cannot be specified',
+      )
+
+    self.value_type = value_type
+    self.is_primitive_type = value_type in PRIMITIVE_TYPES
+    self.is_dict_type = value_type in ['dict', 'simple_dict']
+    self.choices = choices
+    self.choices_set = None
+    self.regex = regex
+    self.minimum = minimum
+    self.maximum = maximum
+    self.main_schema = main_schema
+    self.elem_type = elem_type
+    self.elem_key_regex = elem_key_regex
+    self.props = props
+    self.lax = info.get('lax')
+    self.props_sorted = sorted(props.keys()) if props else None
+    self.required_props = [
+        key
+        for key in list(props.keys())
+        if props.get(key) and (
+            props.get(key).get('required') or props.get(key).get('non_empty')
+        )
+    ] if (props and self.is_dict_type) else None
+
+    if choices:
+      try:
+        self.choices_set = set(choices)
+      except TypeError:
+        self.choices_set = None
+
+    return None
+
+  def check_definition(self):
+    # the definition is validated only once, when first needed (the error
+    # is returned, and is None when the definition is valid)
+    if not self.definition_checked:
+      self.definition_error = self._definition_error()
+      self.definition_checked = True
 
-  is_list = isinstance(value, list)
-  is_dict = isinstance(value, dict)
-  is_string = is_str(value)
-
-  if non_empty:
-    if is_list:
-      if not value:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
-            'msg: list is empty'
-        ]]
-    elif is_dict:
-      if not value:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
-            'msg: dict is empty'
-        ]]
+    return self.definition_error
+
+  def error(self, *msgs):
+    return ([self.label], list(msgs))
+
+  def child_key(self, *steps):
+    # stable identification of the node in the schema (None for nodes that
+    # are not reachable from a named schema)
+    if self.key is None:
+      return None
+
+    return self.key + steps
+
+  def pattern(self):
+    if self._pattern is None:
+      self._pattern = re.compile(self.regex)
+
+    return self._pattern
+
+  def elem_key_pattern(self):
+    if self._elem_key_pattern is None:
+      self._elem_key_pattern = re.compile(self.elem_key_regex)
+
+    return self._elem_key_pattern
+
+  def next_node(self):
+    if self._next_node is None:
+      self._next_node = self.compiled.named_node(self.next_schema)
+
+    return self._next_node
+
+  def alternative_node(self):
+    if self._alternative_node is None:
+      info = self.info
+      new_schema_info = dict(
+          type=info.get('alternative_type'),
+          choices=info.get('alternative_choices'),
+          regex=info.get('alternative_regex'),
+          min=info.get('alternative_min'),
+          max=info.get('alternative_max'),
+          schema=info.get('alternative_schema'),
+          required=self.required,
+          non_empty=self.non_empty,
+      )
+      self._alternative_node = SchemaNode(
+          self.compiled,
+          name=self.name + ' (' + self.value_type + ' - alternative)',
+          info=new_schema_info,
+          prop=self.prop,
+          subelement=self.subelement,
+          required=self.required,
+          simple=True,
+          key=self.child_key('alternative'),
+      )
+
+    return self._alternative_node
+
+  def single_node(self):
+    if self._single_node is None:
+      info = self.info
+      new_schema_info = dict(
+          type=info.get('elem_type'),
+          alternative_type=info.get('elem_alternative_type'),
+          alternative_choices=info.get('elem_alternative_choices'),
+          alternative_regex=info.get('elem_alternative_regex'),
+          alternative_min=info.get('elem_alternative_min'),
+          alternative_max=info.get('elem_alternative_max'),
+          schema=info.get('elem_schema'),
+          required=info.get('elem_required'),
+          non_empty=info.get('elem_non_empty'),
+          choices=info.get('elem_choices'),
+          regex=info.get('elem_regex'),
+          min=info.get('elem_min'),
+          max=info.get('elem_max'),
+      )
+      self._single_node = SchemaNode(
+          self.compiled,
+          name=self.name + ' (' + self.value_type + ' - single)',
+          info=new_schema_info,
+          prop=self.prop,
+          subelement=self.subelement,
+          required=self.required,
+          simple=True,
+          key=self.child_key('single'),
+      )
+
+    return self._single_node
+
+  def main_node(self):
+    if self._main_node is None:
+      new_schema_info = dict(
+          schema=self.main_schema,
+          required=self.required,
+          non_empty=self.non_empty,
+          prop=self.prop,
+          subelement=self.subelement,
+      )
+      self._main_node = SchemaNode(
+          self.compiled,
+          name=self.name + ' (' + self.value_type + ' - main)',
+          info=new_schema_info,
+          required=self.required,
+          simple=True,
+          key=self.child_key('main'),
+      )
+
+    return self._main_node
+
+  def elem_node(self):
+    if self._elem_node is None:
+      info = self.info
+      new_schema_info = dict(
+          type=info.get('elem_type'),
+          alternative_type=info.get('elem_alternative_type'),
+          alternative_choices=info.get('elem_alternative_choices'),
+          alternative_regex=info.get('elem_alternative_regex'),
+          alternative_min=info.get('elem_alternative_min'),
+          alternative_max=info.get('elem_alternative_max'),
+          schema=info.get('elem_schema'),
+          main_schema=info.get('elem_main_schema'),
+          alternative_schema=info.get('elem_alternative_schema'),
+          required=info.get('elem_required'),
+          non_empty=info.get('elem_non_empty'),
+          choices=info.get('elem_choices'),
+          regex=info.get('elem_regex'),
+          min=info.get('elem_min'),
+          max=info.get('elem_max'),
+      )
+      self._elem_node = SchemaNode(
+          self.compiled,
+          name=self.name,
+          info=new_schema_info,
+          prop=False,
+          subelement=True,
+          required=info.get('elem_required'),
+          key=self.child_key('elem'),
+      )
+
+    return self._elem_node
+
+  def prop_node(self, key):
+    node = self._prop_nodes.get(key)
+
+    if node is None:
+      new_schema_info = self.props.get(key)
+      node = SchemaNode(
+          self.compiled,
+          name=self.name,
+          info=new_schema_info,
+          prop=True,
+          subelement=False,
+          required=new_schema_info.get('required'),
+          key=self.child_key('prop', key),
+      )
+      self._prop_nodes[key] = node
+
+    return node
+
+  def is_primitive_node(self):
+    # nodes of primitive values without child nodes, whose values can be
+    # checked in bulk (see is_valid_primitive)
+    if self.info is None:
+      return False
+
+    try:
+      self.check_definition()
+    except Exception:
+      # the error is raised again when the values are visited
+      return False
+
+    return (not self.definition_error) and (not self.next_schema) and self.is_primitive_type
+
+  def is_valid_primitive(self, value):
+    """
+    Fast check of a value of a primitive node (see is_primitive_node). Returns
+    True only when the value is certainly valid (visit would return no steps).
+    The other values must be visited, to return the same errors as before.
+    """
+    value_class = type(value)
+    value_type = self.value_type
+
+    if is_str(value):
+      if value_type not in ['str', 'primitive']:
+        return False
+
+      if self.non_empty and not value:
+        return False
+
+      if self.regex and not self.pattern().search(value):
+        return False
+
+      if (self.minimum is not None) and (len(value) < self.minimum):
+        return False
+
+      if (self.maximum is not None) and (len(value) > self.maximum):
+        return False
+    elif value_class in [int, float]:
+      if value_type not in ['primitive', 'int' if (value_class is int) else 'float']:
+        return False
+
+      if (self.minimum is not None) and (value < self.minimum):
+        return False
+
+      if (self.maximum is not None) and (value > self.maximum):
+        return False
+    elif value_class is bool:
+      if value_type not in ['bool', 'primitive']:
+        return False
     else:
-      if not str(value):
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
-            'msg: value is empty'
-        ]]
-
-  if value is not None:
-    if value_type in ['list']:
+      return False
+
+    if self.choices:
+      return (self.choices_set is not None) and (value in self.choices_set)
+
+    return True
+
+  def in_choices(self, value):
+    if self.choices_set is not None:
+      try:
+        return value in self.choices_set
+      except TypeError:
+        pass
+
+    return value in self.choices
+
+  def visit(self, value):
+    """
+    Validates the value against this node (without descending into its
+    children) and returns the list of steps to be processed in order, each
+    one being either an error, represented as (None, error), or a child
+    validation, represented as (node, value, path_step). The path step
+    is None when the child is validated at the same path.
+    """
+    if self.info is None:
+      return [(None, (
+          ['context: dynamic schema', self.label],
+          ['msg: schema is not defined'],
+      ))]
+
+    if self.check_defined and (value is None):
+      non_empty_info = ' (' + ('non_empty' if self.non_empty else 'required') + ')'
+      return [(None, self.error(str('msg: value is not defined' + non_empty_info)))]
+
+    definition_error = self.check_definition()
+
+    if definition_error:
+      return [(None, definition_error)]
+
+    if self.next_schema:
+      return [(self.next_node(), value, None)]
+
+    value_type = self.value_type
+    is_list = isinstance(value, list)
+    is_dict = isinstance(value, dict)
+
+    if self.non_empty:
+      if is_list:
+        if not value:
+          return [(None, self.error('msg: list is empty'))]
+      elif is_dict:
+        if not value:
+          return [(None, self.error('msg: dict is empty'))]
+      else:
+        if not str(value):
+          return [(None, self.error('msg: value is empty'))]
+
+    if value is None:
+      return []
+
+    if value_type == 'list':
       if not is_list:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+        return [(None, self.error(
             str('type: ' + value_type),
             str('value type: ' + str(type(value))),
             'msg: value expected to be a list',
-        ]]
+        ))]
     elif value_type in ['dict', 'map']:
       if not is_dict:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+        return [(None, self.error(
             str('type: ' + value_type),
             str('value type: ' + str(type(value))),
             'msg: value expected to be a dictionary'
-        ]]
+        ))]
     elif value_type == 'simple_dict':
       if not is_dict:
-        new_schema_info = dict(
-            type=alternative_type,
-            choices=alternative_choices,
-            regex=alternative_regex,
-            min=alternative_min,
-            max=alternative_max,
-            schema=alternative_schema,
-            required=required,
-            non_empty=non_empty,
-        )
-
-        new_schema_data = dict(
-            name=schema_name + ' (' + value_type + ' - alternative)',
-            ctx=schema_ctx,
-            info=new_schema_info,
-            dict=schema_info_dict,
-            prop=is_prop,
-            subelement=is_subelement,
-            required=required,
-            simple=True,
-        )
-
-        return validate_next_value(new_schema_data, value)
+        return [(self.alternative_node(), value, None)]
     elif value_type in ['simple_map', 'simple_list']:
       if (
           ((value_type == 'simple_list') and not is_list)
           or
           ((value_type == 'simple_map') and not is_dict)
       ):
-
-        new_schema_info = dict(
-            type=elem_type,
-            alternative_type=elem_alternative_type,
-            alternative_choices=elem_alternative_choices,
-            alternative_regex=elem_alternative_regex,
-            alternative_min=elem_alternative_min,
-            alternative_max=elem_alternative_max,
-            schema=elem_schema_name,
-            required=elem_required,
-            non_empty=elem_non_empty,
-            choices=elem_choices,
-            regex=elem_regex,
-            min=elem_min,
-            max=elem_max,
-        )
-
-        new_schema_data = dict(
-            name=schema_name + ' (' + value_type + ' - single)',
-            ctx=schema_ctx,
-            info=new_schema_info,
-            dict=schema_info_dict,
-            prop=is_prop,
-            subelement=is_subelement,
-            required=required,
-            simple=True,
-        )
-
-        return validate_next_value(new_schema_data, value)
+        return [(self.single_node(), value, None)]
     elif value_type == 'str':
-      if not is_string:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+      if not is_str(value):
+        return [(None, self.error(
             str('type: ' + value_type),
             str('value type: ' + str(type(value))),
             'msg: value expected to be a string'
-        ]]
+        ))]
     elif value_type != 'unknown':
       if is_list or is_dict:
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+        return [(None, self.error(
             str('type: ' + value_type),
             str('value type: ' + str(type(value))),
             'msg: value expected to be a primitive'
-        ]]
+        ))]
 
-    if value_type in primitive_types and (str(value) != ''):
+    if self.is_primitive_type and (str(value) != ''):
       if (value_type == 'bool') and (not isinstance(value, bool)):
         if not is_bool(value):
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('value type: ' + str(type(value))),
               'msg: value should be a boolean',
-          ]]
+          ))]
       elif (
           (value_type == 'int')
           and
           (isinstance(value, bool) or not isinstance(value, int))
       ):
         if (not is_str(value)) or (not is_int(value)):
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('value type: ' + str(type(value))),
               'msg: value should be an integer',
-          ]]
+          ))]
       elif (value_type == 'float') and (not isinstance(value, float)):
         if (not is_str(value)) or (not is_float(value)):
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('value type: ' + str(type(value))),
               'msg: value should be a float',
-          ]]
+          ))]
 
-    if choices:
+    if self.choices:
       values_for_choices = (value or []) if is_list else [value]
-      values_item_type = (elem_type or '') if is_list else (value_type or '')
+      values_item_type = (self.elem_type or '') if is_list else (value_type or '')
 
       for value_item in values_for_choices:
         if isinstance(value_item, dict):
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               'msg: value is a dictionary, but has choices defined for it',
-          ]]
+          ))]
         elif isinstance(value_item, list):
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               'msg: value is a list, but has choices defined for it',
-          ]]
+          ))]
         else:
           value_to_compare = (
               value_item
@@ -860,10 +858,10 @@ def validate_next_value(schema_data, value):
               else to_bool(value_item)
           )
 
-          if (value_to_compare not in choices):
+          if not self.in_choices(value_to_compare):
             non_empty = (value_to_compare is not None)
             non_empty = non_empty and (
-                (values_item_type not in primitive_types) or (str(value_to_compare) != '')
+                (values_item_type not in PRIMITIVE_TYPES) or (str(value_to_compare) != '')
             )
 
             if non_empty:
@@ -873,38 +871,32 @@ def validate_next_value(schema_data, value):
                   else values_item_type
               )
 
-              return [[
-                  str('schema_name: ' + schema_name + schema_suffix),
-                  str('at: ' + (schema_ctx or '<root>')),
+              return [(None, self.error(
                   str('type: ' + type_info),
                   str('value: ' + str(value_item)),
                   'msg: value is invalid',
                   'valid choices:',
-                  choices
-              ]]
-
-    if regex:
-      pattern = re.compile(regex)
+                  self.choices
+              ))]
 
-      if not pattern.search(value):
-        return [[
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
+    if self.regex:
+      if not self.pattern().search(value):
+        return [(None, self.error(
             str('type: ' + value_type),
-            str('regex: ' + regex),
+            str('regex: ' + self.regex),
             'msg: value is invalid (not compatible with the regex specified)',
-        ]]
+        ))]
+
+    minimum = self.minimum
 
     if minimum is not None:
       if value_type == 'str':
         if len(value) < minimum:
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('min: ' + str(minimum)),
               'msg: value is invalid (the length of the string is less than the minimum specified)',
-          ]]
+          ))]
       elif value_type in ['int', 'float']:
         numeric_value = (
             to_int(value)
@@ -913,34 +905,32 @@ def validate_next_value(schema_data, value):
         )
 
         if numeric_value < minimum:
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('min: ' + str(minimum)),
               'msg: value is invalid (numeric value is less than the minimum specified)',
-          ]]
+          ))]
       else:
-        return [[
-            str('context: dynamic schema (unexpected)'),
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
-            str('type: ' + value_type),
-            'msg: min property is not allowed with this value type',
-            'allowed types:',
-            ['str', 'int', 'float'],
-        ]]
+        return [(None, (
+            ['context: dynamic schema (unexpected)', self.label],
+            [
+                str('type: ' + value_type),
+                'msg: min property is not allowed with this value type',
+                'allowed types:',
+                ['str', 'int', 'float'],
+            ],
+        ))]
+
+    maximum = self.maximum
 
     if maximum is not None:
       if value_type == 'str':
         if len(value) > maximum:
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('max: ' + str(maximum)),
               'msg: value is invalid (the length of the string is more than the maximum specified)',
-          ]]
+          ))]
       elif value_type in ['int', 'float']:
         numeric_value = (
             to_int(value)
@@ -949,208 +939,1263 @@ def validate_next_value(schema_data, value):
         )
 
         if numeric_value > maximum:
-          return [[
-              str('schema_name: ' + schema_name + schema_suffix),
-              str('at: ' + (schema_ctx or '<root>')),
+          return [(None, self.error(
               str('type: ' + value_type),
               str('max: ' + str(maximum)),
               'msg: value is invalid (numeric value is more than the maximum specified)',
-          ]]
+          ))]
       else:
-        return [[
-            str('context: dynamic schema (unexpected)'),
-            str('schema_name: ' + schema_name + schema_suffix),
-            str('at: ' + (schema_ctx or '<root>')),
-            str('type: ' + value_type),
-            'msg: max property is not allowed with this value type',
-            'allowed types:',
-            ['str', 'int', 'float'],
-        ]]
-
-    if main_schema:
-      new_schema_info = dict(
-          schema=main_schema,
-          required=required,
-          non_empty=non_empty,
-          prop=is_prop,
-          subelement=is_subelement,
-      )
+        return [(None, (
+            ['context: dynamic schema (unexpected)', self.label],
+            [
+                str('type: ' + value_type),
+                'msg: max property is not allowed with this value type',
+                'allowed types:',
+                ['str', 'int', 'float'],
+            ],
+        ))]
 
-      new_schema_data = dict(
-          name=schema_name + ' (' + value_type + ' - main)',
-          ctx=schema_ctx,
-          info=new_schema_info,
-          dict=schema_info_dict,
-          required=required,
-          simple=True,
-      )
+    if self.main_schema:
+      return [(self.main_node(), value, None)]
 
-      return validate_next_value(new_schema_data, value)
+    steps = []
 
     if value_type != 'unknown':
-      error_msgs = []
-
       if is_list:
-        for idx, elem_value in enumerate(value):
-          new_schema_info = dict(
-              type=elem_type,
-              alternative_type=elem_alternative_type,
-              alternative_choices=elem_alternative_choices,
-              alternative_regex=elem_alternative_regex,
-              alternative_min=elem_alternative_min,
-              alternative_max=elem_alternative_max,
-              schema=elem_schema_name,
-              main_schema=elem_main_schema,
-              alternative_schema=elem_alternative_schema_name,
-              required=elem_required,
-              non_empty=elem_non_empty,
-              choices=elem_choices,
-              regex=elem_regex,
-              min=elem_min,
-              max=elem_max,
-          )
-
-          new_schema_data = dict(
-              name=schema_name,
-              ctx=schema_ctx + '[' + str(idx) + ']',
-              info=new_schema_info,
-              dict=schema_info_dict,
-              prop=False,
-              subelement=True,
-              required=elem_required
-          )
-
-          error_msgs += validate_next_value(new_schema_data, elem_value)
+        elem_node = self.elem_node()
+
+        if value and elem_node.is_primitive_node():
+          # only the elements that may be invalid are visited
+          is_valid = elem_node.is_valid_primitive
+          steps = [
+              (elem_node, elem_value, ('idx', idx))
+              for idx, elem_value in enumerate(value)
+              if not is_valid(elem_value)
+          ]
+        else:
+          for idx, elem_value in enumerate(value):
+            steps += [(elem_node, elem_value, ('idx', idx))]
       elif is_dict:
         keys = list(value.keys())
 
-        if elem_key_regex:
-          for key in sorted(keys):
-            pattern = re.compile(elem_key_regex)
+        if self.elem_key_regex:
+          pattern = self.elem_key_pattern()
 
+          for key in sorted(keys):
             if not pattern.search(key):
-              return [[
-                  str('schema_name: ' + schema_name + schema_suffix),
-                  str('at: ' + (schema_ctx or '<root>')),
+              return [(None, self.error(
                   str('type: ' + value_type),
                   str('key: ' + key),
-                  str('elem_key_regex: ' + elem_key_regex),
+                  str('elem_key_regex: ' + self.elem_key_regex),
                   'msg: dictionary key is invalid (not compatible with the regex specified)',
-              ]]
+              ))]
 
         # required or non-empty properties
-        if props and (value_type in ['dict', 'simple_dict']):
-          for key in list(props.keys()):
-            prop_value = props.get(key)
+        if self.required_props:
+          keys = list(set(keys + self.required_props))
 
-            if prop_value and (prop_value.get('required') or prop_value.get('non_empty')):
-              keys += [key]
+        if self.is_dict_type:
+          props = self.props
 
-          keys = list(set(keys))
-
-        for key in sorted(keys):
-          elem_value = value.get(key)
-
-          if value_type in ['dict', 'simple_dict']:
-            if props:
+          if props:
+            for key in sorted(keys):
               if key not in props:
-                if not schema_info.get('lax'):
-                  error_msgs += [[
-                      str('schema_name: ' + schema_name + schema_suffix),
-                      str('at: ' + (schema_ctx or '<root>')),
+                if not self.lax:
+                  steps += [(None, self.error(
                       str('property: ' + str(key)),
                       'msg: property not defined in schema',
                       'allowed: ',
-                      sorted(props.keys())
-                  ]]
+                      list(self.props_sorted),
+                  ))]
               else:
-                new_schema_info = props.get(key)
-
-                new_schema_data = dict(
-                    name=schema_name,
-                    ctx=schema_ctx + (schema_ctx and '.') + key,
-                    info=new_schema_info,
-                    dict=schema_info_dict,
-                    prop=True,
-                    subelement=False,
-                    required=new_schema_info.get('required')
-                )
-
-                error_msgs += validate_next_value(new_schema_data, elem_value)
+                steps += [(self.prop_node(key), value.get(key), ('prop', key))]
+        else:
+          elem_node = self.elem_node()
+
+          for key in sorted(keys):
+            steps += [(elem_node, value.get(key), ('key', key))]
+
+    return steps
+
+
+class CompiledSchema:
+  """
+  Schema (root + schemas) compiled into a tree of schema nodes. The nodes
+  corresponding to named schemas are resolved only once, and the nodes are
+  created lazily when first needed, allowing recursive schemas.
+  """
+
+  def __init__(self, schema_info_dict, root_name=None):
+    self.schema_info_dict = schema_info_dict
+    self.root_name = root_name
+    self.named_nodes = dict()
+
+  def named_node(self, name):
+    node = self.named_nodes.get(name)
+
+    if node is None:
+      node = SchemaNode(
+          self,
+          name=name,
+          info=self.schema_info_dict.get(name),
+          prop=False,
+          subelement=False,
+          required=True,
+          key=('schema', name),
+      )
+      self.named_nodes[name] = node
+
+    return node
+
+  def validate(self, value, max_errors=None, validation_cache=None):
+    return validate_node(
+        self.named_node(self.root_name),
+        value,
+        '',
+        max_errors=max_errors,
+        validation_cache=validation_cache,
+    )
+
+
+class ValidationCache:
+  """
+  Subtrees of the validated values already proven valid for the nodes of a
+  schema. Each subtree (dict or list) is identified by a merkle hash, in which
+  the hash of a dict or list is calculated from the hashes of its items, so a
+  change in a value invalidates only the hashes of the subtrees that contain it.
+  The subtrees with vault encrypted values are not hashed (nor cached).
+
+  The keys are kept in the order in which they were last used, and are
+  persisted only once in the process (see save_validation_caches), merged
+  with the keys persisted by other processes, with the least recently used
+  keys removed when the limit is reached.
+  """
+
+  def __init__(self, schema_hash, cache_file=None, valid_keys=None):
+    self.schema_hash = schema_hash
+    self.cache_file = cache_file
+    self.valid_keys = OrderedDict((key, True) for key in (valid_keys or []))
+    self.used_keys = OrderedDict()
+    self.changed = False
+    self.hits = 0
+    self._hashes = dict()
+
+  def value_hash(self, value):
+    # the hashes are kept by id only during a validation (see clear_hashes),
+    # and calculated with an explicit stack (the items before the dict or
+    # list that contains them), so deeply nested values don't reach the
+    # recursion limit; the hash is None when the value has encrypted values
+    hashes = self._hashes
+    cached = hashes.get(id(value))
+
+    if cached is not None:
+      return cached[1]
+
+    stack = [(value, False)]
+
+    while stack:
+      current, ready = stack.pop()
+
+      if id(current) in hashes:
+        continue
+
+      items = current.values() if isinstance(current, dict) else current
+
+      if not ready:
+        stack += [(current, True)]
+        stack += [
+            (item, False)
+            for item in items
+            if isinstance(item, (dict, list)) and (id(item) not in hashes)
+        ]
+        continue
+
+      # the primitive values are represented directly in the hash of the
+      # dict or list that contains them
+      if isinstance(current, dict):
+        prefix = b'd'
+        parts = [(repr(key), self.item_part(item)) for key, item in current.items()]
+        parts = None if any(part is None for _, part in parts) else sorted(
+            key.encode('utf-8') + part for key, part in parts
+        )
+      else:
+        prefix = b'l'
+        parts = [self.item_part(item) for item in items]
+        parts = None if any(part is None for part in parts) else parts
+
+      digest = hashlib.sha1(
+          prefix + b'\0'.join(parts)
+      ).hexdigest().encode('ascii') if (parts is not None) else None
+
+      # the value is kept with the hash, so that its id is not reused
+      hashes[id(current)] = (current, digest)
+
+    return hashes[id(value)][1]
+
+  def item_part(self, item):
+    if isinstance(item, (dict, list)):
+      digest = self._hashes[id(item)][1]
+      return (b'=' + digest) if (digest is not None) else None
+    elif is_encrypted(item):
+      return None
+
+    return b':' + repr(item).encode('utf-8')
+
+  def named_key(self, name, value):
+    # only non-empty dicts and lists validated by named schemas are cached
+    # (the nodes in which most of the subtrees are validated)
+    if (not value) or not isinstance(value, (dict, list)):
+      return None
+
+    digest = self.value_hash(value)
+
+    return (name, digest) if (digest is not None) else None
+
+  def valid_key(self, node, value):
+    if len(node.key) != 2:
+      return None
+
+    return self.named_key(node.key[1], value)
+
+  def is_valid(self, valid_key):
+    if valid_key not in self.valid_keys:
+      return False
+
+    self.hits += 1
+    self.used_keys[valid_key] = True
+    self.used_keys.move_to_end(valid_key)
+
+    return True
+
+  def add(self, valid_key):
+    if valid_key not in self.valid_keys:
+      self.valid_keys[valid_key] = True
+      self.used_keys[valid_key] = True
+      self.used_keys.move_to_end(valid_key)
+      self.changed = True
+
+  def clear_hashes(self):
+    self._hashes = dict()
+
+  def save(self):
+    if (not self.changed) or (not self.cache_file):
+      return
+
+    cache_dir = os.path.dirname(self.cache_file)
+    lock_file = None
+
+    try:
+      # the keys are merged with the keys persisted by other processes under
+      # a lock (when supported), so that concurrent processes keep each other's
+      # keys; the keys persisted by other processes are more recent than the
+      # keys loaded by this process, but not more than the keys used in it
+      if fcntl is not None:
+        try:
+          if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+
+          lock_file = open(self.cache_file + '.lock', 'a', encoding='utf-8')
+          fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except (IOError, OSError):
+          if lock_file is not None:
+            lock_file.close()
+            lock_file = None
+
+      valid_keys = OrderedDict(self.valid_keys)
+
+      for key in load_validation_keys(self.cache_file, self.schema_hash) or []:
+        valid_keys[key] = True
+        valid_keys.move_to_end(key)
+
+      for key in self.used_keys:
+        valid_keys[key] = True
+        valid_keys.move_to_end(key)
+
+      while len(valid_keys) > VALIDATION_CACHE_MAX_KEYS:
+        valid_keys.popitem(last=False)
+
+      save_parse_cache_file(
+          cache_dir,
+          self.cache_file,
+          dict(
+              version=VALIDATION_CACHE_VERSION,
+              schema_hash=self.schema_hash,
+              valid_keys=list(valid_keys),
+          ),
+      )
+
+      self.valid_keys = valid_keys
+      self.used_keys = OrderedDict()
+      self.changed = False
+    finally:
+      if lock_file is not None:
+        lock_file.close()
+
+
+class SchemaCodeGenerator:
+  """
+  Generates the source of a python module that validates values according to
+  a compiled schema, with one function for each schema node. The checks that
+  depend only on the schema (types, choices, regexes, min/max and the
+  definition errors) are resolved when generating the code, and the errors
+  are the same as the ones returned by validate_node.
+  """
+
+  def __init__(self, compiled, schema_hash):
+    self.compiled = compiled
+    self.schema_hash = schema_hash
+    self.names = dict()
+    self.pending = list()
+    self.lines = list()
+    self.const_lines = list()
+    self.table_lines = list()
+
+  def lit(self, value):
+    text = repr(value)
+
+    if ast.literal_eval(text) != value:
+      raise ValueError('value not representable in the generated code: ' + text)
+
+    return text
+
+  def const(self, value, expression=None):
+    name = '_c' + str(len(self.const_lines))
+    self.const_lines += [name + ' = ' + (expression or self.lit(value))]
+    return name
+
+  def node_function(self, node):
+    # the nodes are kept alive by the compiled schema, so their ids are not reused
+    name = self.names.get(id(node))
+
+    if name is None:
+      name = '_v' + str(len(self.names))
+      self.names[id(node)] = name
+      self.pending += [(node, name)]
+
+    return name
+
+  def error(self, head, tail):
+    return '[' + ', '.join(
+        [self.lit(item) for item in head] + ['_at(ctx)'] + list(tail)
+    ) + ']'
+
+  def node_error(self, node, *tail):
+    return self.error([node.label], tail)
+
+  def type_error(self, node, msg):
+    return self.node_error(
+        node,
+        self.lit(str('type: ' + node.value_type)),
+        "'value type: ' + str(type(value))",
+        self.lit(msg),
+    )
+
+  def generate(self):
+    root_name = self.node_function(self.compiled.named_node(self.compiled.root_name))
+
+    while self.pending:
+      node, name = self.pending.pop(0)
+      self.generate_node(node, name)
+
+    return '\n'.join(
+        [
+            '# generated by lrd_util_schema (SchemaCodeGenerator), do not edit',
+            '# schema hash: ' + self.schema_hash,
+            '',
+            'import re',
+            '',
+            'from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (',
+            '    is_bool, is_float, is_int, is_str, to_bool, to_float, to_int',
+            ')',
+            '',
+            'SCHEMA_CODEGEN_VERSION = ' + self.lit(SCHEMA_CODEGEN_VERSION),
+            'SCHEMA_HASH = ' + self.lit(self.schema_hash),
+            '',
+        ]
+        + self.const_lines
+        + [
+            '',
+            '',
+            'class DepthExceeded(Exception):',
+            '  pass',
+            '',
+            '',
+            'def _at(ctx):',
+            "  return 'at: ' + (ctx or '<root>')",
+            '',
+            '',
+            'def _in_choices(value, choices_set, choices):',
+            '  if choices_set is not None:',
+            '    try:',
+            '      return value in choices_set',
+            '    except TypeError:',
+            '      pass',
+            '',
+            '  return value in choices',
+        ]
+        + self.lines
+        + ['']
+        + self.table_lines
+        + [
+            '',
+            '',
+            'def validate(value, max_errors=None, validation_cache=None, fallback=None):',
+            '  # the values nested too deeply to be validated recursively are',
+            '  # validated again by the fallback (the interpreted validation)',
+            '  try:',
+            "    return " + root_name + "(value, '', max_errors, validation_cache, 0)",
+            '  except DepthExceeded:',
+            '    if fallback is None:',
+            '      raise',
+            '',
+            '  return fallback(value, max_errors=max_errors, validation_cache=validation_cache)',
+            '',
+        ]
+    )
+
+  def generate_node(self, node, name):
+    lines = self.lines
+    lines += ['', '']
+
+    if (node.key is not None) and (len(node.key) == 2):
+      # the subtrees proven valid by named schemas are cached (see ValidationCache)
+      lines += [
+          'def ' + name + '(value, ctx, max_errors, cache, depth):',
+          '  valid_key = (',
+          '      cache.named_key(' + self.lit(node.key[1]) + ', value)',
+          '      if (cache is not None)',
+          '      else None',
+          '  )',
+          '',
+          '  if (valid_key is not None) and cache.is_valid(valid_key):',
+          '    return []',
+          '',
+          '  error_msgs = ' + name + '_node(value, ctx, max_errors, cache, depth + 1)',
+          '',
+          '  if (valid_key is not None) and (not error_msgs):',
+          '    cache.add(valid_key)',
+          '',
+          '  return error_msgs',
+          '',
+          '',
+      ]
+      name = name + '_node'
+
+    lines += [
+        'def ' + name + '(value, ctx, max_errors, cache, depth):',
+        '  if depth > ' + self.lit(SCHEMA_CODEGEN_MAX_DEPTH) + ':',
+        '    raise DepthExceeded()',
+        '',
+    ]
+
+    if node.info is None:
+      lines += ['  return [' + self.error(
+          ['context: dynamic schema', node.label],
+          [self.lit('msg: schema is not defined')],
+      ) + ']']
+      return
+
+    if node.check_defined:
+      non_empty_info = ' (' + ('non_empty' if node.non_empty else 'required') + ')'
+      lines += [
+          '  if value is None:',
+          '    return [' + self.node_error(
+              node, self.lit(str('msg: value is not defined' + non_empty_info))
+          ) + ']',
+          '',
+      ]
+
+    definition_error = node.check_definition()
+
+    if definition_error:
+      head, tail = definition_error
+      lines += ['  return [' + self.error(head, [self.lit(item) for item in tail]) + ']']
+      return
+
+    if node.next_schema:
+      lines += [
+          '  return ' + self.node_function(node.next_node())
+          + '(value, ctx, max_errors or None, cache, depth + 1)'
+      ]
+      return
+
+    value_type = node.value_type
+
+    lines += [
+        '  is_list = isinstance(value, list)',
+        '  is_dict = isinstance(value, dict)',
+        '',
+    ]
+
+    if node.non_empty:
+      lines += [
+          '  if is_list:',
+          '    if not value:',
+          '      return [' + self.node_error(node, self.lit('msg: list is empty')) + ']',
+          '  elif is_dict:',
+          '    if not value:',
+          '      return [' + self.node_error(node, self.lit('msg: dict is empty')) + ']',
+          '  elif not str(value):',
+          '    return [' + self.node_error(node, self.lit('msg: value is empty')) + ']',
+          '',
+      ]
+
+    if not node.check_defined:
+      lines += [
+          '  if value is None:',
+          '    return []',
+          '',
+      ]
+
+    if value_type == 'list':
+      lines += [
+          '  if not is_list:',
+          '    return [' + self.type_error(node, 'msg: value expected to be a list') + ']',
+          '',
+      ]
+    elif value_type in ['dict', 'map']:
+      lines += [
+          '  if not is_dict:',
+          '    return [' + self.type_error(node, 'msg: value expected to be a dictionary') + ']',
+          '',
+      ]
+    elif value_type == 'simple_dict':
+      lines += [
+          '  if not is_dict:',
+          '    return ' + self.node_function(node.alternative_node())
+          + '(value, ctx, max_errors or None, cache, depth + 1)',
+          '',
+      ]
+    elif value_type in ['simple_map', 'simple_list']:
+      lines += [
+          '  if not ' + ('is_list' if value_type == 'simple_list' else 'is_dict') + ':',
+          '    return ' + self.node_function(node.single_node())
+          + '(value, ctx, max_errors or None, cache, depth + 1)',
+          '',
+      ]
+    elif value_type == 'str':
+      lines += [
+          '  if not is_str(value):',
+          '    return [' + self.type_error(node, 'msg: value expected to be a string') + ']',
+          '',
+      ]
+    elif value_type != 'unknown':
+      lines += [
+          '  if is_list or is_dict:',
+          '    return [' + self.type_error(node, 'msg: value expected to be a primitive') + ']',
+          '',
+      ]
+
+    if node.is_primitive_type:
+      condition = None
+      msg = None
+
+      if value_type == 'bool':
+        condition = '(not isinstance(value, bool)) and (not is_bool(value))'
+        msg = 'msg: value should be a boolean'
+      elif value_type == 'int':
+        condition = (
+            '(isinstance(value, bool) or not isinstance(value, int))'
+            + ' and ((not is_str(value)) or (not is_int(value)))'
+        )
+        msg = 'msg: value should be an integer'
+      elif value_type == 'float':
+        condition = (
+            '(not isinstance(value, float))'
+            + ' and ((not is_str(value)) or (not is_float(value)))'
+        )
+        msg = 'msg: value should be a float'
+
+      if condition:
+        lines += [
+            "  if (str(value) != '') and " + condition + ':',
+            '    return [' + self.type_error(node, msg) + ']',
+            '',
+        ]
+
+    if node.choices:
+      self.generate_choices(node)
+
+    if node.regex:
+      pattern = self.const(None, 're.compile(' + self.lit(node.regex) + ')')
+      lines += [
+          '  if not ' + pattern + '.search(value):',
+          '    return [' + self.node_error(
+              node,
+              self.lit(str('type: ' + value_type)),
+              self.lit(str('regex: ' + node.regex)),
+              self.lit('msg: value is invalid (not compatible with the regex specified)'),
+          ) + ']',
+          '',
+      ]
+
+    for limit, operator, label, description in [
+        (node.minimum, '<', 'min', 'less than the minimum'),
+        (node.maximum, '>', 'max', 'more than the maximum'),
+    ]:
+      if limit is not None:
+        self.generate_limit(node, limit, operator, label, description)
+
+    if node.main_schema:
+      lines += [
+          '  return ' + self.node_function(node.main_node())
+          + '(value, ctx, max_errors or None, cache, depth + 1)'
+      ]
+      return
+
+    if value_type in ['list', 'simple_list']:
+      lines += [
+          '  if is_list:',
+          '    error_msgs = []',
+          '',
+          '    for idx, elem_value in enumerate(value):',
+          '      if max_errors and (len(error_msgs) >= max_errors):',
+          '        break',
+          '',
+          '      error_msgs += ' + self.node_function(node.elem_node()) + '(',
+          '          elem_value,',
+          "          ctx + '[' + str(idx) + ']',",
+          '          (max_errors - len(error_msgs)) if max_errors else None,',
+          '          cache,',
+          '          depth + 1,',
+          '      )',
+          '',
+          '    return error_msgs',
+          '',
+      ]
+    elif value_type in ['dict', 'simple_dict', 'map', 'simple_map']:
+      self.generate_dict(node)
+
+    lines += ['  return []']
+
+  def generate_choices(self, node):
+    value_type = node.value_type
+    is_list_type = value_type in ['list', 'simple_list']
+    item_type = (node.elem_type or '') if is_list_type else (value_type or '')
+    type_info = (value_type + ' (elem: ' + item_type + ')') if is_list_type else item_type
+    choices = self.const(node.choices)
+    choices_set = (
+        self.const(None, 'frozenset(' + choices + ')')
+        if (node.choices_set is not None)
+        else 'None'
+    )
+    non_empty_condition = 'value_to_compare is not None'
+
+    if item_type in PRIMITIVE_TYPES:
+      non_empty_condition += " and (str(value_to_compare) != '')"
+
+    self.lines += [
+        '  for value_item in ' + ('(value or [])' if is_list_type else '[value]') + ':',
+        '    if isinstance(value_item, dict):',
+        '      return [' + self.node_error(
+            node, self.lit('msg: value is a dictionary, but has choices defined for it')
+        ) + ']',
+        '    elif isinstance(value_item, list):',
+        '      return [' + self.node_error(
+            node, self.lit('msg: value is a list, but has choices defined for it')
+        ) + ']',
+        '',
+        '    value_to_compare = ' + (
+            'to_bool(value_item)' if (item_type == 'bool') else 'value_item'
+        ),
+        '',
+        '    if not _in_choices(value_to_compare, ' + choices_set + ', ' + choices + '):',
+        '      if ' + non_empty_condition + ':',
+        '        return [' + self.node_error(
+            node,
+            self.lit(str('type: ' + type_info)),
+            "'value: ' + str(value_item)",
+            self.lit('msg: value is invalid'),
+            self.lit('valid choices:'),
+            choices,
+        ) + ']',
+        '',
+    ]
+
+  def generate_limit(self, node, limit, operator, label, description):
+    value_type = node.value_type
+    info = [self.lit(str('type: ' + value_type)), self.lit(str(label + ': ' + str(limit)))]
+
+    if value_type == 'str':
+      self.lines += [
+          '  if len(value) ' + operator + ' ' + self.lit(limit) + ':',
+          '    return [' + self.node_error(node, *(info + [self.lit(
+              'msg: value is invalid (the length of the string is '
+              + description + ' specified)'
+          )])) + ']',
+          '',
+      ]
+    elif value_type in ['int', 'float']:
+      self.lines += [
+          '  if ' + ('to_int' if value_type == 'int' else 'to_float') + '(value) '
+          + operator + ' ' + self.lit(limit) + ':',
+          '    return [' + self.node_error(node, *(info + [self.lit(
+              'msg: value is invalid (numeric value is ' + description + ' specified)'
+          )])) + ']',
+          '',
+      ]
+    else:
+      self.lines += [
+          '  return [' + self.error(
+              ['context: dynamic schema (unexpected)', node.label],
+              [self.lit(item) for item in [
+                  str('type: ' + value_type),
+                  'msg: ' + label + ' property is not allowed with this value type',
+                  'allowed types:',
+                  ['str', 'int', 'float'],
+              ]],
+          ) + ']',
+      ]
+
+  def generate_dict(self, node):
+    value_type = node.value_type
+    lines = self.lines
+    lines += [
+        '  if is_dict:',
+        '    error_msgs = []',
+        '    keys = list(value.keys())',
+        '',
+    ]
+
+    if node.elem_key_regex:
+      pattern = self.const(None, 're.compile(' + self.lit(node.elem_key_regex) + ')')
+      lines += [
+          '    for key in sorted(keys):',
+          '      if not ' + pattern + '.search(key):',
+          '        return [' + self.node_error(
+              node,
+              self.lit(str('type: ' + value_type)),
+              "str('key: ' + key)",
+              self.lit(str('elem_key_regex: ' + node.elem_key_regex)),
+              self.lit('msg: dictionary key is invalid (not compatible with the regex specified)'),
+          ) + ']',
+          '',
+      ]
+
+    if node.required_props:
+      lines += [
+          '    keys = list(set(keys + ' + self.const(node.required_props) + '))',
+          '',
+      ]
+
+    if node.is_dict_type:
+      if not node.props:
+        lines += ['    return error_msgs', '']
+        return
+
+      props = self.const(None, '{}')
+      self.table_lines += [
+          props + '[' + self.lit(key) + '] = ' + self.node_function(node.prop_node(key))
+          for key in node.props_sorted
+      ]
+      lines += [
+          '    for key in sorted(keys):',
+          '      if max_errors and (len(error_msgs) >= max_errors):',
+          '        break',
+          '',
+          '      if key not in ' + props + ':',
+      ]
+
+      if node.lax:
+        lines += ['        continue']
+      else:
+        lines += [
+            '        error_msgs += [' + self.node_error(
+                node,
+                "'property: ' + str(key)",
+                self.lit('msg: property not defined in schema'),
+                self.lit('allowed: '),
+                'list(' + self.const(node.props_sorted) + ')',
+            ) + ']',
+        ]
+
+      lines += [
+          '      else:',
+          '        error_msgs += ' + props + '[key](',
+          '            value.get(key),',
+          "            ctx + (ctx and '.') + key,",
+          '            (max_errors - len(error_msgs)) if max_errors else None,',
+          '            cache,',
+          '            depth + 1,',
+          '        )',
+          '',
+          '    return error_msgs',
+          '',
+      ]
+    else:
+      lines += [
+          '    for key in sorted(keys):',
+          '      if max_errors and (len(error_msgs) >= max_errors):',
+          '        break',
+          '',
+          '      error_msgs += ' + self.node_function(node.elem_node()) + '(',
+          '          value.get(key),',
+          "          ctx + '[' + key + ']',",
+          '          (max_errors - len(error_msgs)) if max_errors else None,',
+          '          cache,',
+          '          depth + 1,',
+          '      )',
+          '',
+          '    return error_msgs',
+          '',
+      ]
+
+
+def child_ctx(schema_ctx, step):
+  if step is None:
+    return schema_ctx
+
+  step_type, key = step
+
+  if step_type == 'idx':
+    return schema_ctx + '[' + str(key) + ']'
+  elif step_type == 'prop':
+    return schema_ctx + (schema_ctx and '.') + key
+
+  return schema_ctx + '[' + key + ']'
+
+
+def error_with_ctx(error, schema_ctx):
+  head, tail = error
+  return head + [str('at: ' + (schema_ctx or '<root>'))] + tail
+
+
+def child_path(schema_ctx, step):
+  # lazy version of child_ctx (the keys that can't be part of a path fail
+  # right away, as in child_ctx)
+  if step is None:
+    return schema_ctx
+
+  if (step[0] != 'idx') and (type(step[1]) is not str) and (not is_str(step[1])):
+    return child_ctx(ctx_text(schema_ctx), step)
+
+  return (schema_ctx, step)
+
+
+def ctx_text(schema_ctx):
+  # the paths of the nodes are kept as (parent path, step) pairs, and only
+  # converted to text when an error is reported
+  steps = []
+
+  while isinstance(schema_ctx, tuple):
+    schema_ctx, step = schema_ctx
+    steps += [step]
+
+  for step in reversed(steps):
+    schema_ctx = child_ctx(schema_ctx, step)
+
+  return schema_ctx
+
+
+def relative_steps(schema_ctx, base_ctx):
+  # steps from the base path to the (lazy) path, or None when the path is
+  # not inside the base path
+  steps = []
+
+  while schema_ctx is not base_ctx:
+    if not isinstance(schema_ctx, tuple):
+      return None
+
+    schema_ctx, step = schema_ctx
+    steps += [step]
+
+  return tuple(reversed(steps))
+
+
+def validate_node(node, value, schema_ctx, max_errors=None, validation_cache=None):
+  """
+  Validates the value against the node, walking the value with an explicit
+  stack (instead of recursively), so deeply nested values don't reach the
+  recursion limit. Each frame has the steps of a node still to be processed,
+  the (lazy) path of the node, the key of the node in the validation cache,
+  the amount of errors when the node was visited and the key of the node in
+  the shared subtrees. The errors are in the same order as in a depth-first
+  recursive validation, and the validation stops when max_errors is reached.
+
+  The same dict or list object can appear in many places of the value (like
+  yaml aliases), so the errors of each (named schema node, object) are kept,
+  relative to the path of the object, and reported again at the other paths
+  in which the object is validated by the same node, without validating it
+  again (the objects are part of the value, so their ids are not reused
+  during the validation).
+  """
+  error_msgs = []
+  error_paths = []
+  frames = []
+  shared = dict()
+
+  while True:
+    if node is not None:
+      valid_key = None
+      shared_key = None
+
+      if (validation_cache is not None) and (node.key is not None):
+        valid_key = validation_cache.valid_key(node, value)
+
+        if (valid_key is not None) and validation_cache.is_valid(valid_key):
+          node = None
+
+      if (
+          (node is not None)
+          and
+          (node.key is not None)
+          and
+          (len(node.key) == 2)
+          and
+          value
+          and
+          isinstance(value, (dict, list))
+      ):
+        shared_key = (node, id(value))
+        shared_errors = shared.get(shared_key)
+
+        if shared_errors is not None:
+          if max_errors:
+            shared_errors = shared_errors[:max_errors - len(error_msgs)]
+
+          for error, steps in shared_errors:
+            error_ctx = schema_ctx
+
+            for step in steps:
+              error_ctx = (error_ctx, step)
+
+            error_msgs += [error_with_ctx(error, ctx_text(error_ctx))]
+            error_paths += [(error, error_ctx)]
+
+          node = None
+
+      if node is not None:
+        steps = node.visit(value)
+        node = None
+
+        if len(steps) == 1 and (shared_key is None):
+          # a single step is processed without a frame (the error budget is
+          # never reached when a node is visited)
+          step = steps[0]
+
+          if step[0] is None:
+            error_msgs += [error_with_ctx(step[1], ctx_text(schema_ctx))]
+            error_paths += [(step[1], schema_ctx)]
+          elif valid_key is None:
+            node, value = step[0], step[1]
+            schema_ctx = child_path(schema_ctx, step[2]) if step[2] else schema_ctx
+            continue
           else:
-            new_schema_info = dict(
-                type=elem_type,
-                alternative_type=elem_alternative_type,
-                alternative_choices=elem_alternative_choices,
-                alternative_regex=elem_alternative_regex,
-                alternative_min=elem_alternative_min,
-                alternative_max=elem_alternative_max,
-                schema=elem_schema_name,
-                main_schema=elem_main_schema,
-                alternative_schema=elem_alternative_schema_name,
-                required=elem_required,
-                non_empty=elem_non_empty,
-                choices=elem_choices,
-                regex=elem_regex,
-                min=elem_min,
-                max=elem_max,
-            )
+            frames += [[steps, 0, schema_ctx, valid_key, len(error_msgs), None]]
+        elif steps:
+          frames += [[steps, 0, schema_ctx, valid_key, len(error_msgs), shared_key]]
+        else:
+          if valid_key is not None:
+            validation_cache.add(valid_key)
 
-            new_schema_data = dict(
-                name=schema_name,
-                ctx=schema_ctx + '[' + key + ']',
-                info=new_schema_info,
-                dict=schema_info_dict,
-                prop=False,
-                subelement=True,
-                required=elem_required
-            )
+          if shared_key is not None:
+            shared[shared_key] = []
 
-            error_msgs += validate_next_value(new_schema_data, elem_value)
+    if not frames:
+      break
 
-      return error_msgs
+    frame = frames[-1]
+    steps, idx = frame[0], frame[1]
+    reached = bool(max_errors and (len(error_msgs) >= max_errors))
 
-  return []
+    if (idx >= len(steps)) or reached:
+      frames.pop()
 
+      if (frame[3] is not None) and (len(error_msgs) == frame[4]):
+        validation_cache.add(frame[3])
 
-def validate_value(schema, value):
-  if schema is None:
-    return [['msg: main schema is not defined']]
+      # the errors of a node truncated by max_errors are not kept
+      if (frame[5] is not None) and not reached:
+        shared_errors = []
 
-  schema_name = schema.get('root')
-  schema_info_dict = schema.get('schemas')
-  schema_ctx = ''
+        for error, error_ctx in error_paths[frame[4]:]:
+          steps = relative_steps(error_ctx, frame[2])
 
-  schema_info = schema_info_dict.get(schema_name)
+          if steps is None:
+            shared_errors = None
+            break
 
-  schema_data = dict(
-      name=schema_name,
-      ctx=schema_ctx,
-      info=schema_info,
-      dict=schema_info_dict,
-      subelement=False,
-      required=True
-  )
+          shared_errors += [(error, steps)]
+
+        if shared_errors is not None:
+          shared[frame[5]] = shared_errors
 
-  error_msgs = validate_next_value(schema_data, value)
+      continue
+
+    frame[1] = idx + 1
+    step = steps[idx]
+
+    if step[0] is None:
+      error_msgs += [error_with_ctx(step[1], ctx_text(frame[2]))]
+      error_paths += [(step[1], frame[2])]
+    else:
+      node, value = step[0], step[1]
+      schema_ctx = child_path(frame[2], step[2]) if step[2] else frame[2]
 
   return error_msgs
 
 
-def validate_schema(schema, value, full_validation=True):
+def compile_schema(schema):
+  # the schema is kept in the entry so that its id is not reused
+  cached = compiled_schemas.get(id(schema))
+
+  if cached and (cached[0] is schema):
+    return cached[1]
+
+  compiled = CompiledSchema(schema.get('schemas'), schema.get('root'))
+  compiled_schemas.set(id(schema), (schema, compiled))
+
+  return compiled
+
+
+def validate_next_value(schema_data, value):
+  compiled = CompiledSchema(schema_data.get('dict'))
+  node = SchemaNode(
+      compiled,
+      name=schema_data.get('name'),
+      info=schema_data.get('info'),
+      prop=schema_data.get('prop'),
+      subelement=schema_data.get('subelement'),
+      simple=schema_data.get('simple'),
+      required=schema_data.get('required'),
+  )
+  return validate_node(node, value, schema_data.get('ctx'))
+
+
+def get_schema_hash(compiled, schema):
+  schema_hash = getattr(compiled, 'schema_hash', None)
+
+  if schema_hash is None:
+    schema_text = json.dumps(schema, sort_keys=True, default=str)
+    schema_hash = hashlib.sha256(schema_text.encode('utf-8')).hexdigest()
+    compiled.schema_hash = schema_hash
+
+  return schema_hash
+
+
+def save_schema_module(codegen_dir, module_file, source):
+  if not os.path.isdir(codegen_dir):
+    try:
+      os.makedirs(codegen_dir, 0o700)
+    except OSError:
+      if not os.path.isdir(codegen_dir):
+        raise
+
+  # write to a temporary file and rename it, so that concurrent readers
+  # and writers never see a partially written module
+  fd, tmp_path = tempfile.mkstemp(dir=codegen_dir, prefix='.tmp-', suffix='.py')
+
+  try:
+    with os.fdopen(fd, 'w') as file:
+      file.write(source)
+
+    os.rename(tmp_path, module_file)
+  except Exception:
+    os.remove(tmp_path)
+    raise
+
+
+def load_schema_module(module_name, module_file, source=None):
+  if source is not None:
+    # the module could not be persisted, so it is only used in this process
+    module = types.ModuleType(module_name)
+    exec(compile(source, module_file, 'exec'), module.__dict__)  # pylint: disable=exec-used
+    return module
+
+  spec = importlib.util.spec_from_file_location(module_name, module_file)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+
+def get_generated_validator(compiled, schema):
+  codegen_dir = os.environ.get(SCHEMA_CODEGEN_DIR_ENV)
+
+  if not codegen_dir:
+    return None
+
+  validator = getattr(compiled, 'generated_validator', None)
+
+  if validator is None:
+    schema_hash = get_schema_hash(compiled, schema)
+    module_name = 'lrd_schema_' + str(SCHEMA_CODEGEN_VERSION) + '_' + schema_hash
+    module_file = os.path.join(codegen_dir, module_name + '.py')
+    module = None
+
+    try:
+      if os.path.exists(module_file):
+        module = load_schema_module(module_name, module_file)
+
+        if module.SCHEMA_HASH != schema_hash:
+          module = None
+    except Exception:
+      module = None
+
+    if module is None:
+      try:
+        source = SchemaCodeGenerator(compiled, schema_hash).generate()
+
+        try:
+          save_schema_module(codegen_dir, module_file, source)
+          module = load_schema_module(module_name, module_file)
+        except Exception:
+          module = load_schema_module(module_name, module_file, source=source)
+      except Exception:
+        # the schemas that can't be generated are interpreted
+        module = None
+
+    validator = (
+        functools.partial(module.validate, fallback=compiled.validate)
+        if module
+        else False
+    )
+    compiled.generated_validator = validator
+
+  return validator or None
+
+
+def load_validation_keys(cache_file, schema_hash):
+  try:
+    with open(cache_file, 'rb') as file:
+      cached = pickle.load(file)
+
+    if (
+        (cached.get('version') == VALIDATION_CACHE_VERSION)
+        and
+        (cached.get('schema_hash') == schema_hash)
+    ):
+      return cached.get('valid_keys')
+  except Exception:
+    pass
+
+  return None
+
+
+def save_validation_caches():
+  for validation_cache in list(validation_caches.values()):
+    try:
+      validation_cache.save()
+    except Exception:
+      # the persistent cache is only an optimization
+      pass
+
+
+def get_validation_cache(compiled, schema):
+  cache_dir = get_parse_cache_dir()
+
+  if not cache_dir:
+    return None
+
+  if validation_caches_state['pid'] != os.getpid():
+    # the caches are saved once, when the process exits; the multiprocessing
+    # finalizers are used (instead of atexit) because they also run when the
+    # forked processes (like the ansible workers) exit, and only in the
+    # process in which they were registered
+    multiprocessing_util.Finalize(None, save_validation_caches, exitpriority=10)
+    validation_caches_state['pid'] = os.getpid()
+
+  validation_cache = getattr(compiled, 'validation_cache', None)
+
+  if validation_cache is None:
+    schema_hash = get_schema_hash(compiled, schema)
+    cache_file = os.path.join(cache_dir, 'validation-' + schema_hash + '.pickle')
+    validation_cache = validation_caches.get(cache_file)
+
+    if validation_cache is None:
+      validation_cache = ValidationCache(
+          schema_hash,
+          cache_file=cache_file,
+          valid_keys=load_validation_keys(cache_file, schema_hash),
+      )
+      validation_caches[cache_file] = validation_cache
+
+    compiled.validation_cache = validation_cache
+
+  return validation_cache
+
+
+def validate_values(schema, values, max_errors=None):
+  # the schema is compiled (and the validation cache loaded) only once for
+  # all the values; the errors are returned for each value, and the
+  # values not validated because the error budget was reached have None
+  if schema is None:
+    return [[['msg: main schema is not defined']] for _ in values]
+
+  compiled = compile_schema(schema)
+  validation_cache = get_validation_cache(compiled, schema)
+  validate = get_generated_validator(compiled, schema) or compiled.validate
+  results = list()
+  error_amount = 0
+
+  try:
+    for value in values:
+      if max_errors and (error_amount >= max_errors):
+        results += [None]
+        continue
+
+      error_msgs = validate(
+          value,
+          max_errors=(max_errors - error_amount) if max_errors else max_errors,
+          validation_cache=validation_cache,
+      )
+      results += [error_msgs]
+
+      if max_errors and error_msgs:
+        error_amount += count_errors(error_msgs)
+  finally:
+    if validation_cache is not None:
+      validation_cache.clear_hashes()
+
+  return results
+
+
+def validate_value(schema, value, max_errors=None):
+  return validate_values(schema, [value], max_errors=max_errors)[0]
+
+
+def get_schema_key(schema):
+  # the schemas are identified by their content, so a schema changed (or
+  # loaded from another file) is validated again
+  if not isinstance(schema, dict):
+    return None
+
+  try:
+    return get_schema_hash(compile_schema(schema), schema)
+  except ValueError:
+    # circular references
+    return None
+
+
+def get_schema_validation_stats():
+  return dict(
+      hits=validated_schemas_stats['hits'],
+      misses=validated_schemas_stats['misses'],
+      amount=len(validated_schemas_dict),
+  )
+
+
+def validate_schema_definition(schema, max_errors=None):
   error_msgs = list()
 
   try:
-    if full_validation:
+    schema_key = get_schema_key(schema)
+
+    if schema_key and validated_schemas_dict.get(schema_key):
+      validated_schemas_stats['hits'] += 1
+    else:
+      validated_schemas_stats['misses'] += 1
+
       schema_base = load_cached_file('schemas/schema.yml')
-      error_msgs_aux = validate_value(schema_base, schema)
+      error_msgs_aux = validate_value(schema_base, schema, max_errors=max_errors)
 
       if error_msgs_aux:
-        for value in (error_msgs_aux or []):
-          new_value = ['schema context: schema'] + value
-          error_msgs += [new_value]
+        error_msgs += error_with_context(['schema context: schema'], error_msgs_aux)
 
         return error_msgs
+
+      # only the schemas already proven valid are cached
+      if schema_key:
+        validated_schemas_dict[schema_key] = True
   except Exception as error:
     error_msgs += [[
         'msg: error when trying to validate the schema itself',
@@ -1158,15 +2203,26 @@ def validate_schema(schema, value, full_validation=True):
         'error details: ',
         traceback.format_exc().split('\n'),
     ]]
-    return dict(error_msgs=error_msgs)
 
-  error_msgs_aux = validate_value(schema, value)
+  return error_msgs
+
+
+def validate_schema(schema, value, full_validation=True, max_errors=None):
+  error_msgs = list()
+
+  if full_validation:
+    error_msgs_aux = validate_schema_definition(
+        schema, max_errors=max_errors
+    )
+
+    if error_msgs_aux:
+      return error_msgs_aux
+
+  error_msgs_aux = validate_value(schema, value, max_errors=max_errors)
 
   try:
     if error_msgs_aux:
-      for value in (error_msgs_aux or []):
-        new_value = ['schema context: value'] + value
-        error_msgs += [new_value]
+      error_msgs += error_with_context(['schema context: value'], error_msgs_aux)
 
       return error_msgs
   except Exception as error:
@@ -1179,3 +2235,38 @@ def validate_schema(schema, value, full_validation=True):
     return dict(error_msgs=error_msgs)
 
   return []
+
+
+def validate_many(schema, values, full_validation=True, max_errors=None):
+  # validates many values against the same schema, with the schema itself
+  # validated only once; the errors of the schema are in error_msgs and the
+  # errors of each value are in the corresponding item of result
+  values = values or []
+
+  if full_validation:
+    error_msgs = validate_schema_definition(
+        schema, max_errors=max_errors
+    )
+
+    if error_msgs:
+      return dict(result=[None for _ in values], error_msgs=error_msgs)
+
+  result = list()
+
+  try:
+    for error_msgs_aux in validate_values(schema, values, max_errors=max_errors):
+      result += [
+          error_with_context(['schema context: value'], error_msgs_aux)
+          if error_msgs_aux is not None
+          else None
+      ]
+  except Exception as error:
+    error_msgs = [[
+        'msg: error when trying to validate the schema values',
+        'error type: ' + str(type(error)),
+        'error details: ',
+        traceback.format_exc().split('\n'),
+    ]]
+    return dict(result=[None for _ in values], error_msgs=error_msgs)
+
+  return dict(result=result, error_msgs=[])
@@ -13,28 +13,168 @@
 # pyright: reportMissingImports=false
 
 import os
-from copy import deepcopy
+import weakref
+
+from contextlib import contextmanager
+
+import yaml
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    CopyOnAccessDict, CopyOnAccessList, LRUCache, vars_overlay
+)
 
 from ansible.errors import AnsibleError
 from ansible.module_utils._text import to_text
+from ansible.parsing.yaml.dumper import AnsibleDumper
 from ansible.template import generate_ansible_template_vars
 from ansible.utils.display import Display
 
 display = Display()
 
+# the copies of the variables used by the templates (see vars_overlay) are
+# dumped (like in the to_yaml filter) as the values they copy
+dumper_representers = getattr(AnsibleDumper, 'yaml_representers', None) or dict()
+
+for copy_type, value_type in [(CopyOnAccessDict, dict), (CopyOnAccessList, list)]:
+  if dumper_representers.get(value_type) is not None:
+    yaml.add_representer(copy_type, dumper_representers.get(value_type), Dumper=AnsibleDumper)
+
+# the paths are resolved only once for each lookup plugin instance (that is,
+# in the same lookup run), because a file created afterwards in a previous
+# directory of the search path would be found instead of the cached one
+template_paths = weakref.WeakKeyDictionary()
+
+# shared by all the lookups that render templates in the same process
+template_files = LRUCache(max_amount=300, max_bytes=32 * 1024 * 1024)
+compiled_templates = LRUCache(max_amount=300)
+
+# templar environment options that change how a template source is compiled
+# (the remaining options are used only when the template is rendered)
+JINJA_COMPILE_OPTIONS = [
+    'block_start_string',
+    'block_end_string',
+    'variable_start_string',
+    'variable_end_string',
+    'comment_start_string',
+    'comment_end_string',
+    'line_statement_prefix',
+    'line_comment_prefix',
+    'trim_blocks',
+    'lstrip_blocks',
+    'newline_sequence',
+    'keep_trailing_newline',
+    'optimized',
+    'is_async',
+    'code_generator_class',
+]
+
+# template header with options for the templar environment (the template is
+# compiled in a new environment, so the compilation is not cached)
+JINJA_OVERRIDE = '#jinja2:'
+
+
+def find_template_file(plugin, ansible_vars, file):
+  search_key = (
+      file,
+      tuple(ansible_vars.get('ansible_search_path') or []),
+      plugin._loader.get_basedir(),
+  )
+  plugin_paths = template_paths.setdefault(plugin, dict())
+  lookupfile = plugin_paths.get(search_key)
+
+  if lookupfile and os.path.exists(lookupfile):
+    return lookupfile
+
+  lookupfile = plugin.find_file_in_search_path(ansible_vars, 'templates', file)
+
+  if lookupfile:
+    plugin_paths[search_key] = lookupfile
+
+  return lookupfile
+
+
+def load_template_file(plugin, lookupfile):
+  stat = os.stat(lookupfile)
+  file_key = (lookupfile, stat.st_mtime, stat.st_size)
+  cached = template_files.get(file_key)
+
+  if cached is None:
+    b_template_data, _ = plugin._loader._get_file_contents(lookupfile)
+    cached = to_text(b_template_data, errors='surrogate_or_strict')
+    template_files.set(file_key, cached, size=stat.st_size)
+
+  return (cached, file_key)
+
+
+def get_compile_key(environment, file_key):
+  return (
+      file_key,
+      type(environment),
+      tuple(sorted(environment.extensions.keys())),
+  ) + tuple(getattr(environment, name, None) for name in JINJA_COMPILE_OPTIONS)
+
+
+@contextmanager
+def compiled_template_cache(templar, template_data, file_key):
+  # the templar compiles the template source for each render, so the
+  # environment compile method is replaced, while the template is rendered,
+  # by one that compiles the template source only once (the other sources,
+  # like the variables rendered by the template, are compiled as before);
+  # since ansible-core 2.19 the environment is no longer a templar attribute
+  # (only a deprecated property), and the cache is not used
+  environment = vars(templar).get('environment')
+
+  if (
+      (environment is None)
+      or template_data.startswith(JINJA_OVERRIDE)
+      or ('compile' in vars(environment))
+  ):
+    yield
+    return
+
+  compile_key = get_compile_key(environment, file_key)
+  compile_source = environment.compile
+
+  def compile_template(source, *args, **kwargs):
+    if args or kwargs or (source != template_data):
+      return compile_source(source, *args, **kwargs)
+
+    code = compiled_templates.get(compile_key)
+
+    if code is None:
+      code = compile_source(source)
+      compiled_templates.set(compile_key, code)
+
+    return code
+
+  environment.compile = compile_template
+
+  try:
+    yield
+  finally:
+    del environment.compile
+
+
+def get_template_cache_stats():
+  return dict(
+      files=template_files.stats(),
+      compiled=compiled_templates.stats(),
+  )
+
 
 def lookup(plugin, ansible_vars, file, params):
   display.debug("File lookup term: %s" % file)
 
-  lookupfile = plugin.find_file_in_search_path(ansible_vars, 'templates', file)
+  lookupfile = find_template_file(plugin, ansible_vars, file)
   display.vvvv("File lookup using %s as file" % lookupfile)
 
   if lookupfile:
-    b_template_data, _ = plugin._loader._get_file_contents(lookupfile)
-    template_data = to_text(b_template_data, errors='surrogate_or_strict')
+    template_data, file_key = load_template_file(plugin, lookupfile)
+    # generated for each render (like template_run_date)
+    template_vars = generate_ansible_template_vars(lookupfile)
 
     # set jinja2 internal search path for includes
-    searchpath = ansible_vars.get('ansible_search_path', [])
+    searchpath = list(ansible_vars.get('ansible_search_path') or [])
 
     if searchpath:
       # our search paths aren't actually the proper ones for jinja includes.
@@ -54,9 +194,14 @@ def lookup(plugin, ansible_vars, file, params):
     # plus some added by ansible (e.g., template_{path,mtime}),
     # plus anything passed to the lookup with the template_vars=
     # argument.
-    new_vars = deepcopy(ansible_vars)
-    new_vars.update(generate_ansible_template_vars(lookupfile))
-    new_vars.update(params)
+    # The variables are not copied upfront, but are provided as a layered
+    # view, in which each variable is copied only when the template uses it,
+    # so the original variables (and their nested values) are kept unchanged.
+    new_vars = vars_overlay(
+        params,
+        template_vars,
+        ansible_vars,
+    )
     display.vv("params keys: %s" % params.keys())
 
     templar = plugin._templar
@@ -66,7 +211,7 @@ def lookup(plugin, ansible_vars, file, params):
         variable_end_string=None,
         available_variables=new_vars,
         searchpath=searchpath
-    ):
+    ), compiled_template_cache(templar, template_data, file_key):
       res = templar.template(
           template_data,
           preserve_trailing_newlines=True,
@@ -16,11 +16,14 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type  # pylint: disable=invalid-name
 
-import os
 import traceback
 
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import load_cached_file, to_bool
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import validate_schema
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    error_with_context, is_error_budget_reached, load_cached_file, path_exists, to_bool
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import (
+    validate_many, validate_schema
+)
 
 
 def validate_ctx_schema(ctx_title, schema_files, task_data):
@@ -32,6 +35,7 @@ def validate_ctx_schema(ctx_title, schema_files, task_data):
     dict_to_validate = task_data.get('dict_to_validate')
     prop_names = task_data.get('prop_names')
     all_props = task_data.get('all_props')
+    max_errors = task_data.get('max_errors')
 
     dict_to_validate = dict_to_validate or dict()
 
@@ -40,6 +44,9 @@ def validate_ctx_schema(ctx_title, schema_files, task_data):
         schema_files = [schema_files]
 
       for schema_file in schema_files:
+        if is_error_budget_reached(max_errors, error_msgs):
+          break
+
         try:
           schema_file = (
               (base_dir_prefix + schema_file)
@@ -52,7 +59,7 @@ def validate_ctx_schema(ctx_title, schema_files, task_data):
                 str('context: ' + str(ctx_title or '')),
                 str('msg: schema file not defined'),
             ]]
-          elif os.path.exists(schema_file):
+          elif path_exists(schema_file):
             schema = load_cached_file(schema_file)
 
             schema_data = dict()
@@ -65,15 +72,19 @@ def validate_ctx_schema(ctx_title, schema_files, task_data):
                   schema_data[key] = dict_to_validate.get(key)
 
             error_msgs_aux = validate_schema(
-                schema, schema_data
+                schema,
+                schema_data,
+                max_errors=max_errors,
             )
 
-            for value in (error_msgs_aux or []):
-              new_value = [
-                  str('context: ' + str(ctx_title or '')),
-                  str('schema file: ' + schema_file),
-              ] + value
-              error_msgs += [new_value]
+            if error_msgs_aux:
+              error_msgs += error_with_context(
+                  [
+                      str('context: ' + str(ctx_title or '')),
+                      str('schema file: ' + schema_file),
+                  ],
+                  error_msgs_aux,
+              )
           else:
             error_msgs += [[
                 str('context: ' + str(ctx_title or '')),
@@ -101,6 +112,48 @@ def validate_ctx_schema(ctx_title, schema_files, task_data):
     return dict(error_msgs=error_msgs)
 
 
+def validate_schema_file(schema_file, value=None, values=None, full_validation=True):
+  # used by the schema module and action plugin (when values is defined,
+  # each value is validated and the errors are reported by value index)
+  error_msgs = list()
+
+  if path_exists(schema_file):
+    schema = None
+
+    try:
+      schema = load_cached_file(schema_file)
+    except Exception as error:
+      error_msgs += [[
+          str('file: ' + schema_file),
+          'msg: error when trying to load the schema file',
+          'error type: ' + str(type(error)),
+          'error details: ',
+          traceback.format_exc().split('\n'),
+      ]]
+
+    if schema and (values is not None):
+      info = validate_many(schema, values, full_validation)
+      error_msgs_aux = info.get('error_msgs') or list()
+
+      for idx, error_msgs_item in enumerate(info.get('result') or []):
+        if error_msgs_item:
+          error_msgs_aux += error_with_context(
+              [str('value index: ' + str(idx))], error_msgs_item
+          )
+
+      if error_msgs_aux:
+        error_msgs += error_with_context([str('schema file: ' + schema_file)], error_msgs_aux)
+    elif schema:
+      error_msgs_aux = validate_schema(schema, value, full_validation)
+
+      if error_msgs_aux:
+        error_msgs += error_with_context([str('schema file: ' + schema_file)], error_msgs_aux)
+  else:
+    error_msgs += [[str('schema file not found: ' + schema_file)]]
+
+  return error_msgs
+
+
 def get_validators(ctx_title, validator_files, task_data, env_data):
   result = list()
   error_msgs = list()
@@ -142,7 +195,7 @@ def get_validators(ctx_title, validator_files, task_data, env_data):
               str('context: ' + str(ctx_title or '')),
               str('msg: validator file not defined'),
           ]]
-        elif os.path.exists(validator_file):
+        elif path_exists(validator_file):
           if not ignore_validators:
             validator_data = dict()
 
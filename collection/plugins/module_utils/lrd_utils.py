@@ -6,6 +6,8 @@
 # pylint: disable=missing-module-docstring
 # pylint: disable=missing-function-docstring
 # pylint: disable=missing-class-docstring
+# pylint: disable=too-many-lines
+# pylint: disable=broad-except
 
 # pyright: reportUnusedImport=true
 # pyright: reportUnusedVariable=true
@@ -14,8 +16,29 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type  # pylint: disable=invalid-name
 
-import collections
+import hashlib
+import multiprocessing
+import os
+import pickle
+import re
 import sys
+import tempfile
+import time
+import traceback
+
+from copy import deepcopy
+
+try:
+  from collections.abc import Hashable, MutableMapping
+except ImportError:
+  from collections import Hashable, MutableMapping  # pylint: disable=deprecated-class
+
+try:
+  from collections import ChainMap, OrderedDict
+except ImportError:
+  from collections import OrderedDict
+  ChainMap = None
+
 import yaml
 
 from yaml.reader import Reader
@@ -31,6 +54,24 @@ try:
 except ImportError:
   from yaml import Dumper
 
+try:
+  from yaml.cyaml import CParser
+except ImportError:
+  CParser = None
+
+try:
+  STRING_TYPES = (basestring,)  # type: ignore
+except NameError:
+  STRING_TYPES = (str,)
+
+# strings certainly accepted by int() and float(), checked before trying to
+# convert them (the other strings are still converted, to be sure)
+INT_STR_REGEX = re.compile(r'^[-+]?[0-9]+$')
+FLOAT_STR_REGEX = re.compile(r'^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$')
+
+# strings without any decimal digit are never accepted by int()
+DIGIT_REGEX = re.compile(r'\d')
+
 
 class NoDuplicateConstructor(Constructor):
   def construct_mapping(self, node, deep=False):
@@ -48,7 +89,7 @@ class NoDuplicateConstructor(Constructor):
       key = self.construct_object(key_node, deep=True)
 
       # lists are not hashable, but tuples are
-      if not isinstance(key, collections.Hashable):
+      if not isinstance(key, Hashable):
         if isinstance(key, list):
           key = tuple(key)
 
@@ -63,7 +104,7 @@ class NoDuplicateConstructor(Constructor):
               key_node.start_mark
           ) from exc
       else:
-        if not isinstance(key, collections.Hashable):
+        if not isinstance(key, Hashable):
           raise ConstructorError(
               'while constructing a mapping',
               node.start_mark,
@@ -77,7 +118,7 @@ class NoDuplicateConstructor(Constructor):
       if key in mapping:
         raise ConstructorError(
             None, None,
-            'duplicate key found: %s' % key,
+            'duplicate key found: %s' % (key,),
             key_node.start_mark
         )
 
@@ -95,7 +136,270 @@ class NoDuplicateLoader(Reader, Scanner, Parser, Composer, NoDuplicateConstructo
     Resolver.__init__(self)
 
 
-cached_files_dict = dict()
+if CParser is not None:
+  class NoDuplicateCLoader(CParser, NoDuplicateConstructor, Resolver):
+    def __init__(self, stream):
+      CParser.__init__(self, stream)
+      NoDuplicateConstructor.__init__(self)
+      Resolver.__init__(self)
+
+  DefaultLoader = NoDuplicateCLoader
+else:
+  DefaultLoader = NoDuplicateLoader
+
+
+class LRUCache:
+  """
+  Cache with LRU eviction, limited by the amount of entries and (optionally)
+  by the approximate size, in bytes, of the entries.
+  """
+
+  def __init__(self, max_amount=None, max_bytes=None):
+    self.max_amount = max_amount
+    self.max_bytes = max_bytes
+    self.entries = OrderedDict()
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def __contains__(self, key):
+    return key in self.entries
+
+  def __len__(self):
+    return len(self.entries)
+
+  def get(self, key, default_value=None):
+    entry = self.entries.pop(key, None)
+
+    if entry is None:
+      self.misses += 1
+      return default_value
+
+    self.hits += 1
+    self.entries[key] = entry
+
+    return entry[1]
+
+  def set(self, key, value, size=0):
+    self.remove(key)
+    self.entries[key] = (size, value)
+    self.bytes += size
+
+    while self.entries and (
+        ((self.max_amount is not None) and (len(self.entries) > self.max_amount))
+        or
+        ((self.max_bytes is not None) and (self.bytes > self.max_bytes))
+    ):
+      oldest_key = next(iter(self.entries))
+      self.remove(oldest_key)
+      self.evictions += 1
+
+  def remove(self, key):
+    entry = self.entries.pop(key, None)
+
+    if entry is not None:
+      self.bytes -= entry[0]
+
+    return entry is not None
+
+  def clear(self):
+    self.entries.clear()
+    self.bytes = 0
+
+  def stats(self):
+    return dict(
+        amount=len(self.entries),
+        bytes=self.bytes,
+        hits=self.hits,
+        misses=self.misses,
+        evictions=self.evictions,
+    )
+
+
+class FileCache(LRUCache):
+  """
+  Cache of loaded files, keyed by the file path. An entry is invalidated when
+  the modification time or the size of the file changes. The size of an entry
+  is approximated by the size of the file.
+  """
+
+  def __init__(self, max_amount=None, max_bytes=None):
+    LRUCache.__init__(self, max_amount=max_amount, max_bytes=max_bytes)
+    self.invalidations = 0
+
+  def load(self, file_path, load_function):
+    stat = os.stat(file_path)
+    stat_key = (getattr(stat, 'st_mtime_ns', None) or stat.st_mtime, stat.st_size)
+    entry = self.entries.get(file_path)
+
+    if entry is not None:
+      cached_stat_key = entry[1][0]
+
+      if cached_stat_key == stat_key:
+        return self.get(file_path)[1]
+
+      self.remove(file_path)
+      self.invalidations += 1
+
+    self.misses += 1
+    file_result = load_function(file_path)
+    self.set(file_path, (stat_key, file_result), size=stat.st_size)
+
+    return file_result
+
+  def stats(self):
+    result = LRUCache.stats(self)
+    result['invalidations'] = self.invalidations
+    return result
+
+
+cached_files = FileCache(max_amount=500, max_bytes=64 * 1024 * 1024)
+
+
+class FileSystemIndex:
+  """
+  Index of the entries of the directories under some roots (the repositories
+  of the environment and of the pods), used to know if a path exists without
+  a stat for each path. Each directory is listed only once (with os.scandir),
+  when a path in it is checked, until the index is refreshed. When refreshed,
+  the listings of the directories changed since then (for example, when a
+  repository is synced again, with entries added or removed) are discarded.
+  The paths not found in the index (and the symbolic links) are checked with
+  os.path.exists, so the index only avoids the stats of the existing paths.
+  """
+
+  # directories changed less than this amount of seconds before being listed
+  # may be changed again without a different modification time, so their
+  # listings are always discarded when refreshed
+  racy_seconds = 2
+
+  def __init__(self):
+    self.roots = []
+    self.dirs = dict()
+    self.locations = dict()
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  def get_dir_key(self, dir_path):
+    try:
+      stat = os.stat(dir_path)
+    except OSError:
+      return None
+
+    return (getattr(stat, 'st_mtime_ns', None) or stat.st_mtime, stat.st_ino, stat.st_mtime)
+
+  def in_roots(self, full_path):
+    for root in self.roots:
+      if full_path.startswith(root) and (
+          (len(full_path) == len(root)) or (full_path[len(root)] == os.sep)
+      ):
+        return True
+
+    return False
+
+  def refresh(self, roots=None):
+    if roots is not None:
+      self.roots = sorted(set(os.path.abspath(root) for root in roots if root))
+
+    self.locations.clear()
+
+    for dir_path, (dir_key, _, racy) in list(self.dirs.items()):
+      if (
+          racy
+          or (not self.in_roots(dir_path))
+          or (self.get_dir_key(dir_path) != dir_key)
+      ):
+        self.dirs.pop(dir_path, None)
+        self.invalidations += 1
+
+  def list_dir(self, dir_path):
+    cached = self.dirs.get(dir_path)
+
+    if cached is None:
+      dir_key = self.get_dir_key(dir_path)
+
+      if dir_key is None:
+        return None
+
+      try:
+        names = set(
+            entry.name
+            for entry in os.scandir(dir_path)
+            if not entry.is_symlink()
+        )
+      except OSError:
+        return None
+
+      racy = (time.time() - dir_key[2]) < self.racy_seconds
+      cached = (dir_key, names, racy)
+      self.dirs[dir_path] = cached
+
+    return cached[1]
+
+  def locate(self, full_path):
+    if (not full_path.endswith('/')) and ('..' not in full_path.split('/')):
+      full_path = os.path.normpath(full_path)
+
+      if self.in_roots(full_path):
+        return os.path.split(full_path)
+
+    return False
+
+  def exists(self, path):
+    if (not path) or (not self.roots) or (getattr(os, 'scandir', None) is None):
+      return os.path.exists(path)
+
+    # the relative paths are resolved from the current directory of each
+    # check, so the locations are stored by the absolute paths
+    full_path = path if os.path.isabs(path) else os.path.join(os.getcwd(), path)
+    location = self.locations.get(full_path)
+
+    if location is None:
+      location = self.locate(full_path)
+      self.locations[full_path] = location
+
+    if location:
+      dir_path, name = location
+      names = self.list_dir(dir_path)
+
+      if (names is not None) and (name in names):
+        self.hits += 1
+        return True
+
+      self.misses += 1
+
+    return os.path.exists(path)
+
+  def stats(self):
+    return dict(
+        roots=len(self.roots),
+        dirs=len(self.dirs),
+        hits=self.hits,
+        misses=self.misses,
+        invalidations=self.invalidations,
+    )
+
+
+# directories of the environment data used as the roots of the index
+FS_INDEX_ROOT_KEYS = ['env_dir', 'ctx_dir', 'dev_repos_dir', 'dev_extra_repos_dir']
+
+fs_index = FileSystemIndex()
+
+# directory in which the parsed yaml files are persisted (as pickle files),
+# so that they can be reused across processes (the directory should be
+# accessible only by the user running the deployment)
+PARSE_CACHE_DIR_ENV = 'LRD_PARSE_CACHE_DIR'
+PARSE_CACHE_VERSION = 1
+
+# maximum amount of errors rendered by error_text (when not specified,
+# and when the environment variable is not defined, all errors are rendered)
+ERROR_TEXT_MAX_ENV = 'LRD_MAX_ERROR_MSGS'
+
+# function and items of the current parallel map, inherited by the forked
+# processes, so that only the results need to be sent between the processes
+parallel_data = dict()
 
 
 def merge_dicts(*args):
@@ -111,26 +415,490 @@ def merge_dicts(*args):
   return new_dict
 
 
+class ParamsOverlay(MutableMapping):
+  """
+  Dicts stacked as layers (the last ones having precedence), with the same
+  keys, values and order of the dict returned by merge_dicts for them, but
+  without copying the layers. The layers are copied into a single dict only
+  when the overlay is changed (copy-on-write) or exported with to_dict, so
+  the layers themselves are never changed.
+  """
+
+  def __init__(self, layers=None):
+    self.layers = [layer for layer in (layers or []) if layer]
+    self.owned = False
+
+  def get_layers(self):
+    # the dict of a changed overlay is copied, so that the overlays stacked
+    # on it don't see its next changes
+    if self.owned:
+      return [dict(self.layers[0])] if self.layers else []
+
+    return list(self.layers)
+
+  def materialize(self):
+    if not self.owned:
+      self.layers = [self.to_dict()]
+      self.owned = True
+
+    return self.layers[0]
+
+  def to_dict(self):
+    result = dict()
+
+    for layer in self.layers:
+      result.update(layer)
+
+    return result
+
+  def copy(self):
+    return ParamsOverlay(self.get_layers())
+
+  def __getitem__(self, key):
+    for layer in reversed(self.layers):
+      if key in layer:
+        return layer[key]
+
+    raise KeyError(key)
+
+  def __contains__(self, key):
+    return any(key in layer for layer in self.layers)
+
+  def __iter__(self):
+    if len(self.layers) == 1:
+      return iter(self.layers[0])
+
+    return iter(self.to_dict())
+
+  def __len__(self):
+    if len(self.layers) == 1:
+      return len(self.layers[0])
+
+    return len(self.to_dict())
+
+  def __bool__(self):
+    return bool(self.layers) and any(self.layers)
+
+  __nonzero__ = __bool__
+
+  def __setitem__(self, key, value):
+    self.materialize()[key] = value
+
+  def __delitem__(self, key):
+    del self.materialize()[key]
+
+  def __repr__(self):
+    return 'ParamsOverlay(' + repr(self.to_dict()) + ')'
+
+
+def merge_overlay(*args):
+  """
+  Returns the same as merge_dicts, but as an overlay of the dicts (instead of
+  copying them), so that overlays can be stacked without copying the params.
+  """
+  layers = None
+
+  for current_dict in (args or []):
+    if isinstance(current_dict, ParamsOverlay):
+      current_layers = current_dict.get_layers()
+    else:
+      current_layers = [current_dict] if current_dict else []
+
+    if not layers:
+      layers = current_layers if (current_dict is not None) else None
+    else:
+      layers += current_layers
+
+  return ParamsOverlay(layers) if (layers is not None) else None
+
+
+def to_plain_dict(value):
+  # exports an overlay (for example, to ansible) as a dict
+  return value.to_dict() if isinstance(value, ParamsOverlay) else value
+
+
+# values that can't be changed in place, and don't need to be copied
+IMMUTABLE_TYPES = STRING_TYPES + (bytes, bool, int, float, type(None))
+
+class CopyOnAccessDict(dict):
+  """
+  Shallow copy of a dict in which the nested values are copied only when
+  accessed (see copy_on_access), so that the changes made in any level of the
+  copy never reach the original value, without copying the values that are
+  not used.
+  """
+
+  def __init__(self, value, owner):
+    dict.__init__(self, value)
+    self.owner = owner
+    self.copied = False
+
+  def __getitem__(self, key):
+    value = dict.__getitem__(self, key)
+    copied = copy_on_access(value, self.owner)
+
+    if copied is not value:
+      dict.__setitem__(self, key, copied)
+
+    return copied
+
+  def __iter__(self):
+    # overridden so that the dict is never merged into another one (like in
+    # dict(value)) directly from the original values, without copying them
+    return dict.__iter__(self)
+
+  def __reduce__(self):
+    self.copy_all()
+    return (dict, (dict.copy(self),))
+
+  def copy_all(self):
+    if not self.copied:
+      self.copied = True
+
+      for key in list(dict.keys(self)):
+        self.get(key)
+
+  def get(self, key, default_value=None):
+    return self[key] if (key in self) else default_value
+
+  def setdefault(self, key, default_value=None):
+    if key in self:
+      return self[key]
+
+    dict.__setitem__(self, key, default_value)
+
+    return default_value
+
+  def pop(self, key, *args):
+    if key in self:
+      value = self[key]
+      dict.__delitem__(self, key)
+      return value
+
+    return dict.pop(self, key, *args)
+
+  def popitem(self):
+    self.copy_all()
+    return dict.popitem(self)
+
+  def items(self):
+    self.copy_all()
+    return dict.items(self)
+
+  def values(self):
+    self.copy_all()
+    return dict.values(self)
+
+  def copy(self):
+    self.copy_all()
+    return dict.copy(self)
+
+
+class CopyOnAccessList(list):
+  """
+  Shallow copy of a list in which the nested values are copied only when
+  accessed, like in CopyOnAccessDict.
+  """
+
+  def __init__(self, value, owner):
+    list.__init__(self, value)
+    self.owner = owner
+    self.copied = False
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      self.copy_all()
+      return list.__getitem__(self, index)
+
+    return self.copy_item(index)
+
+  def __iter__(self):
+    self.copy_all()
+    return list.__iter__(self)
+
+  def __reversed__(self):
+    self.copy_all()
+    return list.__reversed__(self)
+
+  def __add__(self, other):
+    self.copy_all()
+    return list.__add__(self, other)
+
+  def __mul__(self, amount):
+    self.copy_all()
+    return list.__mul__(self, amount)
+
+  __rmul__ = __mul__
+
+  def __reduce__(self):
+    self.copy_all()
+    return (list, (list.copy(self),))
+
+  def copy_all(self):
+    if not self.copied:
+      self.copied = True
+
+      for index in range(len(self)):
+        self.copy_item(index)
+
+  def copy_item(self, index):
+    value = list.__getitem__(self, index)
+    copied = copy_on_access(value, self.owner)
+
+    if copied is not value:
+      list.__setitem__(self, index, copied)
+
+    return copied
+
+  def pop(self, index=-1):
+    self.copy_all()
+    return list.pop(self, index)
+
+  def copy(self):
+    self.copy_all()
+    return list.copy(self)
+
+
+def copy_on_access(value, owner):
+  # the dicts and lists are copied only one level at a time (the nested ones
+  # are copied when accessed), the values already copied for the same owner
+  # are returned as they are, and the other values are deep copied
+  if isinstance(value, IMMUTABLE_TYPES):
+    return value
+
+  if isinstance(value, (CopyOnAccessDict, CopyOnAccessList)) and (value.owner is owner):
+    return value
+
+  if isinstance(value, dict):
+    return CopyOnAccessDict(value, owner)
+
+  if isinstance(value, list):
+    return CopyOnAccessList(value, owner)
+
+  return deepcopy(value)
+
+
+if ChainMap is not None:
+  class VarsOverlay(ChainMap):  # pylint: disable=too-many-ancestors
+    """
+    Layered view of variables in which a value of the layers (other than the
+    top one) is copied to the top layer when accessed for the first time (see
+    copy_on_access), so that changes in the value (like a dict updated in a
+    template) never reach the original variables.
+    """
+
+    def __getitem__(self, key):
+      top = self.maps[0]
+
+      if key in top:
+        return top[key]
+
+      value = ChainMap.__getitem__(self, key)
+      copied = copy_on_access(value, self)
+
+      if copied is not value:
+        top[key] = copied
+
+      return copied
+
+
+def vars_overlay(*layers):
+  """
+  Returns a view of the layers (the first ones having precedence) without
+  copying them upfront. Changes in the view go to a new top layer and the
+  values are copied only when accessed (VarsOverlay), so the layers
+  themselves are never changed, including their nested values.
+  """
+  layers = [layer for layer in layers if layer is not None]
+
+  if ChainMap is not None:
+    return VarsOverlay(dict(), *layers)
+
+  result = dict()
+
+  for layer in reversed(layers):
+    result.update(deepcopy(layer))
+
+  return result
+
+
+def run_parallel_item(idx):
+  # the result is pickled in the child process itself, so that an error (or
+  # a result that can't be pickled) fails only its own item, with the reason
+  function = parallel_data.get('function')
+  items = parallel_data.get('items')
+
+  try:
+    return (True, pickle.dumps(function(items[idx]), protocol=pickle.HIGHEST_PROTOCOL))
+  except Exception:
+    return (False, traceback.format_exc())
+
+
+def map_parallel(function, items, processes=None, fallbacks=None):
+  """
+  Returns the results of the function applied to each item, in the same order
+  of the items, using a pool of forked processes when processes is greater
+  than 1. The items are processed serially when forking is not available
+  and in the processes of the pool themselves (no nested pools). The items
+  that fail in the pool (the results must be picklable) are processed again
+  in the current process, and the reasons are added to fallbacks (when
+  defined) as (item index, reason) pairs.
+  """
+  items = list(items or [])
+
+  if (
+      (not processes)
+      or (processes <= 1)
+      or (len(items) <= 1)
+      or parallel_data.get('active')
+  ):
+    return [function(item) for item in items]
+
+  try:
+    context = multiprocessing.get_context('fork')
+  except (AttributeError, ValueError):
+    context = None
+
+  if context is None:
+    return [function(item) for item in items]
+
+  parallel_data.update(dict(function=function, items=items, active=True))
+
+  try:
+    pool = context.Pool(min(processes, len(items)))
+
+    try:
+      outputs = pool.map(run_parallel_item, range(len(items)), chunksize=1)
+    finally:
+      pool.terminate()
+      pool.join()
+  except Exception:
+    # the pool itself failed, so all the items are processed again
+    reason = traceback.format_exc()
+    outputs = [(False, reason) for _ in items]
+  finally:
+    parallel_data.clear()
+
+  results = list()
+
+  for idx, (success, output) in enumerate(outputs):
+    if success:
+      try:
+        results += [pickle.loads(output)]
+        continue
+      except Exception:
+        output = traceback.format_exc()
+
+    if fallbacks is not None:
+      fallbacks += [(idx, output)]
+
+    results += [function(items[idx])]
+
+  return results
+
+
 def load_file(file_path):
   with open(file_path, 'rb') as file:
     content = file.read().decode('utf-8-sig')
     return content
 
 
-def load_yaml(text):
-  return yaml.load(text, Loader=NoDuplicateLoader)
+def load_yaml(text, loader=None):
+  return yaml.load(text, Loader=loader or DefaultLoader)
 
 
 def load_yaml_file(file_path):
   return load_yaml(load_file(file_path))
 
 
-def error_text(error_msgs, context=None):
+class ErrorContext:
+  """
+  Errors with the context (list of messages) that precedes each of them.
+  The errors are referenced instead of copied, so the contexts added at each
+  level are chained and only flattened when the errors are rendered.
+  """
+
+  __slots__ = ('context', 'errors')
+
+  def __init__(self, context, errors):
+    self.context = context
+    self.errors = errors
+
+
+def error_with_context(context, error_msgs):
+  if not error_msgs:
+    return []
+
+  return [ErrorContext(list(context), list(error_msgs))]
+
+
+def iter_errors(error_msgs):
+  stack = [([], iter(error_msgs or []))]
+
+  while stack:
+    prefix, values = stack[-1]
+    value = next(values, stack)
+
+    if value is stack:
+      stack.pop()
+    elif isinstance(value, ErrorContext):
+      stack.append((prefix + value.context, iter(value.errors)))
+    else:
+      yield (prefix + value) if prefix else value
+
+
+def flatten_errors(error_msgs):
+  return list(iter_errors(error_msgs))
+
+
+def count_errors(error_msgs):
+  return sum(1 for _ in iter_errors(error_msgs))
+
+
+def is_error_budget_reached(max_errors, error_msgs):
+  # when max_errors is defined, the preparation (and validation) stops as
+  # soon as the amount of errors reaches it (fail-fast mode)
+  if not max_errors:
+    return False
+
+  return count_errors(error_msgs) >= max_errors
+
+
+def error_text(error_msgs, context=None, max_errors=None):
   if not error_msgs:
     return ''
 
+  if max_errors is None:
+    max_errors = to_default_int(os.environ.get(ERROR_TEXT_MAX_ENV), None)
+
+  shown_errors = list()
+  omitted_amount = 0
+  omitted_contexts = dict()
+
+  for value in iter_errors(error_msgs):
+    if (not max_errors) or (len(shown_errors) < max_errors):
+      shown_errors += [value]
+    else:
+      omitted_amount += 1
+      omitted_context = str(value[0]) if (isinstance(value, list) and value) else str(value)
+      omitted_contexts[omitted_context] = omitted_contexts.get(omitted_context, 0) + 1
+
+  total_amount = len(shown_errors) + omitted_amount
+  error_msgs = shown_errors
+
+  if omitted_amount:
+    error_msgs += [[
+        'msg: ' + str(omitted_amount) + ' more error(s) not shown '
+        + '(showing the first ' + str(max_errors) + ')',
+        'omitted errors (by context):',
+        [
+            key + ' (' + str(omitted_contexts.get(key)) + ')'
+            for key in sorted(omitted_contexts.keys())
+        ],
+    ]]
+
   if context:
-    msg = '[' + str(context) + '] ' + str(len(error_msgs)) + ' error(s)'
+    msg = '[' + str(context) + '] ' + str(total_amount) + ' error(s)'
     error_msgs = [[msg]] + error_msgs + [[msg]]
 
   separator = "-------------------------------------------"
@@ -158,6 +926,9 @@ def is_empty(value):
 
 
 def is_float(str_val):
+  if is_str(str_val) and FLOAT_STR_REGEX.match(str_val):
+    return True
+
   try:
     float(str_val)
     return True
@@ -166,6 +937,12 @@ def is_float(str_val):
 
 
 def is_int(str_val):
+  if is_str(str_val):
+    if INT_STR_REGEX.match(str_val):
+      return True
+    elif not DIGIT_REGEX.search(str_val):
+      return False
+
   try:
     int(str_val)
     return True
@@ -174,22 +951,123 @@ def is_int(str_val):
 
 
 def is_str(value):
+  return isinstance(value, STRING_TYPES)
+
+
+def is_encrypted(value):
+  # vault encrypted values (whose content should not be exposed outside of
+  # the places in which it is actually used)
+  return bool(getattr(value, '__ENCRYPTED__', False))
+
+
+def get_parse_cache_dir():
+  return os.environ.get(PARSE_CACHE_DIR_ENV) or None
+
+
+def save_parse_cache_file(cache_dir, cache_file, content):
   try:
-    return isinstance(value, basestring)  # type: ignore
-  except NameError:
-    return isinstance(value, str)
+    if not os.path.isdir(cache_dir):
+      try:
+        os.makedirs(cache_dir, 0o700)
+      except OSError:
+        if not os.path.isdir(cache_dir):
+          raise
 
+    # write to a temporary file and rename it, so that concurrent readers
+    # and writers never see a partially written file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-', suffix='.pickle')
 
-def load_cached_file(file_path):
-  if file_path in cached_files_dict:
-    return cached_files_dict.get(file_path)
+    try:
+      with os.fdopen(fd, 'wb') as file:
+        pickle.dump(content, file, protocol=pickle.HIGHEST_PROTOCOL)
 
-  file_result = load_yaml_file(file_path)
-  cached_files_dict[file_path] = file_result
+      os.rename(tmp_path, cache_file)
+    except Exception:
+      os.remove(tmp_path)
+      raise
+  except Exception:
+    # the persistent cache is only an optimization
+    pass
+
+
+def load_persistent_cached_file(file_path, cache_dir):
+  with open(file_path, 'rb') as file:
+    raw_content = file.read()
+
+  file_path = os.path.abspath(file_path)
+  digest = hashlib.sha256(raw_content).hexdigest()
+  path_digest = hashlib.sha256(file_path.encode('utf-8')).hexdigest()
+  cache_file = os.path.join(cache_dir, path_digest + '.pickle')
+
+  try:
+    with open(cache_file, 'rb') as file:
+      cached = pickle.load(file)
+
+    if (
+        (cached.get('version') == PARSE_CACHE_VERSION)
+        and
+        (cached.get('path') == file_path)
+        and
+        (cached.get('digest') == digest)
+    ):
+      return cached.get('data')
+  except Exception:
+    pass
+
+  file_result = load_yaml(raw_content.decode('utf-8-sig'))
+
+  save_parse_cache_file(
+      cache_dir,
+      cache_file,
+      dict(
+          version=PARSE_CACHE_VERSION,
+          path=file_path,
+          digest=digest,
+          data=file_result,
+      ),
+  )
 
   return file_result
 
 
+def load_uncached_file(file_path):
+  cache_dir = get_parse_cache_dir()
+
+  if cache_dir:
+    return load_persistent_cached_file(file_path, cache_dir)
+
+  return load_yaml_file(file_path)
+
+
+def load_cached_file(file_path):
+  return cached_files.load(file_path, load_uncached_file)
+
+
+def get_cached_files_stats():
+  return cached_files.stats()
+
+
+def refresh_fs_index(env_data=None):
+  # called before each preparation that checks the files of the repositories,
+  # so that the files changed since the last one are seen (without the
+  # environment data, the index is disabled, instead of keeping the roots of
+  # a previous preparation)
+  roots = (
+      [env_data.get(key) for key in FS_INDEX_ROOT_KEYS]
+      if isinstance(env_data, dict)
+      else []
+  )
+  fs_index.refresh(roots)
+
+
+def path_exists(path):
+  return fs_index.exists(path)
+
+
+def get_fs_index_stats():
+  return fs_index.stats()
+
+
 def ordered(obj):
   if isinstance(obj, dict):
     return sorted((k, ordered(v)) for k, v in obj.items())
@@ -15,11 +15,10 @@
 
 from __future__ import absolute_import, division, print_function
 
-import os
-import traceback
-
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import validate_schema
-from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text, load_yaml_file
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_validation import (
+    validate_schema_file
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import error_text
 
 from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import AnsibleModule
@@ -37,6 +36,8 @@ module: lrd.cloud.schema
 short_description: Validate a value according to a specified schema.
 description:
    - Validate a value according to a specified schema.
+   - The validation runs in the controller (by the action plugin with the same name),
+     so the parsed and compiled schemas are reused by all the tasks and hosts.
 version_added: "2.8"
 options:
   schema_file:
@@ -47,8 +48,16 @@ options:
   value:
     description:
       - value to be validated according to the schema
+      - exactly one of value and values must be defined
     type: raw
-    required: true
+  values:
+    description:
+      - list of values to be validated according to the schema
+      - the schema is loaded and validated only once for all the values,
+        and the errors are reported for each value (by index)
+      - exactly one of value and values must be defined
+    type: list
+    elements: raw
   full_validation:
     description:
       - specifies if the schema itself must be validated
@@ -104,6 +113,16 @@ EXAMPLES = """
       prop3: ["value", "another_value"]
     full_validation: false
 
+# Example with the validation of many values against the same schema
+# (the errors are shown for each value that is invalid)
+- lrd_schema:
+    schema_file: "schemas/my_file_1.yml"
+    values:
+      - prop1: "value1"
+      - prop1: "value2"
+        prop2: ["value"]
+      - prop2: ["value", "another_value"]
+
 # Schema File 2 (schemas/my_file_2.yml):
 # (invalid: 'typo' instead of 'type')
 
@@ -137,39 +156,22 @@ def main():
   module = AnsibleModule(
       argument_spec=dict(
           schema_file=dict(type='str', required=True),
-          value=dict(type='raw', required=True),
+          value=dict(type='raw'),
+          values=dict(type='list', elements='raw'),
           full_validation=dict(type='bool', default=True),
-      )
+      ),
+      required_one_of=[['value', 'values']],
+      mutually_exclusive=[['value', 'values']],
   )
 
   schema_file = module.params['schema_file']
   value = module.params['value']
+  values = module.params['values']
   full_validation = module.boolean(module.params['full_validation'])
 
-  error_msgs = list()
-
-  if os.path.exists(schema_file):
-    schema = None
-
-    try:
-      schema = load_yaml_file(schema_file)
-    except Exception as error:
-      error_msgs += [[
-          str('file: ' + schema_file),
-          'msg: error when trying to load the schema file',
-          'error type: ' + str(type(error)),
-          'error details: ',
-          traceback.format_exc().split('\n'),
-      ]]
-
-    if schema:
-      error_msgs_aux = validate_schema(schema, value, full_validation)
-
-      for value in (error_msgs_aux or []):
-        new_value = [str('schema file: ' + schema_file)] + value
-        error_msgs += [new_value]
-  else:
-    error_msgs += [[str('schema file not found: ' + schema_file)]]
+  error_msgs = validate_schema_file(
+      schema_file, value=value, values=values, full_validation=full_validation
+  )
 
   if error_msgs:
     context = "schema validation"
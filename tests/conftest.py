@@ -0,0 +1,26 @@
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+
+# The tests import the collection from the ansible directory of the repository
+# (in which it's linked as lrd.cloud), and are run from the repository root:
+#   python -m pytest tests
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import sys
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(base_dir, 'ansible', 'collections'))
+
+
+@pytest.fixture
+def schemas_dir():
+  return os.path.join(base_dir, 'schemas')
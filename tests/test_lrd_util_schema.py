@@ -0,0 +1,185 @@
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+# pylint: disable=redefined-outer-name
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import random
+
+from copy import deepcopy
+
+import pytest
+
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    flatten_errors, load_yaml_file
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_schema import (
+    SCHEMA_CODEGEN_DIR_ENV, CompiledSchema, SchemaNode, ValidationCache,
+    get_generated_validator, validate_value
+)
+
+# values used to replace the values of the schemas in the invalid values
+REPLACEMENTS = [
+    None, '', 'x', 1, -5, 1.5, True, 'true', '12', [], {}, ['a'], {'a': 1},
+    'str', 'list', 'map', 'int', 'schema', 'a-b',
+]
+
+RECURSIVE_SCHEMA = dict(
+    root='node',
+    schemas=dict(
+        node=dict(
+            type='dict',
+            props=dict(child=dict(schema='node'), value=dict(type='int')),
+        ),
+    ),
+)
+
+
+def mutate(value, rnd):
+  # changes (or removes) a random value in a random path
+  choice = rnd.random()
+
+  if isinstance(value, dict) and value:
+    value = dict(value)
+    key = rnd.choice(sorted(value.keys()))
+
+    if choice < 0.15:
+      del value[key]
+    elif choice < 0.25:
+      value['unknown_' + str(rnd.randint(0, 3))] = 1
+    else:
+      value[key] = mutate(value[key], rnd)
+
+    return value
+
+  if isinstance(value, list) and value:
+    value = list(value)
+    idx = rnd.randrange(len(value))
+
+    if choice < 0.2:
+      value.pop(idx)
+    else:
+      value[idx] = mutate(value[idx], rnd)
+
+    return value
+
+  return rnd.choice(REPLACEMENTS)
+
+
+def get_values(value, amount, seed=1):
+  rnd = random.Random(seed)
+  values = [value]
+
+  for _ in range(amount):
+    new_value = value
+
+    for _ in range(rnd.randint(1, 4)):
+      new_value = mutate(new_value, rnd)
+
+    values += [new_value]
+
+  return values
+
+
+def get_nested(depth, invalid=False):
+  value = dict(value=('x' if invalid else 1))
+
+  for _ in range(depth):
+    value = dict(child=value, value=1)
+
+  return value
+
+
+@pytest.fixture
+def schema(schemas_dir):
+  return load_yaml_file(os.path.join(schemas_dir, 'schema.yml'))
+
+
+@pytest.fixture
+def env_schema(schemas_dir):
+  return load_yaml_file(os.path.join(schemas_dir, 'env.schema.yml'))
+
+
+def compile_new(schema):
+  return CompiledSchema(schema.get('schemas'), schema.get('root'))
+
+
+def test_validation_interpreted_generated_and_cached(schema, env_schema, tmp_path, monkeypatch):
+  monkeypatch.setenv(SCHEMA_CODEGEN_DIR_ENV, str(tmp_path))
+  validate = get_generated_validator(compile_new(schema), schema)
+  assert validate is not None
+
+  interpreted = compile_new(schema)
+  cached = compile_new(schema)
+  validation_cache = ValidationCache('test')
+
+  for value in get_values(env_schema, 100):
+    for max_errors in [None, 1, 3]:
+      expected = flatten_errors(interpreted.validate(value, max_errors=max_errors))
+      assert flatten_errors(validate(value, max_errors=max_errors)) == expected
+
+      # the second validation uses the keys cached in the first
+      for _ in range(2):
+        errors = cached.validate(
+            value, max_errors=max_errors, validation_cache=validation_cache
+        )
+        validation_cache.clear_hashes()
+        assert flatten_errors(errors) == expected
+
+  assert not interpreted.validate(env_schema)
+
+
+def test_validation_of_deep_values():
+  assert not validate_value(RECURSIVE_SCHEMA, get_nested(3000))
+
+  error_msgs = flatten_errors(validate_value(RECURSIVE_SCHEMA, get_nested(3000, invalid=True)))
+  assert len(error_msgs) == 1
+
+
+def test_validation_of_deep_values_generated(tmp_path, monkeypatch):
+  monkeypatch.setenv(SCHEMA_CODEGEN_DIR_ENV, str(tmp_path))
+  schema = deepcopy(RECURSIVE_SCHEMA)
+  validate = get_generated_validator(compile_new(schema), schema)
+  assert validate is not None
+
+  for invalid in [False, True]:
+    value = get_nested(3000, invalid=invalid)
+    expected = flatten_errors(compile_new(schema).validate(value))
+    assert flatten_errors(validate(value)) == expected
+    assert bool(expected) == invalid
+
+
+def test_primitive_lists_in_bulk(monkeypatch):
+  schema = dict(
+      root='hosts',
+      schemas=dict(
+          hosts=dict(
+              type='dict',
+              props=dict(
+                  hosts=dict(type='list', elem_type='str', elem_regex='^[-.\\w]+$'),
+                  ports=dict(type='list', elem_type='int', elem_min=1, elem_max=65535),
+                  protocols=dict(type='list', elem_type='str', elem_choices=['tcp', 'udp']),
+                  weights=dict(type='list', elem_type='float'),
+              ),
+          ),
+      ),
+  )
+  value = dict(
+      hosts=['host-' + str(idx) + '.example.com' for idx in range(100)] + ['host name'],
+      ports=list(range(1, 100)) + [0, 65536, '80', True],
+      protocols=['tcp', 'udp', 'icmp', None],
+      weights=['1.5', 2.5, 3, 'heavy'],
+  )
+
+  bulk_errors = flatten_errors(compile_new(schema).validate(value))
+  monkeypatch.setattr(SchemaNode, 'is_primitive_node', lambda node: False)
+  errors = flatten_errors(compile_new(schema).validate(value))
+
+  assert bulk_errors == errors
+  assert len(errors) > 5
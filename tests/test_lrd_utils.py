@@ -0,0 +1,230 @@
+# (c) 2020, Lucas Basquerotto
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=import-error
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type  # pylint: disable=invalid-name
+
+import os
+import pickle
+import random
+import threading
+
+from copy import deepcopy
+
+from ansible_collections.lrd.cloud.plugins.module_utils import lrd_utils
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_utils import (
+    FileSystemIndex, ParamsOverlay, count_errors, error_text, error_with_context,
+    flatten_errors, map_parallel, merge_dicts, merge_overlay, to_plain_dict, vars_overlay
+)
+from ansible_collections.lrd.cloud.plugins.module_utils.lrd_util_params_mixer import (
+    mix, mix_overlay
+)
+
+
+def random_dict(rnd):
+  choice = rnd.random()
+
+  if choice < 0.15:
+    return None
+
+  if choice < 0.3:
+    return dict()
+
+  return dict((rnd.choice('abcdefg'), rnd.randint(0, 9)) for _ in range(rnd.randint(1, 4)))
+
+
+def test_params_overlay_as_merge_dicts():
+  rnd = random.Random(1)
+
+  for _ in range(2000):
+    args = [random_dict(rnd) for _ in range(rnd.randint(0, 4))]
+    original_args = deepcopy(args)
+    expected = merge_dicts(*args)
+    overlay = merge_overlay(*args)
+
+    if expected is None:
+      assert overlay is None
+      continue
+
+    assert list(to_plain_dict(overlay).items()) == list(expected.items())
+    assert list(overlay) == list(expected)
+    assert len(overlay) == len(expected)
+    assert bool(overlay) == bool(expected)
+
+    # the changes are copied on write, and never reach the layers
+    stacked = merge_overlay(overlay)
+    overlay['z'] = 1
+    overlay.pop('a', None)
+    assert args == original_args
+    assert 'z' not in stacked
+
+
+def test_mix_returns_plain_dicts():
+  args = dict(
+      params=merge_overlay(dict(name='pod'), dict(replicas=2)),
+      group_params=dict(group='group_a'),
+      shared_params=['shared_a'],
+      group_params_dict=dict(group_a=dict(name='group')),
+      shared_params_dict=dict(shared_a=dict(shared=True, replicas=1)),
+  )
+  expected = dict(shared=True, replicas=2, group=dict(name='group'), name='pod')
+
+  info = mix(args)
+  assert not info.get('error_msgs')
+  assert type(info.get('result')) is dict  # pylint: disable=unidiomatic-typecheck
+  assert info.get('result') == expected
+
+  info = mix_overlay(args)
+  assert isinstance(info.get('result'), ParamsOverlay)
+  assert to_plain_dict(info.get('result')) == expected
+
+
+def test_error_chains():
+  inner = [['msg: inner error 1'], ['msg: inner error 2']]
+  error_msgs = error_with_context(['context: outer'], [
+      ['msg: outer error'],
+  ] + error_with_context(['context: inner'], inner))
+  error_msgs += [['msg: last error']]
+
+  assert flatten_errors(error_msgs) == [
+      ['context: outer', 'msg: outer error'],
+      ['context: outer', 'context: inner', 'msg: inner error 1'],
+      ['context: outer', 'context: inner', 'msg: inner error 2'],
+      ['msg: last error'],
+  ]
+  assert count_errors(error_msgs) == 4
+  assert not error_with_context(['context: empty'], [])
+
+  # the contexts are not changed when the errors are rendered
+  assert inner == [['msg: inner error 1'], ['msg: inner error 2']]
+
+  text = error_text(error_msgs, 'test', max_errors=2)
+  assert '[test] 4 error(s)' in text
+  assert 'inner error 1' in text
+  assert 'inner error 2' not in text
+  assert '2 more error(s) not shown' in text
+
+
+def test_error_chains_deep():
+  error_msgs = [['msg: error']]
+
+  for idx in range(3000):
+    error_msgs = error_with_context(['context: ' + str(idx)], error_msgs)
+
+  errors = flatten_errors(error_msgs)
+  assert len(errors) == 1
+  assert len(errors[0]) == 3001
+  assert errors[0][0] == 'context: 2999'
+
+
+def test_fs_index(tmp_path, monkeypatch):
+  repo_dir = tmp_path / 'repo'
+  (repo_dir / 'a' / 'a').mkdir(parents=True)
+  (repo_dir / 'a' / 'file').write_text('')
+  (tmp_path / 'outside').write_text('')
+  os.symlink(str(repo_dir / 'a' / 'file'), str(repo_dir / 'a' / 'link'))
+
+  fs_index = FileSystemIndex()
+  fs_index.refresh([str(repo_dir)])
+
+  paths = [
+      str(repo_dir / name)
+      for name in ['a/file', 'a/a', 'a', 'a/link', 'a/missing', 'a/file/x', 'a/../a/file', 'a/']
+  ] + [str(tmp_path / 'outside'), str(repo_dir), str(tmp_path)]
+
+  for path in paths:
+    assert fs_index.exists(path) == os.path.exists(path), path
+
+  # the relative paths are resolved from the current directory of each check
+  for sub_dir in ['', 'a', 'a/a', '']:
+    monkeypatch.chdir(str(repo_dir / sub_dir))
+
+    for path in ['a/file', 'file', 'a', './file']:
+      assert fs_index.exists(path) == os.path.exists(path), (sub_dir, path)
+
+  assert fs_index.stats().get('hits') > 0
+
+  # the directories changed since listed are listed again when refreshed
+  os.remove(str(repo_dir / 'a' / 'file'))
+  fs_index.refresh()
+  assert not fs_index.exists(str(repo_dir / 'a' / 'file'))
+
+
+def test_refresh_fs_index(tmp_path):
+  try:
+    lrd_utils.refresh_fs_index(dict(env_dir=str(tmp_path), ctx_dir=None))
+    assert lrd_utils.fs_index.roots == [str(tmp_path)]
+
+    # without the environment data, the roots of the previous refresh are
+    # not kept
+    lrd_utils.refresh_fs_index()
+    assert lrd_utils.fs_index.roots == []
+  finally:
+    lrd_utils.refresh_fs_index()
+
+
+def parallel_function(value):
+  if value == 2:
+    # the result can't be pickled
+    return threading.Lock()
+
+  if (value == 3) and (os.getpid() != parallel_function.pid):
+    raise ValueError('error in the forked process')
+
+  return value * 10
+
+
+def test_map_parallel_fallback():
+  parallel_function.pid = os.getpid()
+  fallbacks = []
+  results = map_parallel(parallel_function, range(5), 3, fallbacks=fallbacks)
+
+  assert [results[idx] for idx in [0, 1, 3, 4]] == [0, 10, 30, 40]
+  assert isinstance(results[2], type(threading.Lock()))
+
+  # only the failed items are processed again in the current process
+  assert sorted(idx for idx, _ in fallbacks) == [2, 3]
+  assert 'error in the forked process' in dict(fallbacks).get(3)
+
+  assert map_parallel(parallel_function, [0, 1], 1) == [0, 10]
+
+
+def test_vars_overlay_copy_on_access():
+  variables = dict(
+      env=dict(name='env', nodes=[dict(name='node', tags=['a'])], meta=dict(lax=False)),
+      other=dict(value=1),
+  )
+  original = deepcopy(variables)
+  new_vars = vars_overlay(dict(params=dict(value=2)), variables)
+
+  new_vars['env']['nodes'][0]['tags'].append('b')
+  new_vars['env']['meta']['lax'] = True
+  new_vars['env'].setdefault('new', dict()).update(value=3)
+  new_vars['params']['value'] = 4
+
+  assert variables == original
+  assert new_vars['env']['nodes'][0]['tags'] == ['a', 'b']
+  assert new_vars['env']['meta'] == dict(lax=True)
+  assert new_vars['params'] == dict(value=4)
+  assert new_vars['other'] == dict(value=1)
+
+  # the copies are exported as plain values, with the changes
+  env = pickle.loads(pickle.dumps(new_vars['env']))
+  assert type(env) is dict  # pylint: disable=unidiomatic-typecheck
+  assert env['nodes'][0]['tags'] == ['a', 'b']
+  assert dict(new_vars['env']) == new_vars['env']
+
+  for env in [dict(new_vars['env']), new_vars['env'].copy()]:
+    assert env['meta'] == dict(lax=True)
+
+  for value in new_vars['other'].copy(), dict(vars_overlay(variables)['other'].items()):
+    value['value'] = 5
+
+  nodes = new_vars['env']['nodes']
+  assert [node.get('name') for node in nodes] == ['node']
+  assert (nodes + [1])[-1] == 1
+  assert variables == original